@@ -25,6 +25,7 @@ class OrganizationAdmin(admin.ModelAdmin):
 
 @admin.register(Job)
 class JobAdmin(admin.ModelAdmin):
+    list_select_related = ["org_id", "created_by"]
     list_display = [
         "id",
         "org_id",
@@ -36,6 +37,7 @@ class JobAdmin(admin.ModelAdmin):
 
 @admin.register(Application)
 class ApplicationAdmin(admin.ModelAdmin):
+    list_select_related = ["applicant_id", "job"]
     list_display = [
         "id",
         "created",
@@ -45,6 +47,7 @@ class ApplicationAdmin(admin.ModelAdmin):
 
 @admin.register(Staff)
 class StaffAdmin(admin.ModelAdmin):
+    list_select_related = ["user", "organization"]
     list_display = [
         "id",
         "user",
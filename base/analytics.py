@@ -0,0 +1,145 @@
+"""
+Daily hiring funnel rollups per organization and per job.
+
+``rollup`` recomputes the ``OrgDailyStats``/``JobDailyStats`` rows of a
+range of days from the jobs created and closed and the applications
+received on those days, replacing what was stored. A run costs what
+those days' activity costs and is idempotent. The rollup_analytics
+command schedules it over a trailing window, so dashboards read a
+bounded number of rollup rows however much history there is.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from base.models import Application, Job, JobDailyStats, OrgDailyStats
+
+
+def start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def per_day(queryset, field, *group_by, **aggregates):
+    """Group rows whose ``field`` falls on each day, by ``group_by`` and day."""
+    return (
+        queryset.order_by()
+        .annotate(day=TruncDate(field))
+        .values(*group_by, "day")
+        .annotate(**aggregates)
+    )
+
+
+def rollup(start, end):
+    """
+    Recompute the rollups of the days in ``[start, end)``. Returns the
+    number of organization and job rows written.
+    """
+    since, until = start_of(start), start_of(end)
+    org_rows, job_rows = {}, []
+
+    def org_row(org_id, day):
+        if (org_id, day) not in org_rows:
+            org_rows[org_id, day] = OrgDailyStats(organization_id=org_id, day=day)
+        return org_rows[org_id, day]
+
+    opened = per_day(
+        Job.objects.filter(created__gte=since, created__lt=until),
+        "created",
+        "org_id",
+        count=Count("id"),
+    )
+    for row in opened:
+        org_row(row["org_id"], row["day"]).jobs_opened = row["count"]
+
+    closed = per_day(
+        Job.objects.filter(closed_at__gte=since, closed_at__lt=until),
+        "closed_at",
+        "org_id",
+        count=Count("id"),
+        time_to_close=Sum(
+            ExpressionWrapper(
+                F("closed_at") - F("created"), output_field=DurationField()
+            )
+        ),
+    )
+    for row in closed:
+        stats = org_row(row["org_id"], row["day"])
+        stats.jobs_closed = row["count"]
+        stats.time_to_close = row["time_to_close"] or timedelta()
+
+    received = per_day(
+        Application.objects.filter(created__gte=since, created__lt=until),
+        "created",
+        "job_id",
+        "job__org_id",
+        count=Count("id"),
+    )
+    for row in received:
+        job_rows.append(
+            JobDailyStats(
+                job_id=row["job_id"],
+                organization_id=row["job__org_id"],
+                day=row["day"],
+                applications=row["count"],
+            )
+        )
+        org_row(row["job__org_id"], row["day"]).applications += row["count"]
+
+    with transaction.atomic():
+        OrgDailyStats.objects.filter(day__gte=start, day__lt=end).delete()
+        JobDailyStats.objects.filter(day__gte=start, day__lt=end).delete()
+        OrgDailyStats.objects.bulk_create(org_rows.values(), batch_size=1000)
+        JobDailyStats.objects.bulk_create(job_rows, batch_size=1000)
+    return {"organizations": len(org_rows), "jobs": len(job_rows)}
+
+
+def rollup_recent():
+    """Recompute the trailing ``ANALYTICS["WINDOW_DAYS"]`` days, today included."""
+    end = timezone.localdate() + timedelta(days=1)
+    return rollup(end - timedelta(days=settings.ANALYTICS["WINDOW_DAYS"]), end)
+
+
+def org_report(organization, start, end):
+    """Funnel of ``organization`` over the days in ``[start, end)``."""
+    days = list(
+        OrgDailyStats.objects.filter(
+            organization=organization, day__gte=start, day__lt=end
+        ).order_by("day")
+    )
+    jobs = (
+        JobDailyStats.objects.filter(
+            organization=organization, day__gte=start, day__lt=end
+        )
+        .values("job_id", "job__title")
+        .annotate(applications=Sum("applications"))
+        .order_by("-applications", "job_id")
+    )
+
+    totals = {
+        "jobs_opened": sum(day.jobs_opened for day in days),
+        "jobs_closed": sum(day.jobs_closed for day in days),
+        "applications": sum(day.applications for day in days),
+    }
+    time_to_close = sum((day.time_to_close for day in days), timedelta())
+    totals["avg_time_to_close"] = (
+        time_to_close.total_seconds() / totals["jobs_closed"]
+        if totals["jobs_closed"]
+        else None
+    )
+    return {
+        "totals": totals,
+        "days": days,
+        "jobs": [
+            {
+                "job": row["job_id"],
+                "title": row["job__title"],
+                "applications": row["applications"],
+            }
+            for row in jobs
+        ],
+    }
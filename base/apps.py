@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class BaseConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "base"
+
+    def ready(self):
+        from base import signals  # noqa: F401
+        from base.routers import check_pin_cache
+        from base.search import create_search_index
+
+        check_pin_cache()
+
+        post_migrate.connect(create_search_index, sender=self)
@@ -0,0 +1,264 @@
+"""
+Native async versions of the read endpoints and login, routed in place of
+the sync views when ``ASYNC_API["ENABLED"]`` (serve ``hr_base.asgi``, see
+start.sh).
+
+They answer on the same URLs with the same bodies as their counterparts
+in ``base.views`` but await the async ORM and cache, so an ASGI worker
+keeps serving other requests while one waits on I/O. Password hashing,
+which holds a CPU, runs in the ``base.login`` thread pool. Methods other
+than the ones a view implements fall back to the sync view.
+"""
+
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from base import views
+from base.cache import aread_through, ajob_list_cache_key, job_list_period
+from base.exceptions import HRBaseAPIException
+from base.instrumentation import TimedJSONRenderer
+from base.login import aauthenticate, aget_credentials
+from base.models import Application, Job, Organization, Staff, UserRoles
+from base.pagination import JobKeysetPagination
+from base.routers import can_read_replica, primary_reads, reads_from_replica
+from base.serializers import (
+    ApplicationSerializer,
+    JobSerializer,
+    StaffSerializer,
+    UserLoginSerializer,
+    UserSerializer,
+)
+from base.utils import aget_list_etag, get_not_modified_response, set_etag
+
+
+def render(data, status_code=status.HTTP_200_OK, headers=None):
+    return HttpResponse(
+        TimedJSONRenderer().render(data),
+        status=status_code,
+        content_type="application/json",
+        headers=headers,
+    )
+
+
+def handle_exception(request, exc):
+    """Build the error response DRF's APIView would for ``exc``."""
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        authenticators = request.authenticators
+        header = (
+            authenticators[0].authenticate_header(request) if authenticators else None
+        )
+        if header:
+            exc.auth_header = header
+        else:
+            exc.status_code = status.HTTP_403_FORBIDDEN
+
+    response = exception_handler(exc, {"request": request})
+    if response is None:
+        raise exc
+    headers = {
+        name: value for name, value in response.items() if name != "Content-Type"
+    }
+    return render(response.data, response.status_code, headers)
+
+
+def check_throttles(request, view):
+    """``APIView.check_throttles`` with the throttles of the sync ``view``."""
+    waits = [
+        throttle.wait()
+        for throttle in view.get_throttles()
+        if not throttle.allow_request(request, view)
+    ]
+    if waits:
+        waits = [wait for wait in waits if wait is not None]
+        raise exceptions.Throttled(max(waits, default=None))
+
+
+def api_view(fallback, method="GET", authenticated=True):
+    """
+    Turn a coroutine ``view(request, **kwargs)`` taking a DRF ``Request``
+    into a Django async view answering ``method``, authenticated and
+    throttled like the sync API views. Other methods are handed to the
+    sync ``fallback``.
+    """
+
+    def decorator(view):
+        fallback_view = fallback.cls(**fallback.initkwargs)
+
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != method:
+                return await sync_to_async(fallback)(request, *args, **kwargs)
+
+            request = Request(
+                request,
+                parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES],
+                authenticators=[
+                    auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+                ],
+            )
+            try:
+                if authenticated:
+                    # Authenticators look tokens up with the sync ORM.
+                    user = await sync_to_async(lambda: request.user)()
+                    if not user.is_authenticated:
+                        raise exceptions.NotAuthenticated()
+                if fallback_view.throttle_classes:
+                    # Shared buckets and the body are read synchronously.
+                    await sync_to_async(check_throttles)(request, fallback_view)
+                return await view(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return handle_exception(request, exc)
+
+        # Like APIView.as_view(), the API authenticates with tokens only.
+        wrapper.csrf_exempt = True
+        return wrapper
+
+    return decorator
+
+
+@api_view(views.UserLoginView.as_view(), method="POST", authenticated=False)
+async def login(request):
+    serializer = UserLoginSerializer(data=request.data)
+    try:
+        serializer.is_valid(raise_exception=True)
+    except ValidationError:
+        raise HRBaseAPIException(serializer.errors)
+
+    email = serializer.validated_data["email"]
+    password = serializer.validated_data["password"]
+
+    user = await aauthenticate(email, password)
+    if user is None:
+        raise HRBaseAPIException("Incorrect credentials! Check and try again.")
+
+    data = {
+        "auth_credentials": await aget_credentials(user),
+        "user": UserSerializer(user).data,
+    }
+    return render(
+        {
+            "status": True,
+            "message": "login successful.",
+            "data": data,
+        }
+    )
+
+
+@api_view(views.JobView.as_view({"get": "list", "post": "create"}))
+async def job_list(request):
+    paginator = JobKeysetPagination()
+    page_size = paginator.get_page_size(request)
+    cursor = request.query_params.get(paginator.cursor_query_param)
+
+    key = await ajob_list_cache_key(page_size, cursor)
+
+    async def get_page():
+        # Cached pages outlive the replica's lag, build them from the primary.
+        with primary_reads():
+            etag = await aget_list_etag(
+                Job.objects.filter(is_open=True), page_size, cursor, job_list_period()
+            )
+            jobs = await paginator.apaginate_queryset(
+                Job.objects.filter(is_open=True), request
+            )
+        serializer = JobSerializer(jobs, many=True)
+        return {
+            "data": serializer.data,
+            "cursor": paginator.get_next_cursor(),
+            "etag": etag,
+        }
+
+    page = await aread_through(
+        key,
+        get_page,
+        settings.JOB_LIST_CACHE["TIMEOUT"],
+        alias=settings.JOB_LIST_CACHE["ALIAS"],
+    )
+    not_modified = get_not_modified_response(request, page["etag"])
+    if not_modified is not None:
+        return not_modified
+
+    response = render(
+        {
+            "status": True,
+            "message": "Jobs retrieved successfully.",
+            "data": page["data"],
+            "next": paginator.get_link(request, page["cursor"]),
+        }
+    )
+    return set_etag(response, page["etag"])
+
+
+@api_view(views.OrganizationStaffView.as_view())
+async def org_staff(request):
+    user = request.user
+    if user.role != UserRoles.ORG_ADMIN:
+        raise HRBaseAPIException("You are not authorized for this action!!!")
+
+    with reads_from_replica(await sync_to_async(can_read_replica)(request)):
+        try:
+            # Handle when user is an HR since a user can join an org with access code
+            staff = await Staff.objects.select_related("organization").aget(user=user)
+            org = staff.organization
+        except Staff.DoesNotExist:
+            # Assume is user is an admin user
+            org = await Organization.objects.aget(admin=user)
+
+        org_staff = Staff.objects.filter(organization=org)
+        etag = await aget_list_etag(org_staff, org.pk)
+        not_modified = get_not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        serializer = StaffSerializer([staff async for staff in org_staff], many=True)
+    response = render(
+        {
+            "status": True,
+            "message": "success, org staff returned.",
+            "data": serializer.data,
+        }
+    )
+    return set_etag(response, etag)
+
+
+@api_view(views.JobApplicationView.as_view({"get": "applications"}))
+async def job_applications(request, pk):
+    user = request.user
+    with reads_from_replica(await sync_to_async(can_read_replica)(request)):
+        try:
+            job = await Job.objects.select_related("org_id").aget(pk=pk)
+        except (Job.DoesNotExist, ValueError):
+            raise HRBaseAPIException("Job not found", code=status.HTTP_404_NOT_FOUND)
+
+        # validate to confirm if user is in the Approved list to view
+        # an organizations job applications
+        is_staff = await Staff.objects.filter(
+            user=user, organization=job.org_id
+        ).aexists()
+        if (
+            user.role not in [UserRoles.ORG_HR, UserRoles.ORG_ADMIN]
+            and is_staff is False
+        ):
+            raise HRBaseAPIException(
+                "You are not authorized to view applications to this job!!"
+            )
+
+        applications = Application.objects.filter(job=job).select_related("job")
+        serializer = ApplicationSerializer(
+            [application async for application in applications], many=True
+        )
+    return render(
+        {
+            "status": True,
+            "message": "Applications returned, successfully.",
+            "data": serializer.data,
+        }
+    )
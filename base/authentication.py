@@ -0,0 +1,140 @@
+import copy
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import (
+    BaseAuthentication,
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.exceptions import AuthenticationFailed
+
+from base.cache import LRUCache
+from base.instrumentation import timed
+from base.models import User
+from base.tokens import ACCESS, InvalidToken, decode_token
+
+
+class TokenUserCache:
+    """
+    Token key -> (user, token) cache used by CachedTokenAuthentication.
+
+    Lookups go to a bounded per-process LRU first and, when
+    ``TOKEN_AUTH_CACHE["SHARED_CACHE"]`` names an entry in ``CACHES``,
+    to that shared cache second, before falling back to the database.
+    """
+
+    key_prefix = "auth-token:"
+
+    def __init__(self, max_size, ttl, shared_alias=None):
+        self.local = LRUCache(max_size=max_size, ttl=ttl)
+        self.ttl = ttl
+        self.shared_alias = shared_alias
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    @property
+    def shared(self):
+        if not self.shared_alias:
+            return None
+        return caches[self.shared_alias]
+
+    def get(self, key):
+        entry = self.local.get(key)
+        if entry is not None or self.shared is None:
+            return entry
+
+        entry = self.shared.get(self.key_prefix + key)
+        if entry is None:
+            self.shared_misses += 1
+            return None
+
+        self.shared_hits += 1
+        self.local.set(key, entry)
+        return entry
+
+    def set(self, key, entry):
+        self.local.set(key, entry)
+        if self.shared is not None:
+            self.shared.set(self.key_prefix + key, entry, self.ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(self.key_prefix + key)
+
+    def clear(self):
+        self.local.clear()
+
+    def info(self):
+        info = self.local.info()
+        info["shared_hits"] = self.shared_hits
+        info["shared_misses"] = self.shared_misses
+        return info
+
+
+token_cache = TokenUserCache(
+    max_size=settings.TOKEN_AUTH_CACHE["MAX_SIZE"],
+    ttl=settings.TOKEN_AUTH_CACHE["TTL"],
+    shared_alias=settings.TOKEN_AUTH_CACHE["SHARED_CACHE"],
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that remembers which user a token belongs to,
+    so the Token/User join only runs on a cache miss.
+
+    Entries are evicted when the token is deleted or the user is saved
+    (see ``base.signals``); other processes drop them after the TTL.
+    """
+
+    cache = token_cache
+
+    @timed("auth")
+    def authenticate(self, request):
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            entry = super().authenticate_credentials(key)
+            self.cache.set(key, entry)
+
+        user, token = entry
+        # Hand out a copy so a request mutating request.user cannot
+        # leak into other requests served from the same entry.
+        return copy.copy(user), token
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authenticate ``Authorization: Bearer <access token>`` headers issued
+    by ``base.tokens`` without touching the database.
+
+    ``request.user`` is a User built from the id and role in the token,
+    its other fields are left unset; ``request.auth`` holds the claims.
+    """
+
+    keyword = "Bearer"
+
+    @timed("auth")
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            raise AuthenticationFailed("Invalid token header.")
+
+        try:
+            claims = decode_token(auth[1].decode(), ACCESS)
+        except (InvalidToken, UnicodeError) as e:
+            raise AuthenticationFailed(str(e))
+
+        user = User(pk=claims["uid"], role=claims["role"], is_active=True)
+        user._state.adding = False
+        return user, claims
+
+    def authenticate_header(self, request):
+        return self.keyword
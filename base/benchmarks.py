@@ -0,0 +1,275 @@
+"""
+Benchmark suite for the API endpoints.
+
+Scenarios run against a dataset seeded by ``base.datagen`` through either
+the Django test client, in process and one request at a time, or HTTP
+against a running server, from several processes of keep-alive client
+threads. Both report throughput, p50/p95/p99 latency and queries per
+request, the latter read from the ``Server-Timing`` header added by
+``base.instrumentation``. Results can be saved and compared against a
+stored baseline.
+"""
+
+import http.client
+import json
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.test import Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from base.datagen import ADMIN_EMAIL, PASSWORD
+from base.models import Job, User
+
+PERCENTILES = (50, 95, 99)
+QUERIES_RE = re.compile(r'db;[^,]*desc="(\d+) queries"')
+LOGIN_STORM_USERS = 1000
+
+
+def percentile(values, percent):
+    """Return the ``percent``-th percentile of sorted ``values``."""
+    if not values:
+        return None
+    index = round(percent / 100 * (len(values) - 1))
+    return values[index]
+
+
+def count_queries(server_timing):
+    match = QUERIES_RE.search(server_timing or "")
+    return int(match.group(1)) if match else None
+
+
+def summarize(latencies, errors, queries, duration):
+    """Summary of one scenario's ``latencies`` (seconds) and query counts."""
+    latencies = sorted(latencies)
+    queries = [count for count in queries if count is not None]
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / duration if duration else None,
+        "queries": sum(queries) / len(queries) if queries else None,
+    }
+    for percent in PERCENTILES:
+        value = percentile(latencies, percent)
+        summary["p%s_ms" % percent] = None if value is None else value * 1000
+    return summary
+
+
+def get_scenarios():
+    """
+    Return the benchmark scenarios, ``{name: (method, path, body, auth)}``,
+    for the seeded dataset. ``body`` may be a list of bodies sent in turn,
+    and ``auth`` says whether the request is sent with the seeded admin's
+    token.
+    """
+    admin = User.objects.get(email=ADMIN_EMAIL)
+    job = Job.objects.filter(org_id__admin=admin).order_by("id").first()
+    login = json.dumps({"email": ADMIN_EMAIL, "password": PASSWORD})
+    # A shift change: many different users logging in at once.
+    logins = [
+        json.dumps({"email": email, "password": PASSWORD})
+        for email in User.objects.filter(email__startswith="bench-user-")
+        .order_by("id")
+        .values_list("email", flat=True)[:LOGIN_STORM_USERS]
+    ]
+    return {
+        "job_list": ("GET", "/v1/core/api/jobs/create/", None, True),
+        "job_search": ("GET", "/v1/core/api/jobs/search?q=engineer", None, True),
+        "job_applications": (
+            "GET",
+            "/v1/core/api/jobs/%s/applications/" % job.pk,
+            None,
+            True,
+        ),
+        "org_staff": ("GET", "/v1/core/api/org/staff", None, True),
+        "login": ("POST", "/v1/core/api/account/login", login, False),
+        "login_storm": ("POST", "/v1/core/api/account/login", logins, False),
+    }
+
+
+def get_auth_header():
+    token, created = Token.objects.get_or_create(
+        user=User.objects.get(email=ADMIN_EMAIL)
+    )
+    return "Token %s" % token.key
+
+
+def get_host():
+    """A host name the test client may use under ``ALLOWED_HOSTS``."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != "*" and not host.startswith("."):
+            return host
+    return "localhost"
+
+
+def run_client(scenarios, iterations, warmup=5):
+    """
+    Run each scenario ``iterations`` times through the test client, with
+    throttling off since every request comes from the same address, and
+    Server-Timing on to count queries.
+    """
+    auth_header = get_auth_header()
+    client = Client(HTTP_HOST=get_host())
+    results = {}
+    throttling = {**settings.THROTTLING, "ENABLED": False}
+    instrumentation = {**settings.INSTRUMENTATION, "SERVER_TIMING": True}
+    with override_settings(THROTTLING=throttling, INSTRUMENTATION=instrumentation):
+        for name, (method, path, body, auth) in scenarios.items():
+            headers = {"HTTP_AUTHORIZATION": auth_header} if auth else {}
+            send = getattr(client, method.lower())
+            bodies = body if isinstance(body, list) else [body]
+            latencies, queries, errors = [], [], 0
+            for i in range(warmup + iterations):
+                started = time.perf_counter()
+                response = send(
+                    path,
+                    bodies[i % len(bodies)],
+                    content_type="application/json",
+                    **headers,
+                )
+                elapsed = time.perf_counter() - started
+                if i < warmup:
+                    continue
+                latencies.append(elapsed)
+                queries.append(count_queries(response.get("Server-Timing")))
+                errors += response.status_code >= 400
+            results[name] = summarize(latencies, errors, queries, sum(latencies))
+    return results
+
+
+def load(base_url, requests, concurrency, start, stop, headers):
+    """
+    Send ``requests``, ``(method, path, body)`` tuples taken in turn, from
+    ``concurrency`` threads with one keep-alive connection each until
+    ``stop``, recording those sent after ``start``. Runs in a worker
+    process of ``run_load``.
+    """
+    url = urlsplit(base_url)
+    connection_class = (
+        http.client.HTTPSConnection
+        if url.scheme == "https"
+        else http.client.HTTPConnection
+    )
+    headers = {"Content-Type": "application/json", **(headers or {})}
+    latencies, queries, errors = [], [], [0]
+    lock = threading.Lock()
+
+    def worker(offset):
+        connection = connection_class(url.netloc, timeout=30)
+        done, counts, failed = [], [], 0
+        position = offset
+        while True:
+            method, path, body = requests[position % len(requests)]
+            position += 1
+            began = time.time()
+            if began >= stop:
+                break
+            count = None
+            try:
+                connection.request(method, url.path + path, body, headers)
+                response = connection.getresponse()
+                response.read()
+                count = count_queries(response.getheader("Server-Timing"))
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                ok = False
+            if began >= start:
+                done.append(time.time() - began)
+                counts.append(count)
+                failed += not ok
+        connection.close()
+        with lock:
+            latencies.extend(done)
+            queries.extend(counts)
+            errors[0] += failed
+
+    threads = [
+        threading.Thread(target=worker, args=(offset,)) for offset in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, queries, errors[0]
+
+
+def run_load(
+    base_url, requests, concurrency, duration, headers=None, warmup=0, processes=1
+):
+    """
+    Load ``base_url`` with ``requests`` for ``duration`` seconds after
+    ``warmup`` seconds, from ``concurrency`` connections spread over
+    ``processes`` processes so the client is not the bottleneck.
+    Returns a summary of throughput, latencies and queries.
+    """
+    processes = max(1, min(processes, concurrency))
+    start = time.time() + warmup
+    stop = start + duration
+    shares = [
+        concurrency // processes + (i < concurrency % processes)
+        for i in range(processes)
+    ]
+
+    if processes == 1:
+        outcomes = [load(base_url, requests, concurrency, start, stop, headers)]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [
+                executor.submit(load, base_url, requests, share, start, stop, headers)
+                for share in shares
+            ]
+            outcomes = [future.result() for future in futures]
+
+    latencies, queries, errors = [], [], 0
+    for done, counts, failed in outcomes:
+        latencies.extend(done)
+        queries.extend(counts)
+        errors += failed
+    return summarize(latencies, errors, queries, duration)
+
+
+def run_http(base_url, scenarios, concurrency, duration, warmup=2, processes=1):
+    """Load a running server with each scenario in turn."""
+    auth_header = get_auth_header()
+    results = {}
+    for name, (method, path, body, auth) in scenarios.items():
+        bodies = body if isinstance(body, list) else [body]
+        results[name] = run_load(
+            base_url,
+            [(method, path, body) for body in bodies],
+            concurrency,
+            duration,
+            headers={"Authorization": auth_header} if auth else None,
+            warmup=warmup,
+            processes=processes,
+        )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Return ``(scenario, metric, baseline value, value)`` for every metric
+    of ``results`` worse than in ``baseline`` by more than ``tolerance``,
+    a fraction. Any extra query per request counts as a regression.
+    """
+    regressions = []
+    for name, summary in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        checks = [("rps", lambda old, new: new < old * (1 - tolerance))]
+        checks += [
+            ("p%s_ms" % percent, lambda old, new: new > old * (1 + tolerance))
+            for percent in PERCENTILES
+        ]
+        checks.append(("queries", lambda old, new: new > old))
+        for metric, worse in checks:
+            old, new = before.get(metric), summary.get(metric)
+            if old is not None and new is not None and worse(old, new):
+                regressions.append((name, metric, old, new))
+    return regressions
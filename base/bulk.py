@@ -0,0 +1,342 @@
+"""
+Bulk write paths used by the batch API endpoints and management commands.
+"""
+
+import csv
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+
+from base.counters import recount
+from base.models import Job, Organization, Staff, User, UserRoles
+from base.serializers import JobSerializer
+from base.signals import jobs_written
+from base.utils import is_valid_id
+
+IMPORT_FORMATS = ["csv", "ndjson"]
+# Raised by read_rows for files that are not UTF-8 or not valid CSV.
+READ_ERRORS = (UnicodeDecodeError, csv.Error)
+IMPORT_ROLES = [UserRoles.USER, UserRoles.ORG_STAFF, UserRoles.ORG_HR]
+EXISTING_ACCOUNT = (
+    "An account with this email already exists, "
+    "they can join with the staff access code."
+)
+
+
+def read_rows(stream, file_format):
+    """Yield one dict per user from a binary CSV or NDJSON stream."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        yield from csv.DictReader(text)
+        return
+
+    for line in text:
+        line = line.strip()
+        if line:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else {}
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def clean_staff_row(row, seen):
+    """Return ``(cleaned row, errors)`` for one imported user."""
+    errors = []
+    email = User.objects.normalize_email((row.get("email") or "").strip())
+    name = (row.get("name") or "").strip()
+    role = (row.get("role") or UserRoles.USER).strip()
+    password = row.get("password") or None
+
+    try:
+        validate_email(email)
+    except ValidationError:
+        errors.append("Enter a valid email address.")
+    if email in seen:
+        errors.append("Duplicate email in import.")
+    if not name:
+        errors.append("Name is required.")
+    elif len(name) > User._meta.get_field("name").max_length:
+        errors.append("Name is too long.")
+    if role not in IMPORT_ROLES:
+        errors.append("Invalid role: %s" % (role))
+
+    seen.add(email)
+    cleaned = {"email": email, "name": name, "role": role, "password": password}
+    return cleaned, errors
+
+
+def hash_passwords(passwords, executor=None):
+    """Hash ``passwords``, spread over ``executor``'s processes if given."""
+    if executor is None:
+        return [make_password(password) for password in passwords]
+    return list(executor.map(make_password, passwords, chunksize=64))
+
+
+def import_staff(organization, rows, workers=None, batch_size=None):
+    """
+    Create users and add them as staff of ``organization`` in batches.
+
+    Emails that already have an account are skipped: nobody is made staff
+    of an organization without asking, existing users join with the staff
+    access code. Password hashing, the expensive part, runs in a pool of
+    ``workers`` processes. Returns a report with counts and per-row
+    errors and skips.
+    """
+    workers = settings.BULK_IMPORT["HASH_WORKERS"] if workers is None else workers
+    batch_size = batch_size or settings.BULK_IMPORT["BATCH_SIZE"]
+    report = {"created": 0, "skipped": 0, "failed": 0, "errors": [], "skips": []}
+    seen = set()
+
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+    try:
+        numbered = enumerate(rows, start=1)
+        for batch in batched(numbered, batch_size):
+            valid = []
+            for number, row in batch:
+                cleaned, errors = clean_staff_row(row, seen)
+                if errors:
+                    report["failed"] += 1
+                    report["errors"].append(
+                        {"row": number, "email": cleaned["email"], "errors": errors}
+                    )
+                else:
+                    valid.append((number, cleaned))
+            import_staff_batch(organization, valid, executor, report)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return report
+
+
+def skip_staff_rows(rows, report):
+    """Report ``(row number, email)`` rows whose email already has an account."""
+    for number, email in rows:
+        report["skipped"] += 1
+        report["skips"].append(
+            {"row": number, "email": email, "reason": EXISTING_ACCOUNT}
+        )
+
+
+def import_staff_batch(organization, rows, executor, report):
+    if not rows:
+        return
+
+    existing = set(
+        User.objects.filter(email__in=[row["email"] for _, row in rows]).values_list(
+            "email", flat=True
+        )
+    )
+    skip_staff_rows(
+        [(number, row["email"]) for number, row in rows if row["email"] in existing],
+        report,
+    )
+    rows = [(number, row) for number, row in rows if row["email"] not in existing]
+    if not rows:
+        return
+
+    # Hash outside the transaction, it is by far the slowest step.
+    passwords = hash_passwords([row["password"] for _, row in rows], executor)
+    numbers = {row["email"]: number for number, row in rows}
+    users = [
+        User(
+            email=row["email"],
+            name=row["name"],
+            role=row["role"],
+            password=password,
+        )
+        for (_, row), password in zip(rows, passwords)
+    ]
+
+    with transaction.atomic():
+        # Someone may sign up with one of the emails while we hash. Their
+        # row wins and the insert skips it instead of failing the batch;
+        # the salted hashes tell our rows apart from theirs.
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        stored = {
+            email: (user_id, password)
+            for email, user_id, password in User.objects.filter(
+                email__in=[user.email for user in users]
+            ).values_list("email", "id", "password")
+        }
+        user_ids = []
+        for user in users:
+            user_id, password = stored[user.email]
+            if password == user.password:
+                user_ids.append(user_id)
+            else:
+                skip_staff_rows([(numbers[user.email], user.email)], report)
+        report["created"] += len(user_ids)
+
+        Staff.objects.bulk_create(
+            [Staff(user_id=user_id, organization=organization) for user_id in user_ids]
+        )
+        recount(Organization, [organization.pk])
+
+
+def create_jobs(organization, user, items):
+    """
+    Validate ``items`` and create the valid ones as jobs of
+    ``organization`` with one insert. Returns a report with one result
+    per item, in order.
+    """
+    now = timezone.now()
+    results, jobs = [], []
+    for item in items:
+        serializer = JobSerializer(data=item)
+        if serializer.is_valid():
+            job = Job(created_by=user, org_id=organization, **serializer.validated_data)
+            if not job.is_open:
+                job.closed_at = now
+            jobs.append(job)
+            results.append({"status": "created", "job": jobs[-1]})
+        else:
+            results.append({"status": "failed", "errors": serializer.errors})
+
+    if jobs:
+        with transaction.atomic():
+            Job.objects.bulk_create(jobs)
+            jobs_written([job.pk for job in jobs])
+
+    for result in results:
+        job = result.pop("job", None)
+        if job is not None:
+            result["id"] = job.pk
+    return job_report(results)
+
+
+def update_jobs(organization, items):
+    """
+    Apply partial updates ``{"id": ..., <field>: ...}`` to jobs of
+    ``organization`` with one select and one update.
+    """
+    ids = [item.get("id") for item in items if is_valid_id(item.get("id"))]
+    jobs = Job.objects.filter(org_id=organization, pk__in=ids).in_bulk()
+
+    now = timezone.now()
+    results, changed, fields, seen = [], [], {"modified"}, set()
+    for item in items:
+        job_id = item.get("id")
+        if not is_valid_id(job_id):
+            # Lists and dicts cannot be looked up, and True is not job 1.
+            results.append(
+                {"id": job_id, "status": "failed", "errors": ["Invalid id."]}
+            )
+            continue
+        job = jobs.get(job_id)
+        if job is None:
+            results.append({"id": job_id, "status": "not_found"})
+            continue
+        if job_id in seen:
+            results.append(
+                {"id": job_id, "status": "failed", "errors": ["Duplicate id in batch."]}
+            )
+            continue
+        seen.add(job_id)
+
+        data = {key: value for key, value in item.items() if key != "id"}
+        serializer = JobSerializer(job, data=data, partial=True)
+        if not serializer.is_valid():
+            results.append(
+                {"id": job_id, "status": "failed", "errors": serializer.errors}
+            )
+            continue
+
+        data = dict(serializer.validated_data)
+        if "is_open" in data:
+            job.set_open(data.pop("is_open"), now)
+            fields.update(["is_open", "closed_at", "closes_at"])
+        for field, value in data.items():
+            setattr(job, field, value)
+            fields.add(field)
+        # bulk_update() does not apply auto_now, and delta sync relies on it.
+        job.modified = now
+        changed.append(job)
+        results.append({"id": job_id, "status": "updated"})
+
+    if changed:
+        with transaction.atomic():
+            Job.objects.bulk_update(changed, sorted(fields))
+            jobs_written([job.pk for job in changed])
+    return job_report(results)
+
+
+def close_jobs(organization, ids):
+    """Close the open jobs of ``organization`` among ``ids`` with one update."""
+    ids = list(dict.fromkeys(ids))
+    is_open = dict(
+        Job.objects.filter(org_id=organization, pk__in=ids).values_list("id", "is_open")
+    )
+    to_close = [job_id for job_id in is_open if is_open[job_id]]
+
+    results = []
+    for job_id in ids:
+        if job_id not in is_open:
+            results.append({"id": job_id, "status": "not_found"})
+        elif is_open[job_id]:
+            results.append({"id": job_id, "status": "closed"})
+        else:
+            results.append({"id": job_id, "status": "already_closed"})
+
+    if to_close:
+        now = timezone.now()
+        with transaction.atomic():
+            Job.objects.filter(pk__in=to_close).update(
+                is_open=False, closed_at=now, modified=now
+            )
+            jobs_written(to_close)
+    return job_report(results)
+
+
+def job_report(results):
+    """Count ``results`` by status next to the per-item list."""
+    report = {}
+    for result in results:
+        report[result["status"]] = report.get(result["status"], 0) + 1
+    report["results"] = results
+    return report
+
+
+def close_expired_jobs(now=None, batch_size=None):
+    """
+    Close open jobs whose ``closes_at`` has passed, ``batch_size`` at a
+    time so each transaction only holds a few row locks. Concurrent
+    runs skip each other's rows where the backend supports it. Returns
+    the number of jobs closed.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.JOB_EXPIRY["BATCH_SIZE"]
+    expired = Job.objects.filter(is_open=True, closes_at__lte=now).order_by("closes_at")
+
+    closed = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                expired.select_for_update(skip_locked=True).values_list(
+                    "id", flat=True
+                )[:batch_size]
+            )
+            if not ids:
+                return closed
+            Job.objects.filter(pk__in=ids).update(
+                is_open=False, closed_at=now, modified=now
+            )
+            jobs_written(ids)
+        closed += len(ids)
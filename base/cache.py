@@ -0,0 +1,245 @@
+import asyncio
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+
+class LRUCache:
+    """
+    Thread-safe, per-process LRU cache whose entries also expire
+    after ``ttl`` seconds.
+
+    Keeps hit/miss/eviction counters so callers can report how much
+    work the cache saves.
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def info(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "max_size": self.max_size,
+            }
+
+
+def read_through(key, compute, timeout, alias="default", lock_timeout=10, wait=2):
+    """
+    Return ``key`` from the cache, computing and storing it on a miss.
+
+    Only one caller per key recomputes at a time: the others poll the
+    cache for up to ``wait`` seconds for the winner's result before
+    giving up and computing it themselves, so an invalidation under
+    load does not send every worker to the database at once.
+    """
+    cache = caches[alias]
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_key = "%s:lock" % key
+    if cache.add(lock_key, 1, lock_timeout):
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return compute()
+
+
+async def aread_through(
+    key, compute, timeout, alias="default", lock_timeout=10, wait=2
+):
+    """``read_through`` for async callers, ``compute`` being a coroutine function."""
+    cache = caches[alias]
+    value = await cache.aget(key)
+    if value is not None:
+        return value
+
+    lock_key = "%s:lock" % key
+    if await cache.aadd(lock_key, 1, lock_timeout):
+        try:
+            value = await compute()
+            await cache.aset(key, value, timeout)
+        finally:
+            await cache.adelete(lock_key)
+        return value
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        value = await cache.aget(key)
+        if value is not None:
+            return value
+    return await compute()
+
+
+def get_version(key, alias="default"):
+    """
+    Return the current generation number stored under ``key``.
+
+    Generations start from a timestamp, so one that gets evicted and
+    recreated never reuses a number that older entries were keyed on.
+    """
+    cache = caches[alias]
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(key, alias="default"):
+    cache = caches[alias]
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(key, alias="default"):
+    cache = caches[alias]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+JOB_LIST_VERSION_KEY = "jobs:list:version"
+
+
+def job_list_cache_key(page_size, cursor):
+    alias = settings.JOB_LIST_CACHE["ALIAS"]
+    version = get_version(JOB_LIST_VERSION_KEY, alias=alias)
+    return "jobs:list:page:%s:%s:%s" % (version, page_size, cursor or "")
+
+
+async def ajob_list_cache_key(page_size, cursor):
+    alias = settings.JOB_LIST_CACHE["ALIAS"]
+    version = await aget_version(JOB_LIST_VERSION_KEY, alias=alias)
+    return "jobs:list:page:%s:%s:%s" % (version, page_size, cursor or "")
+
+
+def job_list_period():
+    """
+    Number of the current ``JOB_LIST_CACHE["TIMEOUT"]`` window, part of
+    job list ETags: application counts change without touching
+    ``modified``, so validators expire along with cached pages.
+    """
+    return int(time.time()) // max(settings.JOB_LIST_CACHE["TIMEOUT"], 1)
+
+
+def invalidate_job_list():
+    """Drop every cached job list page at once by moving to a new generation."""
+
+    def bump():
+        bump_version(JOB_LIST_VERSION_KEY, alias=settings.JOB_LIST_CACHE["ALIAS"])
+
+    bump()
+    # Pages cached by readers before the write committed would otherwise
+    # outlive it, so move to a new generation again once it is visible.
+    transaction.on_commit(bump)
+
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+def idempotent(scope):
+    """
+    Decorate a view method so that repeating a successful request with
+    the same ``Idempotency-Key`` header replays the stored response
+    instead of running it again. Keys are scoped per user, ``scope`` and
+    URL kwargs; requests without the header are not affected.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not idempotency_key:
+                return method(view, request, *args, **kwargs)
+
+            cache = caches[settings.IDEMPOTENCY["ALIAS"]]
+            key = "idempotency:%s:%s:%s:%s" % (
+                scope,
+                request.user.pk,
+                ":".join(str(value) for value in kwargs.values()),
+                idempotency_key,
+            )
+            stored = cache.get(key)
+            if stored is not None:
+                data, status = stored
+                response = Response(data, status=status)
+                response["Idempotent-Replayed"] = "true"
+                return response
+
+            response = method(view, request, *args, **kwargs)
+            if 200 <= response.status_code < 300:
+                cache.set(
+                    key,
+                    (response.data, response.status_code),
+                    settings.IDEMPOTENCY["TIMEOUT"],
+                )
+            return response
+
+        return wrapper
+
+    return decorator
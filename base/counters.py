@@ -0,0 +1,89 @@
+"""
+Denormalized row counts: ``Job.application_count`` and
+``Organization.staff_count``.
+
+Single inserts and deletes adjust them with ``F()`` updates from the
+handlers in ``base.signals``. Bulk writes, which send no signals, call
+``recount`` for the rows they touched, and ``reconcile`` repairs any
+drift across a whole table.
+
+Updates leave ``modified`` and the job list cache alone, so that every
+application does not invalidate the open job listing: cached pages and
+their ETags expire with ``JOB_LIST_CACHE["TIMEOUT"]``, so counts there
+lag by at most two timeouts, and delta sync picks them up with the job's
+next change.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from base.models import Application, Job, Organization, Staff
+
+
+def get_counters():
+    """``(model, counter field, counted model, foreign key)`` of every counter."""
+    return [
+        (Job, "application_count", Application, "job"),
+        (Organization, "staff_count", Staff, "organization"),
+    ]
+
+
+def adjust(model, pk, field, delta):
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        # Never below zero, even if the counter drifted low.
+        queryset = queryset.filter(**{"%s__gte" % field: -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def actual_count(counted, foreign_key):
+    rows = (
+        counted.objects.filter(**{foreign_key: OuterRef("pk")})
+        .order_by()
+        .values(foreign_key)
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return Coalesce(Subquery(rows), 0, output_field=IntegerField())
+
+
+def recount(model, pks):
+    """Set the counter of the ``model`` rows ``pks`` from a fresh COUNT."""
+    for counter_model, field, counted, foreign_key in get_counters():
+        if counter_model is model:
+            model.objects.filter(pk__in=pks).update(
+                **{field: actual_count(counted, foreign_key)}
+            )
+
+
+def reconcile(batch_size=1000):
+    """
+    Repair counters that drifted from the rows they count, ``batch_size``
+    rows per transaction. Returns the number repaired per counter.
+    """
+    repaired = {}
+    for model, field, counted, foreign_key in get_counters():
+        repaired[field] = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                model.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+
+            with transaction.atomic():
+                drifted = list(
+                    model.objects.filter(pk__in=pks)
+                    .annotate(actual=actual_count(counted, foreign_key))
+                    .exclude(**{field: F("actual")})
+                    .values_list("pk", flat=True)
+                )
+                if drifted:
+                    recount(model, drifted)
+            repaired[field] += len(drifted)
+    return repaired
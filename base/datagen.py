@@ -0,0 +1,364 @@
+"""
+Deterministic synthetic datasets, used to seed benchmarks and to
+reproduce production problems at scale.
+
+Rows get explicit primary keys following the existing ones, so every
+foreign key is known arithmetically and each table is written in
+independent chunks of ``CHUNK_SIZE`` rows. A chunk draws from its own
+random generator, seeded by ``seed``, table and position, so the data
+is the same however many workers write it; only timestamps depend on
+when it is generated.
+
+Chunks are written with ``COPY`` on PostgreSQL, spread over worker
+processes, and with batched ``INSERT`` elsewhere. Every user shares one
+precomputed password hash. No signal runs: counters are filled in up
+front, and sequences and the search index are reset at the end.
+"""
+
+import random
+import string
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from multiprocessing import get_context
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from base.bulk import batched
+from base.models import Application, Job, Organization, Staff, User, UserRoles
+from base.search import index_jobs
+
+ADMIN_EMAIL = "bench-admin@example.com"
+PASSWORD = "benchmark"
+EMAIL_DOMAIN = "example.com"
+CHUNK_SIZE = 20000
+INSERT_BATCH_SIZE = 500
+SIZE_SUFFIXES = {"k": 10**3, "m": 10**6}
+SALT_CHARS = string.ascii_letters + string.digits
+
+FIRST_NAMES = (
+    "Ada Amaka Bola Chidi Dayo Emeka Fatima Grace Hassan Ifeoma Jide Kemi "
+    "Lola Musa Ngozi Obi Precious Quadri Ronke Segun Tunde Uche Victor Wale "
+    "Yemi Zainab"
+).split()
+LAST_NAMES = (
+    "Adeyemi Balogun Chukwu Danjuma Eze Fashola Garba Ibrahim Johnson Kalu "
+    "Lawal Mohammed Nwosu Okafor Okonkwo Olawale Peters Sani Taiwo Usman"
+).split()
+LOCATIONS = (
+    "Lagos Abuja Ibadan Kano Enugu Port-Harcourt Accra Nairobi Kigali Remote"
+).split()
+ROLES = (
+    "Backend Engineer|Frontend Engineer|Data Analyst|Product Manager|"
+    "HR Officer|Accountant|Sales Executive|DevOps Engineer|Designer|"
+    "Customer Support Agent|Marketing Lead|QA Engineer"
+).split("|")
+SKILLS = (
+    "python django postgres react typescript excel sql kubernetes aws "
+    "figma recruiting payroll negotiation communication leadership "
+    "analytics marketing sales support testing docker linux"
+).split()
+
+
+def parse_size(value):
+    """Parse a row count such as ``5000``, ``10k`` or ``10m``."""
+    value = value.strip().lower()
+    multiplier = SIZE_SUFFIXES.get(value[-1:], 1)
+    return int(value.rstrip("".join(SIZE_SUFFIXES))) * multiplier
+
+
+def plan(applications):
+    """Row counts of the dataset holding ``applications`` applications."""
+    return {
+        "organizations": max(1, applications // 10000),
+        "staff_per_organization": 20,
+        "jobs": max(10, applications // 100),
+        "applicants": max(100, applications // 10),
+        "applications": applications,
+    }
+
+
+def words(rng, vocabulary, count):
+    return " ".join(rng.choice(vocabulary) for _ in range(count))
+
+
+def name(rng):
+    return "%s %s" % (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES))
+
+
+def make_salt(seed):
+    # As long as the hashers' own salts, or logins would upgrade the hash.
+    rng = random.Random(seed)
+    return "".join(rng.choice(SALT_CHARS) for _ in range(22))
+
+
+def ago(rng, now, min_days, max_days):
+    return now - timedelta(days=rng.uniform(min_days, max_days))
+
+
+class Table:
+    """
+    Writes full rows of ``model`` given the values of its ``varying``
+    fields, filling the others with their defaults, or ``now`` for
+    automatic timestamps.
+    """
+
+    def __init__(self, model, varying, now):
+        self.model = model
+        self.fields = model._meta.concrete_fields
+        self.template = [
+            (
+                now
+                if getattr(field, "auto_now", False)
+                or getattr(field, "auto_now_add", False)
+                else field.get_default()
+            )
+            for field in self.fields
+        ]
+        attnames = [field.attname for field in self.fields]
+        self.positions = [attnames.index(attname) for attname in varying]
+
+    def rows(self, rows, prepare=False):
+        """Full rows, adapted for the database driver if ``prepare``."""
+        template, positions = self.template, self.positions
+        if prepare:
+            # Resolved once: the connection proxy is slow in a tight loop.
+            db = connections[DEFAULT_DB_ALIAS]
+            template = [
+                field.get_db_prep_save(value, db)
+                for field, value in zip(self.fields, template)
+            ]
+            positions = [
+                (position, self.fields[position].get_db_prep_save)
+                for position in positions
+            ]
+            for values in rows:
+                row = list(template)
+                for (position, prep), value in zip(positions, values):
+                    row[position] = prep(value, db)
+                yield row
+            return
+
+        for values in rows:
+            row = list(template)
+            for position, value in zip(positions, values):
+                row[position] = value
+            yield row
+
+    def write(self, rows):
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        columns = ", ".join(quote(field.column) for field in self.fields)
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                sql = "COPY %s (%s) FROM STDIN" % (table, columns)
+                with cursor.copy(sql) as copy:
+                    for row in self.rows(rows):
+                        copy.write_row(row)
+                return
+
+            sql = "INSERT INTO %s (%s) VALUES (%s)" % (
+                table,
+                columns,
+                ", ".join(["%s"] * len(self.fields)),
+            )
+            for batch in batched(self.rows(rows, prepare=True), INSERT_BATCH_SIZE):
+                cursor.executemany(sql, batch)
+
+
+def user_rows(layout, rng, start, stop):
+    organizations, staff = layout["organizations"], layout["staff"]
+    for i in range(start, stop):
+        if i < organizations:
+            prefix, number, role = "bench-admin", i, UserRoles.ORG_ADMIN
+        elif i < organizations + staff:
+            prefix, number, role = "bench-staff", i - organizations, UserRoles.ORG_STAFF
+        else:
+            prefix, number, role = (
+                "bench-user",
+                i - organizations - staff,
+                UserRoles.USER,
+            )
+        email = "%s-%s@%s" % (prefix, number, EMAIL_DOMAIN) if i else ADMIN_EMAIL
+        yield layout["user"] + i, email, name(rng), role, layout["password"]
+
+
+def organization_rows(layout, rng, start, stop):
+    for i in range(start, stop):
+        yield (
+            layout["organization"] + i,
+            "%s %s" % (rng.choice(LAST_NAMES), rng.choice(["Ltd", "Inc"])),
+            rng.choice(LOCATIONS),
+            layout["user"] + i,
+            "gen%s-%s" % (layout["seed"], i),
+            layout["staff_per_organization"],
+        )
+
+
+def staff_rows(layout, rng, start, stop):
+    for i in range(start, stop):
+        yield (
+            layout["staff_member"] + i,
+            layout["user"] + layout["organizations"] + i,
+            layout["organization"] + i // layout["staff_per_organization"],
+        )
+
+
+def job_rows(layout, rng, start, stop):
+    # Application k goes to job k % jobs, so counts are known up front.
+    per_job, extra = divmod(layout["applications"], layout["jobs"])
+    for i in range(start, stop):
+        org = i % layout["organizations"]
+        is_open = rng.random() < 0.8
+        yield (
+            layout["job"] + i,
+            layout["user"] + org,
+            layout["organization"] + org,
+            rng.choice(ROLES),
+            "We are hiring. Skills: %s" % words(rng, SKILLS, 12),
+            ago(rng, layout["now"], 90, 365),
+            is_open,
+            None if is_open else ago(rng, layout["now"], 0, 90),
+            per_job + (i < extra),
+        )
+
+
+def application_rows(layout, rng, start, stop):
+    jobs, applicants = layout["jobs"], layout["applicants"]
+    first_applicant = layout["user"] + layout["organizations"] + layout["staff"]
+    # Distinct (applicant, job) pairs while applications <= jobs * applicants.
+    for k in range(start, stop):
+        yield (
+            layout["application"] + k,
+            first_applicant + (k // jobs) % applicants,
+            layout["job"] + k % jobs,
+            words(rng, SKILLS, 8),
+            ago(rng, layout["now"], 0, 90),
+        )
+
+
+# Tables in the order they are written, with the fields their rows set.
+TABLES = {
+    "user": (User, ["id", "email", "name", "role", "password"], user_rows),
+    "organization": (
+        Organization,
+        ["id", "name", "location", "admin_id", "staff_access_code", "staff_count"],
+        organization_rows,
+    ),
+    "staff_member": (Staff, ["id", "user_id", "organization_id"], staff_rows),
+    "job": (
+        Job,
+        [
+            "id",
+            "created_by_id",
+            "org_id_id",
+            "title",
+            "description",
+            "created",
+            "is_open",
+            "closed_at",
+            "application_count",
+        ],
+        job_rows,
+    ),
+    "application": (
+        Application,
+        ["id", "applicant_id_id", "job_id", "skill_description", "created"],
+        application_rows,
+    ),
+}
+# Tables of a phase only reference tables written in earlier phases.
+PHASES = [["user"], ["organization"], ["staff_member", "job"], ["application"]]
+
+
+def write_chunk(table, start, stop, layout):
+    """Write rows ``start`` to ``stop`` of ``table``, in any process."""
+    model, varying, rows = TABLES[table]
+    rng = random.Random("%s:%s:%s" % (layout["seed"], table, start))
+    with transaction.atomic():
+        Table(model, varying, layout["now"]).write(rows(layout, rng, start, stop))
+    return stop - start
+
+
+def setup_worker(settings_dict):
+    """
+    Set up Django in a spawned worker, connected to the database the
+    parent resolved, e.g. the test database rather than the one named in
+    settings.
+    """
+    django.setup()
+    connections[DEFAULT_DB_ALIAS].settings_dict = settings_dict
+
+
+def generate(applications, seed=0, workers=1, log=None):
+    """
+    Create the dataset described by ``plan(applications)``, from up to
+    ``workers`` processes on PostgreSQL. The first organization's admin
+    logs in as ``ADMIN_EMAIL``/``PASSWORD``. Returns the row counts.
+    """
+    if User.objects.filter(email=ADMIN_EMAIL).exists():
+        raise ValueError("Synthetic data has already been generated.")
+
+    log = log or (lambda message: None)
+    counts = plan(applications)
+    staff = counts["organizations"] * counts["staff_per_organization"]
+    sizes = {
+        "user": counts["organizations"] + staff + counts["applicants"],
+        "organization": counts["organizations"],
+        "staff_member": staff,
+        "job": counts["jobs"],
+        "application": applications,
+    }
+    layout = {
+        **counts,
+        "staff": staff,
+        "seed": seed,
+        "now": timezone.now(),
+        "password": make_password(PASSWORD, salt=make_salt(seed)),
+    }
+    # New rows take the primary keys following the existing ones.
+    for table, (model, varying, rows) in TABLES.items():
+        layout[table] = (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+    # Worker processes need their own connections to a database server.
+    executor = None
+    if workers > 1 and connection.vendor == "postgresql":
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=setup_worker,
+            initargs=(connection.settings_dict,),
+        )
+    try:
+        for phase in PHASES:
+            tasks = [
+                (table, start, min(start + CHUNK_SIZE, sizes[table]), layout)
+                for table in phase
+                for start in range(0, sizes[table], CHUNK_SIZE)
+            ]
+            if executor is None:
+                for task in tasks:
+                    write_chunk(*task)
+            else:
+                futures = [executor.submit(write_chunk, *task) for task in tasks]
+                for future in futures:
+                    future.result()
+            for table in phase:
+                log("%s: %s" % (table, sizes[table]))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    models = [model for model, varying, rows in TABLES.values()]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+    job_ids = range(layout["job"], layout["job"] + counts["jobs"])
+    for batch in batched(job_ids, CHUNK_SIZE):
+        index_jobs(batch)
+    return counts
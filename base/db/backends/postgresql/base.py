@@ -0,0 +1,134 @@
+"""
+PostgreSQL backend with an optional per-process psycopg connection pool.
+
+Enabled by a ``"pool"`` dict in the database ``OPTIONS``, passed to
+``psycopg_pool.ConnectionPool`` (``min_size``, ``max_size``,
+``max_lifetime``, ``max_idle``, ``timeout``, ...). Django "closes" the
+connection at the end of every request, WSGI or ASGI, which hands it
+back to the pool instead of tearing it down. The pool is thread-safe,
+so the threads ASGI runs sync code in share it too. With
+``CONN_HEALTH_CHECKS`` connections are checked before being handed out.
+"""
+
+import atexit
+import os
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresWrapper
+from psycopg import IsolationLevel
+from psycopg_pool import ConnectionPool
+
+
+class DatabaseWrapper(PostgresWrapper):
+    # Pools keyed by process, alias and connection settings; created
+    # lazily so that forked workers never share one, and rebuilt when the
+    # settings of an alias change.
+    _connection_pools = {}
+    _pools_lock = threading.Lock()
+    # Pool the current connection was taken from.
+    connection_pool = None
+
+    @property
+    def pool_options(self):
+        return self.settings_dict["OPTIONS"].get("pool")
+
+    def get_pool_key(self):
+        params = self.get_connection_params()
+        return (
+            os.getpid(),
+            self.alias,
+            repr(sorted(params.items())),
+            repr(sorted(self.pool_options.items())),
+        )
+
+    @property
+    def pool(self):
+        if not self.pool_options:
+            return None
+        key = self.get_pool_key()
+        pool = self._connection_pools.get(key)
+        if pool is not None:
+            return pool
+
+        with self._pools_lock:
+            if key not in self._connection_pools:
+                if self.settings_dict["CONN_MAX_AGE"]:
+                    raise ImproperlyConfigured(
+                        "Pooled connections cannot be persistent, set "
+                        "CONN_MAX_AGE to 0 for database '%s'." % self.alias
+                    )
+                self.discard_pools(key)
+                kwargs = self.get_connection_params()
+                # Django switches autocommit off and on itself.
+                kwargs["autocommit"] = True
+                check_connection = (
+                    ConnectionPool.check_connection
+                    if self.settings_dict["CONN_HEALTH_CHECKS"]
+                    else None
+                )
+                self._connection_pools[key] = ConnectionPool(
+                    kwargs=kwargs,
+                    open=False,
+                    check=check_connection,
+                    name=self.alias,
+                    **self.pool_options,
+                )
+            return self._connection_pools[key]
+
+    def discard_pools(self, key):
+        """Forget the pools ``key`` replaces; close them if they are ours."""
+        pid, alias = key[:2]
+        for stale in list(self._connection_pools):
+            if stale[0] != pid:
+                # Inherited across a fork: the parent still uses its
+                # connections, so only drop the copy.
+                del self._connection_pools[stale]
+            elif stale[1] == alias:
+                self._connection_pools.pop(stale).close()
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("pool", None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        isolation_level = self.settings_dict["OPTIONS"].get("isolation_level")
+        self.isolation_level = IsolationLevel(
+            IsolationLevel.READ_COMMITTED
+            if isolation_level is None
+            else isolation_level
+        )
+        pool.open()
+        connection = pool.getconn()
+        self.connection_pool = pool
+        if isolation_level is not None:
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        pool = self.connection_pool
+        if self.connection is None or pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            # Rolls back anything left open and makes it available again,
+            # or closes it if its pool has been replaced since.
+            pool.putconn(self.connection)
+            self.connection = None
+            self.connection_pool = None
+
+    @classmethod
+    def close_pools(cls):
+        """Close every pool of this process, run when the worker exits."""
+        with cls._pools_lock:
+            for (pid, *_), pool in cls._connection_pools.items():
+                if pid == os.getpid():
+                    pool.close()
+            cls._connection_pools.clear()
+
+
+atexit.register(DatabaseWrapper.close_pools)
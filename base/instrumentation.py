@@ -0,0 +1,275 @@
+"""
+Per-request performance instrumentation.
+
+``InstrumentationMiddleware`` times every request and breaks the time
+down into SQL (count and duration, recorded by a database execute
+wrapper), authentication and JSON rendering, the latter two measured
+where they happen with ``timed``. The breakdown is sent back in a
+``Server-Timing`` header if ``INSTRUMENTATION["SERVER_TIMING"]`` is on,
+logged as one JSON line per request, with the SQL of requests slower
+than ``INSTRUMENTATION["SLOW_REQUEST_MS"]``, and folded into
+per-endpoint latency histograms served by the internal metrics endpoint.
+"""
+
+import contextlib
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in milliseconds.
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+PERCENTILES = (50, 95, 99)
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Time spent by one request, in seconds, per part."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = None
+        self.parts = {"db": 0.0, "auth": 0.0, "render": 0.0}
+        self.queries = []
+
+    def add_query(self, sql, duration):
+        self.parts["db"] += duration
+        self.queries.append((sql, duration))
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        return self
+
+    def server_timing(self):
+        entries = ["total;dur=%.1f" % (self.total * 1000)]
+        for name, duration in self.parts.items():
+            entry = "%s;dur=%.1f" % (name, duration * 1000)
+            if name == "db":
+                entry += ';desc="%s queries"' % len(self.queries)
+            entries.append(entry)
+        return ", ".join(entries)
+
+    def as_dict(self):
+        record = {"total_ms": round(self.total * 1000, 2), "queries": len(self.queries)}
+        for name, duration in self.parts.items():
+            record["%s_ms" % name] = round(duration * 1000, 2)
+        return record
+
+
+@contextlib.contextmanager
+def timed(name):
+    """Add the time spent in the block, or decorated call, to ``name``."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.parts[name] += time.perf_counter() - started
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper timing queries run for the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+class Histogram:
+    """Latency histogram over ``BUCKETS``, plus an overflow bucket."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        position = len(BUCKETS)
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                position = i
+                break
+        self.counts[position] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """Upper bound of the bucket holding the ``percent``-th percentile."""
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        snapshot = {
+            "count": self.count,
+            "sum_ms": round(self.sum, 2),
+            "max_ms": round(self.max, 2),
+            "buckets": {
+                **{str(bound): count for bound, count in zip(BUCKETS, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
+        for percent in PERCENTILES:
+            snapshot["p%s_ms" % percent] = self.percentile(percent)
+        return snapshot
+
+
+class EndpointMetrics:
+    """Per-process latency histograms and totals per ``METHOD route``."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def observe(self, endpoint, metrics, status_code):
+        with self.lock:
+            entry = self.endpoints.get(endpoint)
+            if entry is None:
+                entry = self.endpoints[endpoint] = {
+                    "latency": Histogram(),
+                    "errors": 0,
+                    "queries": 0,
+                    "db_ms": 0.0,
+                }
+            entry["latency"].observe(metrics.total * 1000)
+            entry["errors"] += status_code >= 500
+            entry["queries"] += len(metrics.queries)
+            entry["db_ms"] += metrics.parts["db"] * 1000
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                endpoint: {
+                    **entry["latency"].snapshot(),
+                    "errors": entry["errors"],
+                    "queries": entry["queries"],
+                    "db_ms": round(entry["db_ms"], 2),
+                }
+                for endpoint, entry in sorted(self.endpoints.items())
+            }
+
+    def clear(self):
+        with self.lock:
+            self.endpoints.clear()
+
+
+endpoint_metrics = EndpointMetrics()
+
+
+def get_endpoint(request):
+    match = getattr(request, "resolver_match", None)
+    route = match.route if match is not None else "<unmatched>"
+    return "%s %s" % (request.method, route)
+
+
+class InstrumentationMiddleware:
+    """Measure each request, see the module docstring."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.INSTRUMENTATION["ENABLED"]:
+            return self.get_response(request)
+
+        # Connections opened before this module was loaded missed the signal.
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, metrics.finish())
+
+    async def __acall__(self, request):
+        if not settings.INSTRUMENTATION["ENABLED"]:
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, metrics.finish())
+
+    def report(self, request, response, metrics):
+        config = settings.INSTRUMENTATION
+        if config["SERVER_TIMING"]:
+            response["Server-Timing"] = metrics.server_timing()
+
+        endpoint = get_endpoint(request)
+        endpoint_metrics.observe(endpoint, metrics, response.status_code)
+
+        record = {
+            "endpoint": endpoint,
+            "path": request.path,
+            "status": response.status_code,
+            **metrics.as_dict(),
+        }
+        if metrics.total * 1000 >= config["SLOW_REQUEST_MS"]:
+            slowest = sorted(metrics.queries, key=lambda query: -query[1])
+            record["sql"] = [
+                {"sql": sql, "ms": round(duration * 1000, 2)}
+                for sql, duration in slowest[: config["SLOW_REQUEST_MAX_QUERIES"]]
+            ]
+            logger.warning("slow request %s", json.dumps(record))
+        elif logger.isEnabledFor(logging.INFO):
+            logger.info("request %s", json.dumps(record))
+        return response
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer timing its rendering as ``render``."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed("render"):
+            return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,145 @@
+"""
+Credential checks shared by ``UserLoginView`` and the async login view.
+
+A login reads the user and their token in one query, checks the password
+once and writes at most ``last_login``, and only when the stored value is
+older than ``LOGIN["LAST_LOGIN_INTERVAL"]`` seconds. A hash made with an
+outdated hasher or iteration count is upgraded in the hashing thread
+pool after the response, rather than while the client waits.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.db import connections
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from base import tokens
+from base.models import User
+
+logger = logging.getLogger(__name__)
+
+_hash_executor = None
+# Hash upgrades not finished yet.
+pending_rehashes = set()
+
+
+def get_hash_executor():
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=settings.LOGIN["HASH_WORKERS"],
+            thread_name_prefix="password-hash",
+        )
+    return _hash_executor
+
+
+def get_users():
+    # The token, when there is one, comes with the user.
+    return User.objects.select_related("auth_token")
+
+
+def rehash(user_id, encoded, password):
+    """Replace ``encoded`` with a hash by the current hasher, if unchanged."""
+    try:
+        User.objects.filter(pk=user_id, password=encoded).update(
+            password=hashers.make_password(password)
+        )
+    except Exception:
+        logger.exception("Could not upgrade the password hash of user %s", user_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_rehash(user, password):
+    future = get_hash_executor().submit(rehash, user.pk, user.password, password)
+    pending_rehashes.add(future)
+    future.add_done_callback(pending_rehashes.discard)
+
+
+def verify_password(user, password):
+    """
+    Check ``password`` like ``User.check_password`` does, but upgrade an
+    outdated hash in the background.
+    """
+    return hashers.check_password(
+        password,
+        user.password,
+        lambda password: schedule_rehash(user, password),
+    )
+
+
+def hash_unknown(password):
+    """
+    Hash ``password`` for an email nobody has, so the response takes as
+    long as for a wrong password and does not tell which emails exist.
+    """
+    User().set_password(password)
+
+
+def last_login_due(user, now):
+    interval = timedelta(seconds=settings.LOGIN["LAST_LOGIN_INTERVAL"])
+    return user.last_login is None or now - user.last_login >= interval
+
+
+def authenticate(email, password):
+    """Return the user with these credentials, or None."""
+    user = get_users().filter(email=email).first()
+    if user is None:
+        hash_unknown(password)
+        return None
+    if not verify_password(user, password):
+        return None
+
+    now = timezone.now()
+    if last_login_due(user, now):
+        # An update sends no post_save, which would evict cached tokens.
+        User.objects.filter(pk=user.pk).update(last_login=now)
+        user.last_login = now
+    return user
+
+
+async def aauthenticate(email, password):
+    """``authenticate`` checking the password in the hashing thread pool."""
+    user = await get_users().filter(email=email).afirst()
+    loop = asyncio.get_running_loop()
+    if user is None:
+        await loop.run_in_executor(get_hash_executor(), hash_unknown, password)
+        return None
+    valid = await loop.run_in_executor(
+        get_hash_executor(), verify_password, user, password
+    )
+    if not valid:
+        return None
+
+    now = timezone.now()
+    if last_login_due(user, now):
+        await User.objects.filter(pk=user.pk).aupdate(last_login=now)
+        user.last_login = now
+    return user
+
+
+def get_credentials(user):
+    if settings.SIGNED_TOKENS["ENABLED"]:
+        return tokens.issue_token_pair(user)
+    try:
+        token = user.auth_token
+    except Token.DoesNotExist:
+        token, created = Token.objects.get_or_create(user=user)
+    return {"token": token.key}
+
+
+async def aget_credentials(user):
+    if settings.SIGNED_TOKENS["ENABLED"]:
+        return await sync_to_async(tokens.issue_token_pair)(user)
+    try:
+        token = user.auth_token
+    except Token.DoesNotExist:
+        token, created = await Token.objects.aget_or_create(user=user)
+    return {"token": token.key}
@@ -0,0 +1,129 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from base import benchmarks
+from base.datagen import generate, parse_size
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API endpoints on a seeded dataset through the Django "
+        "test client or, with --url, a running server, and compare the "
+        "results with a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            metavar="SIZE",
+            help="First generate a dataset of SIZE applications, e.g. 10k or 1m.",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            help="Scenario to run, repeatable. Defaults to all of them.",
+        )
+        parser.add_argument("--url", help="Load this running server over HTTP instead.")
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=200,
+            help="Requests per scenario through the test client.",
+        )
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--processes", type=int, default=4)
+        parser.add_argument(
+            "--duration", type=float, default=10, help="Seconds per scenario."
+        )
+        parser.add_argument("--warmup", type=float, default=2)
+        parser.add_argument("--save", help="Write the results to this JSON file.")
+        parser.add_argument(
+            "--baseline", help="Fail on regressions against this results file."
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed slowdown against the baseline, as a fraction.",
+        )
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            try:
+                size = parse_size(options["seed"])
+            except ValueError:
+                raise CommandError("Invalid dataset size: %s" % (options["seed"]))
+            try:
+                counts = generate(size, log=self.stdout.write)
+            except ValueError as e:
+                self.stdout.write(self.style.WARNING("%s Skipping --seed." % (e)))
+            else:
+                self.stdout.write(self.style.SUCCESS("seeded: %s" % (counts)))
+
+        scenarios = benchmarks.get_scenarios()
+        for name in options["scenario"] or []:
+            if name not in scenarios:
+                raise CommandError(
+                    "Unknown scenario %s, choose from: %s"
+                    % (name, ", ".join(scenarios))
+                )
+        if options["scenario"]:
+            scenarios = {name: scenarios[name] for name in options["scenario"]}
+
+        driver = "http" if options["url"] else "client"
+        if options["url"]:
+            results = benchmarks.run_http(
+                options["url"].rstrip("/"),
+                scenarios,
+                options["concurrency"],
+                options["duration"],
+                warmup=options["warmup"],
+                processes=options["processes"],
+            )
+        else:
+            results = benchmarks.run_client(scenarios, options["iterations"])
+        self.report(results)
+
+        if options["save"]:
+            with open(options["save"], "w") as f:
+                json.dump({"driver": driver, "scenarios": results}, f, indent=2)
+
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+            if baseline["driver"] != driver:
+                raise CommandError(
+                    "The baseline was recorded with the %s driver, not %s."
+                    % (baseline["driver"], driver)
+                )
+            regressions = benchmarks.compare(
+                results, baseline["scenarios"], options["tolerance"]
+            )
+            for name, metric, old, new in regressions:
+                self.stdout.write(
+                    self.style.ERROR("%s %s: %.1f -> %.1f" % (name, metric, old, new))
+                )
+            if regressions:
+                raise CommandError(
+                    "%s regression(s) against %s"
+                    % (len(regressions), options["baseline"])
+                )
+            self.stdout.write(self.style.SUCCESS("No regressions."))
+
+    def report(self, results):
+        columns = ["rps"] + ["p%s_ms" % p for p in benchmarks.PERCENTILES]
+        columns.append("queries")
+        self.stdout.write(
+            "%-18s %9s %9s %9s %9s %9s %9s %9s"
+            % ("scenario", "requests", *columns, "errors")
+        )
+        for name, summary in results.items():
+            values = [
+                "-" if summary[column] is None else "%.1f" % summary[column]
+                for column in columns
+            ]
+            self.stdout.write(
+                "%-18s %9d %9s %9s %9s %9s %9s %9d"
+                % (name, summary["requests"], *values, summary["errors"])
+            )
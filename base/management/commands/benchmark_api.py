@@ -0,0 +1,91 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from base.benchmarks import PERCENTILES, run_load
+
+DEFAULT_PATHS = ["/v1/core/api/jobs/create/"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load running API servers with the same requests and compare their "
+        "throughput and latencies, e.g. the WSGI and ASGI (ASYNC_API) "
+        "deployments: --target wsgi=http://localhost:8000 "
+        "--target asgi=http://localhost:8001"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            action="append",
+            required=True,
+            help="NAME=BASE_URL of a server to benchmark, repeatable.",
+        )
+        parser.add_argument(
+            "--path",
+            action="append",
+            help="Path to GET, repeatable. Defaults to the job list.",
+        )
+        parser.add_argument(
+            "--login",
+            nargs=2,
+            metavar=("EMAIL", "PASSWORD"),
+            help="Also POST these credentials to the login endpoint.",
+        )
+        parser.add_argument(
+            "--header",
+            action="append",
+            default=[],
+            help='Extra request header, e.g. "Authorization: Token <key>".',
+        )
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--duration", type=float, default=10)
+        parser.add_argument("--warmup", type=float, default=2)
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options["target"]:
+            name, sep, url = target.partition("=")
+            if not sep:
+                raise CommandError("--target must be NAME=BASE_URL: %s" % (target))
+            targets.append((name, url.rstrip("/")))
+
+        headers = {}
+        for header in options["header"]:
+            name, sep, value = header.partition(":")
+            if not sep:
+                raise CommandError("--header must be NAME: VALUE: %s" % (header))
+            headers[name.strip()] = value.strip()
+
+        requests = [("GET", path, None) for path in options["path"] or DEFAULT_PATHS]
+        if options["login"]:
+            email, password = options["login"]
+            body = json.dumps({"email": email, "password": password})
+            requests.append(("POST", "/v1/core/api/account/login", body))
+
+        columns = ["rps"] + ["p%s_ms" % percent for percent in PERCENTILES]
+        self.stdout.write(
+            "%-10s %9s %9s %9s %9s %9s %9s" % ("target", "requests", *columns, "errors")
+        )
+        for name, url in targets:
+            summary = run_load(
+                url,
+                requests,
+                options["concurrency"],
+                options["duration"],
+                headers=headers,
+                warmup=options["warmup"],
+            )
+            self.stdout.write(
+                "%-10s %9d %9s %9s %9s %9s %9d"
+                % (
+                    name,
+                    summary["requests"],
+                    *(
+                        "-" if summary[column] is None else "%.1f" % summary[column]
+                        for column in columns
+                    ),
+                    summary["errors"],
+                )
+            )
@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from base.bulk import close_expired_jobs
+
+
+class Command(BaseCommand):
+    help = "Close open jobs whose closing date has passed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep running every --interval."
+        )
+        parser.add_argument("--interval", type=int, help="Seconds between runs.")
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        interval = options["interval"] or settings.JOB_EXPIRY["INTERVAL"]
+        while True:
+            closed = close_expired_jobs(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS("closed: %s" % (closed)))
+            if not options["loop"]:
+                return
+            time.sleep(interval)
@@ -0,0 +1,53 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from base.datagen import generate, parse_size, plan
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a deterministic synthetic dataset of organizations, staff, "
+        "jobs and applications, e.g. --applications 10m for load testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--applications",
+            metavar="SIZE",
+            default="10k",
+            help="Number of applications, e.g. 5000, 10k or 10m.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Writer processes, PostgreSQL only.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            size = parse_size(options["applications"])
+        except ValueError:
+            raise CommandError("Invalid dataset size: %s" % (options["applications"]))
+
+        self.stdout.write("plan: %s" % (plan(size)))
+        started = time.perf_counter()
+        try:
+            counts = generate(
+                size,
+                seed=options["seed"],
+                workers=options["workers"],
+                log=self.stdout.write,
+            )
+        except ValueError as e:
+            raise CommandError(e)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                "generated %s applications in %.1fs (%.0f/s)"
+                % (counts["applications"], elapsed, counts["applications"] / elapsed)
+            )
+        )
@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from base.bulk import IMPORT_FORMATS, READ_ERRORS, import_staff, read_rows
+from base.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users from a CSV/NDJSON file and add them as staff of an organization."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", help="CSV or NDJSON file of email,name[,password,role]."
+        )
+        parser.add_argument("--org", type=int, required=True, help="Organization id.")
+        parser.add_argument("--file-format", choices=IMPORT_FORMATS)
+        parser.add_argument("--workers", type=int, help="Password hashing processes.")
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        try:
+            organization = Organization.objects.get(pk=options["org"])
+        except Organization.DoesNotExist:
+            raise CommandError("No organization with id: %s" % options["org"])
+
+        path = options["path"]
+        file_format = options["file_format"] or (
+            "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+        )
+        with open(path, "rb") as stream:
+            try:
+                report = import_staff(
+                    organization,
+                    read_rows(stream, file_format),
+                    workers=options["workers"],
+                    batch_size=options["batch_size"],
+                )
+            except READ_ERRORS as e:
+                # Batches before the bad row are already imported.
+                raise CommandError("Could not read %s: %s" % (path, e))
+
+        for entry in report["errors"] + report["skips"]:
+            self.stderr.write(json.dumps(entry))
+        self.stdout.write(
+            self.style.SUCCESS(
+                "created: %(created)s, skipped: %(skipped)s, failed: %(failed)s"
+                % report
+            )
+        )
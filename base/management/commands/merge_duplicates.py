@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Min
+from django.utils.crypto import get_random_string
+
+from base.models import Application, Organization, Staff
+
+
+def get_duplicates():
+    """``(model, fields)`` of every unique constraint to clean up for."""
+    return [
+        (Staff, ["user", "organization"]),
+        (Application, ["applicant_id", "job"]),
+    ]
+
+
+def merge_duplicates(model, fields):
+    """
+    Keep the oldest row of every group of ``model`` rows sharing
+    ``fields`` and delete the rest. Returns the number of rows deleted.
+
+    Runs before ``migrate``, when the counter columns and the tombstone
+    table may not exist yet, so rows are deleted without signals and
+    only columns of the first schema are read; ``reconcile_counters``
+    recounts after the migration.
+    """
+    if model._meta.db_table not in connection.introspection.table_names():
+        return 0
+
+    groups = (
+        model.objects.values(*fields)
+        .annotate(keep=Min("pk"), rows=Count("pk"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    deleted = 0
+    for group in groups:
+        keep = group.pop("keep")
+        del group["rows"]
+        with transaction.atomic():
+            duplicates = model.objects.filter(**group).exclude(pk=keep)
+            if model is Staff and duplicates.filter(exit_date=None).exists():
+                # Still employed through one of the duplicates.
+                Staff.objects.filter(pk=keep).update(exit_date=None)
+            # Nothing references these rows, so there is nothing to cascade.
+            deleted += duplicates._raw_delete(duplicates.db)
+    return deleted
+
+
+def merge_access_codes():
+    """
+    Give every organization but the oldest sharing a staff access code a
+    new one, so the code can become unique. New codes keep the old length
+    to fit the column as it is before ``migrate``; rotate_access_codes
+    replaces short codes afterwards. Returns the number of codes replaced.
+    """
+    if Organization._meta.db_table not in connection.introspection.table_names():
+        return 0
+
+    seen, clashes = set(), []
+    codes = Organization.objects.order_by("pk").values_list("pk", "staff_access_code")
+    for pk, code in codes.iterator():
+        if code in seen:
+            clashes.append((pk, len(code)))
+        seen.add(code)
+
+    for pk, length in clashes:
+        code = None
+        while code is None or code in seen:
+            code = get_random_string(
+                length, allowed_chars=settings.STAFF_ACCESS_CODE["ALPHABET"]
+            )
+        seen.add(code)
+        Organization.objects.filter(pk=pk).update(staff_access_code=code)
+    return len(clashes)
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge duplicate staff and application rows and staff access codes. "
+        "Run before the migration adding their unique constraints, which fails "
+        "while duplicates exist."
+    )
+
+    def handle(self, *args, **options):
+        merged = {
+            model._meta.model_name: merge_duplicates(model, fields)
+            for model, fields in get_duplicates()
+        }
+        merged["staff_access_code"] = merge_access_codes()
+        self.stdout.write(
+            self.style.SUCCESS(
+                ", ".join("%s: %s" % (name, n) for name, n in merged.items())
+            )
+        )
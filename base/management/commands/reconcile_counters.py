@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from base.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = "Repair application and staff counters that drifted from the rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        repaired = reconcile(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                ", ".join("%s: %s" % (field, n) for field, n in repaired.items())
+            )
+        )
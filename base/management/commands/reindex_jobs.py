@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from base.search import reindex_jobs
+
+
+class Command(BaseCommand):
+    help = "Add jobs missing from the full-text search index, or rebuild it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--rebuild", action="store_true", help="Reindex every job.")
+
+    def handle(self, *args, **options):
+        indexed = reindex_jobs(
+            batch_size=options["batch_size"], rebuild=options["rebuild"]
+        )
+        self.stdout.write(self.style.SUCCESS("indexed: %s" % (indexed)))
@@ -0,0 +1,58 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from base.analytics import rollup, rollup_recent
+
+# Days recomputed per transaction when rebuilding a range.
+CHUNK_DAYS = 31
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily analytics rollups of the last few days, or of "
+        "every day since --since."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="Rebuild from this date (YYYY-MM-DD).")
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep running every --interval."
+        )
+        parser.add_argument("--interval", type=int, help="Seconds between runs.")
+
+    def handle(self, *args, **options):
+        if options["since"]:
+            since = parse_date(options["since"])
+            if since is None:
+                raise CommandError("Invalid date: %s" % options["since"])
+            self.rebuild(since)
+            return
+
+        interval = options["interval"] or settings.ANALYTICS["INTERVAL"]
+        while True:
+            written = rollup_recent()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "organizations: %(organizations)s, jobs: %(jobs)s" % written
+                )
+            )
+            if not options["loop"]:
+                return
+            time.sleep(interval)
+
+    def rebuild(self, since):
+        end = timezone.localdate() + timedelta(days=1)
+        while since < end:
+            until = min(since + timedelta(days=CHUNK_DAYS), end)
+            written = rollup(since, until)
+            self.stdout.write(
+                "%s..%s organizations: %s, jobs: %s"
+                % (since, until, written["organizations"], written["jobs"])
+            )
+            since = until
+        self.stdout.write(self.style.SUCCESS("done"))
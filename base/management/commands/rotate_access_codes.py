@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Length
+
+from base.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Replace staff access codes shorter than STAFF_ACCESS_CODE['LENGTH'], "
+        "e.g. the guessable three character codes of older versions, with "
+        "codes that expire after STAFF_ACCESS_CODE['TTL']."
+    )
+
+    def handle(self, *args, **options):
+        organizations = (
+            Organization.objects.annotate(code_length=Length("staff_access_code"))
+            .filter(code_length__lt=settings.STAFF_ACCESS_CODE["LENGTH"])
+            .order_by("pk")
+        )
+        rotated = 0
+        for organization in organizations.iterator():
+            organization.rotate_staff_access_code()
+            rotated += 1
+        self.stdout.write(self.style.SUCCESS("rotated: %s" % (rotated)))
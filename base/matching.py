@@ -0,0 +1,285 @@
+"""
+TF-IDF matching between job descriptions and applicants' skill
+descriptions.
+
+Texts are turned into sparse term-count rows by feature hashing, so
+there is no vocabulary to rebuild: indexing a new document appends one
+row and bumps the document frequencies. Ranking a corpus against a query
+is a couple of sparse matrix-vector products, whatever its size.
+
+Indexes live in the process that built them and are topped up from the
+database on every query using the ``modified`` column and the delta sync
+tombstones, so rows written by other workers are picked up without a
+full rebuild.
+"""
+
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from scipy import sparse
+
+from base.models import Application, Job, Tombstone, TombstoneKinds
+
+N_FEATURES = 2**18
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have i in is it my of on or "
+    "our that the their this to was we were will with you your".split()
+)
+
+
+def vectorize(texts):
+    """Return a CSR matrix of sublinear hashed term counts, one row per text."""
+    indptr, indices, data = [0], [], []
+    for text in texts:
+        counts = {}
+        for token in TOKEN_RE.findall(text.lower()):
+            if token in STOP_WORDS:
+                continue
+            feature = zlib.crc32(token.encode()) % N_FEATURES
+            counts[feature] = counts.get(feature, 0) + 1
+        indices.extend(counts.keys())
+        data.extend(counts.values())
+        indptr.append(len(indices))
+
+    return sparse.csr_matrix(
+        (
+            np.log1p(np.array(data, dtype=np.float32)),
+            np.array(indices, dtype=np.int32),
+            np.array(indptr, dtype=np.int64),
+        ),
+        shape=(len(texts), N_FEATURES),
+    )
+
+
+class MatchIndex:
+    """
+    Incrementally maintained TF-IDF index of documents keyed by id.
+
+    Replaced or removed documents are masked out and physically dropped
+    once they make up a quarter of the rows.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.keys = np.empty(0, dtype=np.int64)
+        self.alive = np.empty(0, dtype=bool)
+        self.matrix = sparse.csr_matrix((0, N_FEATURES), dtype=np.float32)
+        self.squared = self.matrix
+        # Document frequency of the features in use: a dense array over
+        # all N_FEATURES would cost 1 MiB per index.
+        self.df = {}
+        self.positions = {}
+        self.versions = {}
+        self.pending = []
+        # Latest ``modified`` indexed and time of the last tombstone check.
+        self.watermark = None
+        self.checked = None
+
+    def __len__(self):
+        return len(self.versions)
+
+    def add(self, documents):
+        """Index ``(key, version, text)`` documents, replacing older versions."""
+        documents = [
+            (key, version, text)
+            for key, version, text in documents
+            if self.versions.get(key) != version
+        ]
+        if not documents:
+            return
+
+        self.remove(key for key, _, _ in documents if key in self.versions)
+        rows = vectorize([text for _, _, text in documents])
+        features, counts = np.unique(rows.indices, return_counts=True)
+        for feature, count in zip(features.tolist(), counts.tolist()):
+            self.df[feature] = self.df.get(feature, 0) + count
+        keys = np.array([key for key, _, _ in documents], dtype=np.int64)
+        self.pending.append((keys, rows))
+        for key, version, _ in documents:
+            self.versions[key] = version
+
+    def remove(self, keys):
+        if self.pending:
+            self.compact()
+        for key in keys:
+            position = self.positions.pop(key, None)
+            self.versions.pop(key, None)
+            if position is not None:
+                self.alive[position] = False
+                start, end = self.matrix.indptr[position : position + 2]
+                for feature in self.matrix.indices[start:end].tolist():
+                    if self.df[feature] == 1:
+                        del self.df[feature]
+                    else:
+                        self.df[feature] -= 1
+
+    def compact(self):
+        """Fold pending rows into the matrix and drop masked-out rows."""
+        changed = False
+        if self.pending:
+            offset = len(self.keys)
+            self.keys = np.concatenate([self.keys] + [k for k, _ in self.pending])
+            self.matrix = sparse.vstack(
+                [self.matrix] + [rows for _, rows in self.pending], format="csr"
+            )
+            self.alive = np.concatenate(
+                [self.alive, np.ones(len(self.keys) - offset, dtype=bool)]
+            )
+            for position in range(offset, len(self.keys)):
+                self.positions[int(self.keys[position])] = position
+            self.pending = []
+            changed = True
+
+        if self.alive.sum() * 4 < len(self.alive) * 3:
+            self.keys = self.keys[self.alive]
+            self.matrix = self.matrix[self.alive]
+            self.alive = np.ones(len(self.keys), dtype=bool)
+            self.positions = {int(key): i for i, key in enumerate(self.keys)}
+            changed = True
+
+        if changed:
+            self.squared = self.matrix.multiply(self.matrix).tocsr()
+
+    def score(self, text, top_k):
+        """Return up to ``top_k`` ``(key, cosine similarity)`` pairs, best first."""
+        self.compact()
+        n_docs = len(self.versions)
+        if n_docs == 0:
+            return []
+
+        idf = np.full(N_FEATURES, np.log(1 + n_docs) + 1, dtype=np.float32)
+        features = np.fromiter(self.df, dtype=np.int64, count=len(self.df))
+        df = np.fromiter(self.df.values(), dtype=np.float32, count=len(self.df))
+        idf[features] = np.log((1 + n_docs) / (1 + df)) + 1
+        query = vectorize([text])
+        weights = np.zeros(N_FEATURES, dtype=np.float32)
+        weights[query.indices] = query.data * idf[query.indices]
+        query_norm = np.linalg.norm(weights)
+        if query_norm == 0:
+            return []
+
+        # cosine(d, q) = sum_j d_j idf_j q_j idf_j / (|d * idf| |q * idf|)
+        dots = self.matrix @ (weights * idf)
+        norms = np.sqrt(self.squared @ (idf * idf)) * query_norm
+        scores = np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+        scores[~self.alive] = 0
+
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(self.keys[i]), float(scores[i])) for i in best if scores[i] > 0]
+
+
+class MatchingEngine:
+    """
+    Per-process registry of the open job index and one application
+    index per job, the latter bounded by ``MATCHING["MAX_JOB_INDEXES"]``.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.job_index = MatchIndex()
+        self.application_indexes = OrderedDict()
+
+    def get_application_index(self, job_id):
+        with self.lock:
+            index = self.application_indexes.get(job_id)
+            if index is None:
+                index = self.application_indexes[job_id] = MatchIndex()
+            self.application_indexes.move_to_end(job_id)
+            while len(self.application_indexes) > settings.MATCHING["MAX_JOB_INDEXES"]:
+                self.application_indexes.popitem(last=False)
+            return index
+
+    def changed_since(self, queryset, index):
+        # Re-read a short overlap so rows committed late are not skipped;
+        # unchanged versions are ignored by MatchIndex.add.
+        if index.watermark is not None:
+            queryset = queryset.filter(modified__gte=index.watermark - self.lag)
+        return queryset.order_by("modified").iterator(
+            chunk_size=settings.MATCHING["CHUNK_SIZE"]
+        )
+
+    def deleted_since(self, tombstones, index):
+        checked, index.checked = index.checked, timezone.now()
+        if checked is None:
+            return []
+        return tombstones.filter(deleted__gte=checked - self.lag).values_list(
+            "object_id", flat=True
+        )
+
+    @property
+    def lag(self):
+        return timedelta(seconds=settings.SYNC_WATERMARK_LAG)
+
+    def refresh_applications(self, index, job):
+        index.remove(
+            self.deleted_since(
+                Tombstone.objects.filter(
+                    organization_id=job.org_id_id, kind=TombstoneKinds.APPLICATION
+                ),
+                index,
+            )
+        )
+
+        queryset = Application.objects.filter(job=job).values_list(
+            "id", "modified", "skill_description"
+        )
+        batch = []
+        for row in self.changed_since(queryset, index):
+            batch.append(row)
+            index.watermark = row[1]
+            if len(batch) >= settings.MATCHING["CHUNK_SIZE"]:
+                index.add(batch)
+                batch = []
+        index.add(batch)
+
+    def refresh_jobs(self, index):
+        index.remove(
+            self.deleted_since(Tombstone.objects.filter(kind=TombstoneKinds.JOB), index)
+        )
+
+        queryset = Job.objects.values_list(
+            "id", "modified", "title", "description", "is_open"
+        )
+        if index.watermark is None:
+            queryset = queryset.filter(is_open=True)
+
+        opened, closed = [], []
+        for key, modified, title, description, is_open in self.changed_since(
+            queryset, index
+        ):
+            index.watermark = modified
+            if is_open:
+                opened.append((key, modified, "%s %s" % (title, description)))
+            else:
+                closed.append(key)
+        index.remove(closed)
+        index.add(opened)
+
+    def rank_applications(self, job, top_k):
+        """Rank a job's applications by how well they match the job."""
+        index = self.get_application_index(job.pk)
+        with index.lock:
+            self.refresh_applications(index, job)
+            return index.score("%s %s" % (job.title, job.description), top_k)
+
+    def rank_jobs(self, text, top_k):
+        """Rank open jobs by how well they match ``text``."""
+        index = self.job_index
+        with index.lock:
+            self.refresh_jobs(index)
+            return index.score(text, top_k)
+
+
+engine = MatchingEngine()
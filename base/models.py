@@ -1,11 +1,16 @@
-from django.db import models
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import (
     BaseUserManager,
     AbstractBaseUser,
     PermissionsMixin,
 )
 
-from base.utils import gen_staff_access_code
+from base.utils import gen_staff_access_code, gen_staff_access_code_expiry
 
 
 class UserManager(BaseUserManager):
@@ -63,7 +68,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     role = models.CharField(
         max_length=50, default=UserRoles.USER, choices=UserRoles.choices
     )
-    last_login = models.DateTimeField(verbose_name="last login", auto_now=True)
+    # Written by base.login, at most every LOGIN["LAST_LOGIN_INTERVAL"].
+    last_login = models.DateTimeField(verbose_name="last login", blank=True, null=True)
     is_active = models.BooleanField(default=True)
     is_admin = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
@@ -100,6 +106,18 @@ class Staff(models.Model):
 
     class Meta:
         verbose_name_plural = "Staff"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "organization"], name="staff_user_org_uniq"
+            ),
+        ]
+        indexes = [
+            # Serves the org staff list and its MAX(modified) validator.
+            models.Index(
+                fields=["organization", "modified"],
+                name="staff_org_modified_idx",
+            ),
+        ]
 
     def __str__(self):
         return "Staff: %s" % (self.user.name)
@@ -112,13 +130,70 @@ class Organization(models.Model):
     admin = models.ForeignKey(
         to="User", related_name="user_org", on_delete=models.CASCADE
     )
-    staff_access_code = models.CharField(max_length=3, default=gen_staff_access_code)
+    staff_access_code = models.CharField(
+        max_length=32, unique=True, default=gen_staff_access_code
+    )
+    # Staff can no longer join with the code after this, None never expires.
+    staff_access_code_expires = models.DateTimeField(
+        null=True, blank=True, default=gen_staff_access_code_expiry
+    )
+    # Maintained by base.counters.
+    staff_count = models.PositiveIntegerField(default=0)
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
 
+    # Fields copied into the search document of the organization's jobs.
+    SEARCH_FIELDS = ("name", "location")
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.indexed_values = instance.get_search_values()
+        return instance
+
+    def get_search_values(self):
+        # Deferred fields read as None instead of being fetched.
+        return tuple(self.__dict__.get(field) for field in self.SEARCH_FIELDS)
+
+    def save(self, *args, **kwargs):
+        # Codes are random, so a clash with another organization's code
+        # is resolved by drawing a new one.
+        attempts = settings.STAFF_ACCESS_CODE["MAX_ATTEMPTS"]
+        for attempt in range(1, attempts + 1):
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt == attempts or not self.staff_access_code_taken():
+                    raise
+                self.staff_access_code = gen_staff_access_code()
+
+    def staff_access_code_taken(self):
+        return (
+            Organization.objects.filter(staff_access_code=self.staff_access_code)
+            .exclude(pk=self.pk)
+            .exists()
+        )
+
+    def staff_access_code_expired(self):
+        expires = self.staff_access_code_expires
+        return expires is not None and expires <= timezone.now()
+
+    def rotate_staff_access_code(self):
+        """Replace the access code, the old one stops working at once."""
+        self.staff_access_code = gen_staff_access_code()
+        self.staff_access_code_expires = gen_staff_access_code_expiry()
+        self.save(
+            update_fields=[
+                "staff_access_code",
+                "staff_access_code_expires",
+                "modified",
+            ]
+        )
+
 
 class Job(models.Model):
     created_by = models.ForeignKey(
@@ -132,10 +207,63 @@ class Job(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
     is_open = models.BooleanField(default=True)
+    # Closed by the close_expired_jobs command once it has passed.
+    closes_at = models.DateTimeField(null=True, blank=True)
+    # When the job was last closed, None while it is open.
+    closed_at = models.DateTimeField(null=True, blank=True)
+    # Maintained by base.counters.
+    application_count = models.PositiveIntegerField(default=0)
+    # Maintained by base.search on PostgreSQL, unused elsewhere.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Serves the delta sync range scan of an organization's jobs.
+            models.Index(
+                fields=["org_id", "modified"],
+                name="job_org_modified_idx",
+            ),
+            # Serves the keyset-paginated open job listing.
+            models.Index(
+                fields=["is_open", "created", "id"],
+                name="job_open_created_id_idx",
+            ),
+            # Serves the MAX(modified) validator of the open job listing.
+            models.Index(
+                fields=["is_open", "modified"],
+                name="job_open_modified_idx",
+            ),
+            # Serve the analytics rollup's scans of a day's jobs.
+            models.Index(fields=["created"], name="job_created_idx"),
+            models.Index(
+                fields=["closed_at"],
+                name="job_closed_at_idx",
+                condition=models.Q(closed_at__isnull=False),
+            ),
+            # Serves the expiry scan, only open jobs with a deadline.
+            models.Index(
+                fields=["closes_at"],
+                name="job_open_closes_at_idx",
+                condition=models.Q(is_open=True, closes_at__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         return "Job from: %s" % (self.org_id.name)
 
+    def set_open(self, is_open, now=None):
+        """
+        Open or close the job, recording when it was closed. Reopening
+        drops a closing date that has passed, which would otherwise have
+        close_expired_jobs close the job again.
+        """
+        now = now or timezone.now()
+        if is_open != self.is_open:
+            self.closed_at = None if is_open else now
+        if is_open and self.closes_at is not None and self.closes_at <= now:
+            self.closes_at = None
+        self.is_open = is_open
+
 
 class Application(models.Model):
     applicant_id = models.ForeignKey(
@@ -146,5 +274,95 @@ class Application(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["applicant_id", "job"], name="application_applicant_job_uniq"
+            ),
+        ]
+        indexes = [
+            # Serves the delta sync range scan of a job's applications.
+            models.Index(
+                fields=["job", "modified"],
+                name="application_job_modified_idx",
+            ),
+            # Serves the analytics rollup's scan of a day's applications.
+            models.Index(fields=["created"], name="application_created_idx"),
+        ]
+
     def __str__(self):
         return "%s's application" % (self.applicant_id.name)
+
+
+class OrgDailyStats(models.Model):
+    """Hiring funnel of one organization on one day, see base.analytics."""
+
+    organization = models.ForeignKey(
+        to="Organization", related_name="daily_stats", on_delete=models.CASCADE
+    )
+    day = models.DateField()
+    jobs_opened = models.PositiveIntegerField(default=0)
+    jobs_closed = models.PositiveIntegerField(default=0)
+    applications = models.PositiveIntegerField(default=0)
+    # Sum over the jobs closed that day of the time they were open.
+    time_to_close = models.DurationField(default=timedelta)
+
+    class Meta:
+        verbose_name_plural = "Org daily stats"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["organization", "day"], name="org_daily_stats_uniq"
+            ),
+        ]
+
+
+class JobDailyStats(models.Model):
+    """Applications received by one job on one day, see base.analytics."""
+
+    job = models.ForeignKey(
+        to="Job", related_name="daily_stats", on_delete=models.CASCADE
+    )
+    organization = models.ForeignKey(to="Organization", on_delete=models.CASCADE)
+    day = models.DateField()
+    applications = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Job daily stats"
+        constraints = [
+            models.UniqueConstraint(fields=["job", "day"], name="job_daily_stats_uniq"),
+        ]
+        indexes = [
+            models.Index(
+                fields=["organization", "day"], name="job_daily_stats_org_day_idx"
+            ),
+        ]
+
+
+class TombstoneKinds(models.TextChoices):
+    JOB = "job", "JOB"
+    APPLICATION = "application", "APPLICATION"
+
+
+class Tombstone(models.Model):
+    """
+    Marker left behind when a Job or Application is deleted, so sync
+    clients can drop it from their local copy.
+    """
+
+    kind = models.CharField(max_length=20, choices=TombstoneKinds.choices)
+    object_id = models.BigIntegerField()
+    # Plain id rather than a ForeignKey: tombstones must survive, and be
+    # writable during, cascading deletes.
+    organization_id = models.BigIntegerField()
+    deleted = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["organization_id", "deleted"],
+                name="tombstone_org_deleted_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return "Deleted %s: %s" % (self.kind, self.object_id)
@@ -0,0 +1,223 @@
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from base.exceptions import HRBaseAPIException
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset (seek) pagination over a descending
+    ``(key_field, id)`` ordering.
+
+    Unlike offset pagination, every page is fetched with an indexed
+    ``WHERE (key, id) < (last_key, last_id)`` seek, so the cost of a
+    page does not grow with how deep the client has paged.
+    """
+
+    key_field = "created"
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_rows(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, using the async ORM."""
+        rows = [row async for row in self.get_page_queryset(queryset, request)]
+        return self.paginate_rows(rows)
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            key, pk = position
+            queryset = queryset.filter(
+                Q(**{"%s__lt" % self.key_field: key})
+                | Q(**{self.key_field: key, "id__lt": pk})
+            )
+
+        queryset = queryset.order_by("-%s" % self.key_field, "-id")
+        # Fetch one extra row to know whether there is a next page
+        # without running a separate COUNT query.
+        return queryset[: self.page_size + 1]
+
+    def paginate_rows(self, results):
+        self.has_next = len(results) > self.page_size
+        results = results[: self.page_size]
+
+        self.next_position = None
+        if self.has_next:
+            last = results[-1]
+            self.next_position = (self.get_key(last), last.pk)
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_key(self, instance):
+        return getattr(instance, self.key_field)
+
+    def encode_key(self, key):
+        return key.isoformat()
+
+    def decode_key(self, value):
+        key = parse_datetime(value)
+        if key is None:
+            raise ValueError(value)
+        return key
+
+    def encode_cursor(self, position):
+        key, pk = position
+        querystring = parse.urlencode({"k": self.encode_key(key), "i": pk})
+        return b64encode(querystring.encode("ascii")).decode("ascii")
+
+    def get_link(self, request, cursor):
+        """The URL of ``request`` moved to ``cursor``, or None for no page."""
+        if cursor is None:
+            return None
+        return replace_query_param(
+            request.build_absolute_uri(), self.cursor_query_param, cursor
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode("ascii")).decode("ascii")
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            key = self.decode_key(tokens["k"][0])
+            pk = int(tokens["i"][0])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise HRBaseAPIException(self.invalid_cursor_message)
+        return key, pk
+
+    def get_next_cursor(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_next_link(self):
+        return self.get_link(self.request, self.get_next_cursor())
+
+    def get_paginated_response(self, data, message=""):
+        return Response(
+            {
+                "status": True,
+                "message": message,
+                "data": data,
+                "next": self.get_next_link(),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class JobKeysetPagination(KeysetPagination):
+    """Paginate jobs newest first on ``(created, id)``."""
+
+    key_field = "created"
+
+
+class SearchKeysetPagination(KeysetPagination):
+    """Paginate search results by descending ``(rank, id)``."""
+
+    key_field = "rank"
+
+    def encode_key(self, key):
+        return repr(key)
+
+    def decode_key(self, value):
+        return float(value)
+
+
+class SyncPagination(KeysetPagination):
+    """
+    Page the jobs and applications of a sync side by side, each oldest
+    change first on ascending ``(modified, id)``.
+
+    The cursor carries the first page's ``since`` and watermark along
+    with the position reached in every list, so all pages of a sync
+    are read against the same bounds.
+    """
+
+    key_field = "modified"
+    page_size = settings.SYNC_PAGE_SIZE
+    max_page_size = settings.SYNC_PAGE_SIZE
+
+    def paginate_lists(self, querysets, request, since, watermark, positions):
+        """
+        Return the next page of each of ``querysets`` (a dict of
+        querysets by name) after its entry in ``positions``.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        pages, positions, has_next = {}, dict(positions), False
+        for name, queryset in querysets.items():
+            position = positions.get(name)
+            if position is not None:
+                key, pk = position
+                queryset = queryset.filter(
+                    Q(**{"%s__gt" % self.key_field: key})
+                    | Q(**{self.key_field: key, "id__gt": pk})
+                )
+            rows = list(queryset.order_by(self.key_field, "id")[: self.page_size + 1])
+            has_next = has_next or len(rows) > self.page_size
+            pages[name] = rows[: self.page_size]
+            if pages[name]:
+                last = pages[name][-1]
+                positions[name] = (self.get_key(last), last.pk)
+
+        self.next_position = (since, watermark, positions) if has_next else None
+        return pages
+
+    def encode_cursor(self, position):
+        since, watermark, positions = position
+        values = {
+            "s": self.encode_key(since) if since is not None else "",
+            "w": self.encode_key(watermark),
+        }
+        for name, (key, pk) in positions.items():
+            values[name] = "%s,%s" % (self.encode_key(key), pk)
+        querystring = parse.urlencode(values)
+        return b64encode(querystring.encode("ascii")).decode("ascii")
+
+    def decode_cursor(self, request):
+        """``(since, watermark, positions)`` of the cursor, None on a first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode("ascii")).decode("ascii")
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            since = tokens.pop("s")[0]
+            since = self.decode_key(since) if since else None
+            watermark = self.decode_key(tokens.pop("w")[0])
+            positions = {}
+            for name, (value, *_) in tokens.items():
+                key, pk = value.rsplit(",", 1)
+                positions[name] = (self.decode_key(key), int(pk))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise HRBaseAPIException(self.invalid_cursor_message)
+        return since, watermark, positions
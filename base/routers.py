@@ -0,0 +1,154 @@
+"""
+Routing of safe reads to read replicas.
+
+Views opt in with ``replica_reads``; everything else, writes and reads
+inside transactions included, stays on ``default``. A client that just
+wrote is pinned to the primary for ``READ_REPLICAS["PIN_SECONDS"]`` by
+``ReadYourWritesMiddleware`` so it never reads data older than its own
+writes from a lagging replica. Pins must be seen by every worker, so the
+pin cache has to be shared, see ``check_pin_cache``.
+"""
+
+import contextlib
+import functools
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+_use_replica = ContextVar("use_replica", default=False)
+
+# Backends whose entries other worker processes cannot see.
+PROCESS_LOCAL_CACHES = [
+    "django.core.cache.backends.dummy.DummyCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+]
+
+
+def check_pin_cache():
+    """
+    Refuse to route reads to replicas when pins are kept per process: a
+    write served by one worker would not keep the next request, served by
+    another, off a lagging replica.
+    """
+    if not settings.READ_REPLICAS["ALIASES"]:
+        return
+    alias = settings.READ_REPLICAS["CACHE_ALIAS"]
+    if settings.CACHES[alias]["BACKEND"] in PROCESS_LOCAL_CACHES:
+        raise ImproperlyConfigured(
+            "READ_REPLICAS needs a shared pin cache, %r is process-local. "
+            "Set DB_REPLICA_PIN_CACHE_ALIAS or CACHE_BACKEND." % (alias)
+        )
+
+
+def pin_key(user):
+    return "db:pin:%s" % (user.pk)
+
+
+def pin_to_primary(user):
+    caches[settings.READ_REPLICAS["CACHE_ALIAS"]].set(
+        pin_key(user), 1, settings.READ_REPLICAS["PIN_SECONDS"]
+    )
+
+
+def is_pinned(user):
+    cache = caches[settings.READ_REPLICAS["CACHE_ALIAS"]]
+    return cache.get(pin_key(user)) is not None
+
+
+@contextlib.contextmanager
+def reads_from_replica(enabled=True):
+    """Send reads in the block to a replica, or back to the primary."""
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def primary_reads():
+    return reads_from_replica(False)
+
+
+def replica_reads(method):
+    """
+    Decorate a view method so its reads go to a replica, unless the
+    request is unsafe or the user has written recently.
+    """
+
+    @functools.wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        with reads_from_replica(can_read_replica(request)):
+            return method(view, request, *args, **kwargs)
+
+    return wrapper
+
+
+def can_read_replica(request):
+    return (
+        bool(settings.READ_REPLICAS["ALIASES"])
+        and request.method in SAFE_METHODS
+        and not (request.user.is_authenticated and is_pinned(request.user))
+    )
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = settings.READ_REPLICAS["ALIASES"]
+        if not (_use_replica.get() and aliases):
+            return None
+        # Reads inside a transaction must see its own writes.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+
+class ReadYourWritesMiddleware:
+    """Pin users to the primary for a while after an unsafe request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        response = self.get_response(request)
+        self.pin(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if settings.READ_REPLICAS["ALIASES"] and request.method not in SAFE_METHODS:
+            # Resolving an anonymous request's lazy user may hit the database.
+            await sync_to_async(self.pin)(request)
+        return response
+
+    def pin(self, request):
+        # DRF sets the authenticated user on the Django request too.
+        user = getattr(request, "user", None)
+        if (
+            settings.READ_REPLICAS["ALIASES"]
+            and request.method not in SAFE_METHODS
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user)
@@ -0,0 +1,173 @@
+"""
+Ranked full-text search over jobs.
+
+On PostgreSQL every job keeps a weighted ``tsvector`` of its title,
+description and organization name/location in ``Job.search_vector``,
+backed by a GIN index. Other backends (SQLite for local development and
+tests) fall back to an FTS5 table holding the same columns.
+
+The index and FTS table are created after ``migrate`` and kept in sync
+from the Job/Organization signals in ``base.signals``; code that writes
+jobs without signals (``update()``/``bulk_create()``) must call
+``index_jobs`` itself. Jobs written before the index existed are added
+by the ``reindex_jobs`` command.
+"""
+
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections, router
+from django.db.models import F, FloatField, OuterRef, Subquery
+from django.db.models.expressions import RawSQL
+
+from base.models import Job, Organization
+
+SEARCH_CONFIG = "english"
+GIN_INDEX_NAME = "job_search_vector_idx"
+FTS_TABLE = "base_job_fts"
+# bm25() weights of the FTS columns, in table order.
+FTS_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+
+def get_connection():
+    return connections[router.db_for_write(Job)]
+
+
+def is_postgres(connection=None):
+    return (connection or get_connection()).vendor == "postgresql"
+
+
+def create_search_index(sender, using, **kwargs):
+    """post_migrate handler creating the backend's search structures."""
+    if sender.name != "base":
+        return
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if is_postgres(connection):
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS %s ON %s USING gin (search_vector)"
+                % (GIN_INDEX_NAME, Job._meta.db_table)
+            )
+        elif connection.vendor == "sqlite":
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS %s USING "
+                "fts5(title, description, org_name, org_location, "
+                "tokenize='porter')" % FTS_TABLE
+            )
+
+
+def index_jobs(job_ids):
+    """Recompute the search document of the given jobs."""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return
+
+    connection = get_connection()
+    if is_postgres(connection):
+        org = Organization.objects.filter(pk=OuterRef("org_id"))
+        Job.objects.filter(pk__in=job_ids).update(
+            search_vector=(
+                SearchVector("title", weight="A", config=SEARCH_CONFIG)
+                + SearchVector("description", weight="B", config=SEARCH_CONFIG)
+                + SearchVector(
+                    Subquery(org.values("name")), weight="C", config=SEARCH_CONFIG
+                )
+                + SearchVector(
+                    Subquery(org.values("location")), weight="C", config=SEARCH_CONFIG
+                )
+            )
+        )
+    elif connection.vendor == "sqlite":
+        placeholders = ", ".join(["%s"] * len(job_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM %s WHERE rowid IN (%s)" % (FTS_TABLE, placeholders),
+                job_ids,
+            )
+            cursor.execute(
+                "INSERT INTO %s (rowid, title, description, org_name, org_location) "
+                "SELECT j.id, j.title, j.description, o.name, o.location "
+                "FROM %s j JOIN %s o ON o.id = j.org_id_id WHERE j.id IN (%s)"
+                % (
+                    FTS_TABLE,
+                    Job._meta.db_table,
+                    Organization._meta.db_table,
+                    placeholders,
+                ),
+                job_ids,
+            )
+
+
+def unindexed_jobs():
+    """Jobs missing from the search index."""
+    connection = get_connection()
+    if is_postgres(connection):
+        return Job.objects.filter(search_vector=None)
+    if connection.vendor == "sqlite":
+        return Job.objects.exclude(
+            id__in=RawSQL("SELECT rowid FROM %s" % FTS_TABLE, [])
+        )
+    return Job.objects.none()
+
+
+def reindex_jobs(batch_size=1000, rebuild=False):
+    """
+    Index the jobs missing from the search index, or every job with
+    ``rebuild``, ``batch_size`` at a time. Returns the number indexed.
+    """
+    queryset = Job.objects.all() if rebuild else unindexed_jobs()
+    indexed, last_pk = 0, 0
+    while True:
+        job_ids = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not job_ids:
+            return indexed
+        last_pk = job_ids[-1]
+        index_jobs(job_ids)
+        indexed += len(job_ids)
+
+
+def unindex_job(job_id):
+    connection = get_connection()
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM %s WHERE rowid = %%s" % FTS_TABLE, [job_id])
+
+
+def to_fts_query(text):
+    """Quote every word so user input cannot inject FTS5 query syntax."""
+    return " ".join('"%s"' % word for word in re.findall(r"\w+", text))
+
+
+def search_jobs(queryset, text):
+    """
+    Restrict ``queryset`` to jobs matching ``text``, annotated with a
+    ``rank`` where higher is more relevant.
+    """
+    if is_postgres():
+        query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F("search_vector"), query)
+        )
+
+    match = to_fts_query(text)
+    weights = ", ".join(str(weight) for weight in FTS_WEIGHTS)
+    job_table = Job._meta.db_table
+    return queryset.filter(
+        id__in=RawSQL(
+            "SELECT rowid FROM %s WHERE %s MATCH %%s" % (FTS_TABLE, FTS_TABLE),
+            [match],
+        )
+    ).annotate(
+        # bm25() is lower for better matches, so negate it.
+        rank=RawSQL(
+            "SELECT -bm25(%s, %s) FROM %s WHERE %s MATCH %%s AND rowid = %s.id"
+            % (FTS_TABLE, weights, FTS_TABLE, FTS_TABLE, job_table),
+            [match],
+            output_field=FloatField(),
+        )
+    )
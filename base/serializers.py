@@ -1,8 +1,18 @@
+from django.utils import timezone
 from rest_framework import serializers
 
 from base import logger
 from base.exceptions import HRBaseAPIException
-from base.models import Application, Job, Organization, Staff, User, UserRoles
+from base.models import (
+    Application,
+    Job,
+    Organization,
+    OrgDailyStats,
+    Staff,
+    User,
+    UserRoles,
+)
+from base.utils import MAX_ID, insert_or_ignore
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -33,6 +43,14 @@ class UserLoginSerializer(serializers.Serializer):
     password = serializers.CharField()
 
 
+class TokenRefreshSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=False)
+
+
 class CreateOrgSerializer(serializers.ModelSerializer):
     class Meta:
         model = Organization
@@ -42,8 +60,15 @@ class CreateOrgSerializer(serializers.ModelSerializer):
             "valuation",
             "location",
             "staff_access_code",
+            "staff_access_code_expires",
+            "staff_count",
+        ]
+        read_only_fields = [
+            "admin",
+            "staff_access_code",
+            "staff_access_code_expires",
+            "staff_count",
         ]
-        read_only_fields = ["admin", "staff_access_code"]
 
     def create(self, validated_data):
         request = self.context["request"]
@@ -56,6 +81,11 @@ class CreateOrgSerializer(serializers.ModelSerializer):
         return org
 
 
+class StaffImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(choices=["csv", "ndjson"], required=False)
+
+
 class StaffSerializer(serializers.ModelSerializer):
     class Meta:
         model = Staff
@@ -78,7 +108,7 @@ class CreateOrgStaffSerializer(serializers.Serializer):
         Return: dict of Staff data
         """
         request = self.context["request"]
-        org_access_code = validated_data["org_access_code"]
+        org_access_code = validated_data["org_access_code"].strip()
 
         try:
             org = Organization.objects.get(staff_access_code=org_access_code)
@@ -86,25 +116,30 @@ class CreateOrgStaffSerializer(serializers.Serializer):
             raise HRBaseAPIException(
                 "No organization with access code: %s" % (org_access_code)
             )
+        if org.staff_access_code_expired():
+            raise HRBaseAPIException(
+                "Access code has expired, ask the organization for a new one!!!"
+            )
 
-        # Use get_or_creat to avoid creating duplicate record.
-        # Considering a user cannot be in the same organization twice with one role.
-        staff, _ = Staff.objects.get_or_create(
-            user=request.user,
-            organization=org,
-        )
+        # A user cannot be in the same organization twice, the unique
+        # constraint turns a repeated join into a no-op.
+        staff = Staff(user=request.user, organization=org)
+        if not insert_or_ignore(staff, ["user", "organization"]):
+            staff = Staff.objects.get(user=request.user, organization=org)
         return StaffSerializer(staff).data
 
 
 class JobSerializer(serializers.ModelSerializer):
     class Meta:
         model = Job
-        fields = "__all__"
+        exclude = ["search_vector"]
         extra_kwargs = {
             "title": {"required": False},
             "description": {"required": False},
             "created_by": {"read_only": True},
             "org_id": {"read_only": True},
+            "application_count": {"read_only": True},
+            "closed_at": {"read_only": True},
             "created": {"read_only": True},
             "modified": {"read_only": True},
         }
@@ -113,7 +148,7 @@ class JobSerializer(serializers.ModelSerializer):
         user = self.context["user"]
 
         try:
-            org = user.user_staff.get().organization
+            org = user.user_staff.select_related("organization").get().organization
         except Staff.DoesNotExist as e:
             # Handle exception when there is no
             # relatedObject (staff) existing for that user.
@@ -121,10 +156,37 @@ class JobSerializer(serializers.ModelSerializer):
             logger.error("%s" % (err_mg))
             raise HRBaseAPIException("User has no staff record!!!")
 
+        if not validated_data.get("is_open", True):
+            validated_data["closed_at"] = timezone.now()
         job = Job.objects.create(created_by=user, org_id=org, **validated_data)
 
         return job
 
+    def update(self, instance, validated_data):
+        if "is_open" in validated_data:
+            instance.set_open(validated_data.pop("is_open"))
+        return super().update(instance, validated_data)
+
+    def validate_closes_at(self, value):
+        if value is not None and value <= timezone.now():
+            raise serializers.ValidationError("Closing date must be in the future.")
+        return value
+
+
+class JobBatchSerializer(serializers.Serializer):
+    jobs = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+
+class JobBatchCloseSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=MAX_ID),
+        allow_empty=False,
+    )
+
+
+class JobSearchSerializer(JobSerializer):
+    rank = serializers.FloatField(read_only=True)
+
 
 class ApplicationSerializer(serializers.ModelSerializer):
     job = JobSerializer(read_only=True)
@@ -142,11 +204,44 @@ class ApplicationSerializer(serializers.ModelSerializer):
         user = self.context["user"]
         job = self.context["job"]
 
-        application, created = Application.objects.get_or_create(
-            applicant_id=user, job=job, **validated_data
-        )
-
-        if created is False:
+        application = Application(applicant_id=user, job=job, **validated_data)
+        if not insert_or_ignore(application, ["applicant_id", "job"]):
             raise HRBaseAPIException("Already applied for this job")
 
         return application
+
+
+class ApplicationMatchSerializer(ApplicationSerializer):
+    score = serializers.FloatField(read_only=True)
+
+
+class JobMatchSerializer(JobSerializer):
+    score = serializers.FloatField(read_only=True)
+
+
+class SyncApplicationSerializer(serializers.ModelSerializer):
+    """Flat application rows for delta sync, the job is sent separately."""
+
+    class Meta:
+        model = Application
+        fields = "__all__"
+
+
+class OrgDailyStatsSerializer(serializers.ModelSerializer):
+    avg_time_to_close = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrgDailyStats
+        fields = [
+            "day",
+            "jobs_opened",
+            "jobs_closed",
+            "applications",
+            "avg_time_to_close",
+        ]
+
+    def get_avg_time_to_close(self, obj):
+        """Seconds the jobs closed that day had been open, on average."""
+        if not obj.jobs_closed:
+            return None
+        return obj.time_to_close.total_seconds() / obj.jobs_closed
@@ -0,0 +1,139 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from base.authentication import token_cache
+from base.cache import invalidate_job_list
+from base.counters import adjust
+from base.search import index_jobs, unindex_job
+from base.models import (
+    Application,
+    Job,
+    Organization,
+    Staff,
+    Tombstone,
+    TombstoneKinds,
+    User,
+)
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=User)
+def evict_user_tokens(sender, instance, created, update_fields=None, **kwargs):
+    # Login only touches last_login, which cached requests never rely on.
+    if created or (update_fields and set(update_fields) == {"last_login"}):
+        return
+
+    # Role, activation or profile changes must be seen on the next request.
+    for key in Token.objects.filter(user=instance).values_list("key", flat=True):
+        token_cache.delete(key)
+
+
+def jobs_written(job_ids):
+    """
+    Refresh what is derived from jobs once they are created or updated.
+
+    Called for single saves by the handler below, and directly by bulk
+    paths (bulk_create/bulk_update/update) that send no signals.
+    """
+    invalidate_job_list()
+    index_jobs(job_ids)
+
+
+@receiver(post_save, sender=Job)
+def job_saved(sender, instance, **kwargs):
+    jobs_written([instance.pk])
+
+
+@receiver(post_delete, sender=Job)
+def evict_job_list(sender, instance, **kwargs):
+    invalidate_job_list()
+
+
+def deleted_along_with(origin, *models):
+    """Whether a delete cascaded from an instance or queryset of ``models``."""
+    model = getattr(origin, "model", type(origin))
+    return model in models
+
+
+@receiver(post_delete, sender=Job)
+def record_job_tombstone(sender, instance, origin=None, **kwargs):
+    # Nobody is left to sync an organization that is itself being deleted.
+    if deleted_along_with(origin, Organization):
+        return
+
+    Tombstone.objects.create(
+        kind=TombstoneKinds.JOB,
+        object_id=instance.pk,
+        organization_id=instance.org_id_id,
+    )
+
+
+@receiver(post_delete, sender=Application)
+def record_application_tombstone(sender, instance, origin=None, **kwargs):
+    # The job's own tombstone tells clients to drop its applications.
+    if deleted_along_with(origin, Job, Organization):
+        return
+
+    org_id = (
+        Job.objects.filter(pk=instance.job_id).values_list("org_id", flat=True).first()
+    )
+    if org_id is not None:
+        Tombstone.objects.create(
+            kind=TombstoneKinds.APPLICATION,
+            object_id=instance.pk,
+            organization_id=org_id,
+        )
+
+
+@receiver(post_save, sender=Organization)
+def update_org_jobs_search_index(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    # Jobs embed the organization's name and location in their document,
+    # other changes (access codes, counters, valuation) leave it alone.
+    if created:
+        return
+    if update_fields is not None and not set(update_fields) & set(
+        Organization.SEARCH_FIELDS
+    ):
+        return
+    values = instance.get_search_values()
+    if values == getattr(instance, "indexed_values", None):
+        return
+
+    instance.indexed_values = values
+    index_jobs(instance.org_job.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Job)
+def remove_job_search_index(sender, instance, **kwargs):
+    unindex_job(instance.pk)
+
+
+@receiver(post_save, sender=Application)
+def count_created_application(sender, instance, created, **kwargs):
+    if created:
+        adjust(Job, instance.job_id, "application_count", 1)
+
+
+@receiver(post_delete, sender=Application)
+def count_deleted_application(sender, instance, origin=None, **kwargs):
+    if not deleted_along_with(origin, Job, Organization):
+        adjust(Job, instance.job_id, "application_count", -1)
+
+
+@receiver(post_save, sender=Staff)
+def count_created_staff(sender, instance, created, **kwargs):
+    if created:
+        adjust(Organization, instance.organization_id, "staff_count", 1)
+
+
+@receiver(post_delete, sender=Staff)
+def count_deleted_staff(sender, instance, origin=None, **kwargs):
+    if not deleted_along_with(origin, Organization):
+        adjust(Organization, instance.organization_id, "staff_count", -1)
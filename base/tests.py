@@ -1,12 +1,65 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import wait
+from datetime import timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.db.utils import ConnectionHandler
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from base.models import User, UserRoles, Staff, Organization, Job
+from rest_framework.authtoken.models import Token
+from base import async_views, bulk, login, throttling
+from base.authentication import token_cache
+from base.db.backends.postgresql.base import DatabaseWrapper as PooledWrapper
+from base.instrumentation import endpoint_metrics
+from base.matching import MatchIndex, engine as matching_engine
+from base.search import unindex_job
+from base.routers import (
+    ReplicaRouter,
+    check_pin_cache,
+    is_pinned,
+    pin_key,
+    primary_reads,
+    reads_from_replica,
+)
+from base.models import (
+    Application,
+    Job,
+    Organization,
+    Staff,
+    Tombstone,
+    User,
+    UserRoles,
+)
 
 
 class AccountTests(TestCase):
     def setUp(self):
+        throttling.buckets.clear()
         self.client = APIClient()
         self.user_data = {
             "name": "Test User",
@@ -28,6 +81,189 @@ class AccountTests(TestCase):
         self.assertIn("token", response.data["data"]["auth_credentials"])
 
 
+class LoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        throttling.buckets.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            name="Test User", email="testuser@example.com", password="password123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.credentials = {"email": "testuser@example.com", "password": "password123"}
+
+    def login(self):
+        response = self.client.post(reverse("login"), self.credentials)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["data"]["auth_credentials"], {"token": self.token.key}
+        )
+        return response
+
+    def test_user_and_token_read_in_one_query(self):
+        # One read, plus the first last_login write.
+        with self.assertNumQueries(2):
+            self.login()
+        with self.assertNumQueries(1):
+            self.login()
+
+    def test_last_login_debounced(self):
+        self.login()
+        self.user.refresh_from_db()
+        first = self.user.last_login
+        self.assertIsNotNone(first)
+
+        self.login()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_login, first)
+
+        interval = timedelta(seconds=settings.LOGIN["LAST_LOGIN_INTERVAL"])
+        User.objects.filter(pk=self.user.pk).update(last_login=first - interval)
+        self.login()
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.last_login, first)
+
+    def test_saves_leave_last_login_alone(self):
+        self.user.name = "Renamed"
+        self.user.save()
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+
+    def test_creates_missing_token(self):
+        self.token.delete()
+        response = self.client.post(reverse("login"), self.credentials)
+        self.assertEqual(
+            response.data["data"]["auth_credentials"],
+            {"token": Token.objects.get(user=self.user).key},
+        )
+
+    def test_unknown_email_costs_a_hash(self):
+        with patch.object(User, "set_password") as set_password:
+            self.assertIsNone(login.authenticate("nobody@example.com", "guess"))
+            self.assertIsNone(
+                async_to_sync(login.aauthenticate)("nobody@example.com", "guess")
+            )
+        self.assertEqual(set_password.call_count, 2)
+        set_password.assert_called_with("guess")
+
+
+class PasswordRehashTests(TransactionTestCase):
+    def setUp(self):
+        throttling.buckets.clear()
+
+    def test_outdated_hash_upgraded_in_background(self):
+        outdated = make_password("password123", hasher="pbkdf2_sha1")
+        user = User.objects.create(
+            name="Test User", email="testuser@example.com", password=outdated
+        )
+        response = APIClient().post(
+            reverse("login"),
+            {"email": "testuser@example.com", "password": "password123"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        wait(list(login.pending_rehashes))
+        user.refresh_from_db()
+        self.assertNotEqual(user.password, outdated)
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$"))
+        self.assertTrue(user.check_password("password123"))
+
+
+def throttle_rates(**rates):
+    return override_settings(
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            "DEFAULT_THROTTLE_RATES": {
+                **settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"],
+                **rates,
+            },
+        }
+    )
+
+
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        throttling.buckets.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            name="Test User", email="testuser@example.com", password="password123"
+        )
+
+    def login(self, email="testuser@example.com", **extra):
+        return self.client.post(
+            reverse("login"), {"email": email, "password": "wrong"}, **extra
+        )
+
+    @throttle_rates(login_ip="2/min")
+    def test_login_throttled_per_ip_before_database(self):
+        for i in range(2):
+            response = self.login("user%s@example.com" % i)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.assertNumQueries(0):
+            response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response["Retry-After"]), 0)
+
+        response = self.login(REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @throttle_rates(login_ip="1/min")
+    def test_forged_forwarded_for_shares_bucket(self):
+        response = self.login("user0@example.com")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.login(HTTP_X_FORWARDED_FOR="203.0.113.7")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @throttle_rates(login_email="2/min")
+    def test_login_throttled_per_email_across_ips(self):
+        for i in range(2):
+            response = self.login("TestUser@example.com", REMOTE_ADDR="10.0.0.%s" % i)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.login(REMOTE_ADDR="10.0.0.9")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        response = self.login("other@example.com", REMOTE_ADDR="10.0.0.9")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @throttle_rates(login_email="1/min")
+    def test_async_login_throttled(self):
+        factory = RequestFactory()
+        for expected in [
+            status.HTTP_400_BAD_REQUEST,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        ]:
+            request = factory.post(
+                "/",
+                {"email": "testuser@example.com", "password": "wrong"},
+                content_type="application/json",
+            )
+            response = async_to_sync(async_views.login)(request)
+            self.assertEqual(response.status_code, expected)
+
+    @throttle_rates(create_account_ip="1/min", apply_user="1/min")
+    def test_other_endpoints_opt_in(self):
+        account = {"name": "New", "email": "new@example.com", "password": "pass1234"}
+        response = self.client.post(reverse("create_account"), account)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse("create_account"), account)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        self.client.force_authenticate(user=self.user)
+        for expected in [
+            status.HTTP_400_BAD_REQUEST,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        ]:
+            response = self.client.post("/v1/core/api/jobs/0/apply/", {})
+            self.assertEqual(response.status_code, expected)
+
+    @override_settings(THROTTLING={**settings.THROTTLING, "ENABLED": False})
+    @throttle_rates(login_ip="1/min")
+    def test_disabled(self):
+        for i in range(3):
+            self.assertEqual(self.login().status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class OrganizationTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -78,6 +314,15 @@ class StaffJoinTests(TestCase):
             self.organization.org_staff.filter(user__id=self.staff_user.id).exists()
         )
 
+    def test_joining_twice_keeps_one_staff_record(self):
+        self.client.force_authenticate(user=self.staff_user)
+        payload = {"org_access_code": self.organization.staff_access_code}
+        first = self.client.post(reverse("staff_joins_org"), payload)
+        second = self.client.post(reverse("staff_joins_org"), payload)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data["data"]["id"], second.data["data"]["id"])
+        self.assertEqual(self.organization.org_staff.count(), 1)
+
 
 class OrganizationStaffManagementTests(TestCase):
     def setUp(self):
@@ -104,6 +349,23 @@ class OrganizationStaffManagementTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["data"]), 1)
 
+    def test_get_organization_staff_list_not_modified(self):
+        response = self.client.get(reverse("org_staff"))
+        etag = response["ETag"]
+
+        # Validator aggregate only
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("org_staff"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Staff.objects.create(
+            user=User.objects.create_user(name="New Staff", email="new@example.com"),
+            organization=self.organization,
+        )
+        response = self.client.get(reverse("org_staff"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["data"]), 2)
+
     def test_remove_staff_member(self):
         url = f"/v1/core/api/org/staff?pk={self.staff.id}"
         response = self.client.delete(url)
@@ -113,6 +375,7 @@ class OrganizationStaffManagementTests(TestCase):
 
 class JobManagementTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.org_admin = User.objects.create_user(
             name="Org Admin", email="admin@example.com", password="password123"
@@ -158,9 +421,160 @@ class JobManagementTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["data"]["title"], update_data["title"])
 
+    def test_closing_job_records_closed_at(self):
+        job = Job.objects.create(
+            title="Test Job",
+            created_by=self.org_hr,
+            description="Job Description",
+            org_id=self.organization,
+        )
+        url = f"/v1/core/api/jobs/create/{job.id}/"
+        response = self.client.patch(url, {"is_open": False}, format="json")
+        self.assertIsNotNone(response.data["data"]["closed_at"])
+        response = self.client.patch(url, {"is_open": True}, format="json")
+        self.assertIsNone(response.data["data"]["closed_at"])
+
+    def test_list_jobs_paginates_with_cursor(self):
+        jobs = [
+            Job.objects.create(
+                title="Job %s" % i,
+                created_by=self.org_hr,
+                description="Job Description",
+                org_id=self.organization,
+            )
+            for i in range(5)
+        ]
+        Job.objects.create(
+            title="Closed Job",
+            created_by=self.org_hr,
+            description="Job Description",
+            org_id=self.organization,
+            is_open=False,
+        )
+        # Jobs sharing a timestamp must still page without gaps or repeats.
+        Job.objects.filter(pk__in=[jobs[1].pk, jobs[2].pk]).update(
+            created=jobs[1].created
+        )
+
+        url = "/v1/core/api/jobs/create/?page_size=2"
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["data"]), 2)
+            seen.extend(job["id"] for job in response.data["data"])
+            url = response.data["next"]
+
+        self.assertEqual(sorted(seen), sorted(job.pk for job in jobs))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_list_jobs_is_cached_until_a_job_changes(self):
+        url = "/v1/core/api/jobs/create/"
+        job = Job.objects.create(
+            title="Test Job",
+            created_by=self.org_hr,
+            description="Job Description",
+            org_id=self.organization,
+        )
+        self.client.get(url)
+        # The page and its ETag both come from the cache.
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data["data"]), 1)
+
+        job.is_open = False
+        job.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data["data"], [])
+
+    def test_applications_keep_cached_job_list(self):
+        url = "/v1/core/api/jobs/create/"
+        job = Job.objects.create(
+            title="Test Job",
+            created_by=self.org_hr,
+            description="Job Description",
+            org_id=self.organization,
+        )
+        response = self.client.get(url)
+        modified, etag = job.modified, response["ETag"]
+        Application.objects.create(
+            applicant_id=self.org_hr, job=job, skill_description="Skills"
+        )
+
+        job.refresh_from_db()
+        self.assertEqual((job.application_count, job.modified), (1, modified))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # Stale counts last as long as the cached pages.
+        with patch("base.cache.time.time", return_value=time.time() + 300):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cached_page_links_follow_each_requester(self):
+        for i in range(2):
+            Job.objects.create(
+                title="Job %s" % i,
+                created_by=self.org_hr,
+                description="Job Description",
+                org_id=self.organization,
+            )
+        url = "/v1/core/api/jobs/create/?page_size=1"
+        first = self.client.get(url)
+        second = self.client.get(url + "&lang=fr", secure=True)
+        self.assertEqual(first.data["data"], second.data["data"])
+        self.assertTrue(first.data["next"].startswith("http://testserver/"))
+        self.assertTrue(second.data["next"].startswith("https://testserver/"))
+        self.assertIn("lang=fr", second.data["next"])
+
+    def test_list_jobs_not_modified(self):
+        url = "/v1/core/api/jobs/create/"
+        job = Job.objects.create(
+            title="Test Job",
+            created_by=self.org_hr,
+            description="Job Description",
+            org_id=self.organization,
+        )
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        job.title = "Updated Job Title"
+        job.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_jobs_ignores_if_modified_since(self):
+        url = "/v1/core/api/jobs/create/"
+        older, newer = [
+            Job.objects.create(
+                title="Job %s" % i,
+                created_by=self.org_hr,
+                description="Job Description",
+                org_id=self.organization,
+            )
+            for i in range(2)
+        ]
+        response = self.client.get(url)
+        self.assertNotIn("Last-Modified", response)
+
+        # Leaves MAX(modified) as it was.
+        older.delete()
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([job["id"] for job in response.data["data"]], [newer.pk])
+
+    def test_list_jobs_invalid_cursor(self):
+        response = self.client.get("/v1/core/api/jobs/create/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class JobApplicationTests(TestCase):
     def setUp(self):
+        cache.clear()
+        throttling.buckets.clear()
         self.client = APIClient()
         self.org_admin = User.objects.create_user(
             name="Org Admin",
@@ -200,6 +614,28 @@ class JobApplicationTests(TestCase):
             self.job.application_set.filter(applicant_id=self.applicant).exists()
         )
 
+    def test_apply_twice_is_rejected(self):
+        url = f"/v1/core/api/jobs/{self.job.id}/apply/"
+        self.client.post(url, {"skill_description": "Python"}, format="json")
+        response = self.client.post(url, {"skill_description": "Go"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["message"], "Already applied for this job")
+        self.assertEqual(self.job.application_set.count(), 1)
+
+    def test_apply_replays_idempotency_key(self):
+        url = f"/v1/core/api/jobs/{self.job.id}/apply/"
+        payload = {"skill_description": "Python"}
+        headers = {"HTTP_IDEMPOTENCY_KEY": "click-1"}
+        first = self.client.post(url, payload, format="json", **headers)
+        with self.assertNumQueries(0):
+            retry = self.client.post(url, payload, format="json", **headers)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.data, first.data)
+
+        other = self.client.post(url, payload, format="json")
+        self.assertEqual(other.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_get_applications_success(self):
         # Authenticate with admin to return organization applications
         self.client.force_authenticate(user=self.org_admin)
@@ -219,3 +655,1620 @@ class JobApplicationTests(TestCase):
                 "You are not authorized to view applications to this job!!"
             )
         )
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Read endpoints must run a constant number of queries no matter
+    how many rows they return.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.org_admin = User.objects.create_user(
+            name="Org Admin",
+            email="admin@example.com",
+            role=UserRoles.ORG_ADMIN,
+            password="password123",
+        )
+        self.organization = Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.org_admin
+        )
+        self.job = Job.objects.create(
+            title="Test Job",
+            created_by=self.org_admin,
+            description="Job Description",
+            org_id=self.organization,
+        )
+        self.client.force_authenticate(user=self.org_admin)
+
+    def add_rows(self, count):
+        start = User.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create_user(
+                name="User %s" % i, email="user%s@example.com" % i
+            )
+            Staff.objects.create(user=user, organization=self.organization)
+            Application.objects.create(
+                applicant_id=user, job=self.job, skill_description="Skills"
+            )
+            Job.objects.create(
+                title="Job %s" % i,
+                created_by=self.org_admin,
+                description="Job Description",
+                org_id=self.organization,
+            )
+
+    def assert_constant_queries(self, url, budget):
+        for count in (1, 10):
+            self.add_rows(count)
+            with self.assertNumQueries(budget):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_applications_query_budget(self):
+        self.assert_constant_queries(
+            f"/v1/core/api/jobs/{self.job.id}/applications/", budget=3
+        )
+
+    def test_org_staff_query_budget(self):
+        self.assert_constant_queries(reverse("org_staff"), budget=4)
+
+    def test_job_list_query_budget(self):
+        self.assert_constant_queries("/v1/core/api/jobs/create/", budget=2)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            name="Test User",
+            email="testuser@example.com",
+            password="password123",
+            is_staff=True,
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token %s" % self.token.key)
+        self.url = reverse("internal_stats")
+
+    def test_token_lookup_is_cached(self):
+        # Token/User join
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+        hits = token_cache.info()["hits"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_cache.info()["hits"], hits + 1)
+
+    def test_deleted_token_is_evicted(self):
+        self.client.get(self.url)
+        self.token.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_evicted(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(
+    SIGNED_TOKENS={
+        "ENABLED": True,
+        "ACCESS_TTL": 300,
+        "REFRESH_TTL": 3600,
+        "DENY_LIST_CACHE": "default",
+    }
+)
+class SignedTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            name="Test User", email="testuser@example.com", password="password123"
+        )
+        self.url = "/v1/core/api/jobs/create/"
+
+    def login(self):
+        response = self.client.post(
+            reverse("login"),
+            {"email": "testuser@example.com", "password": "password123"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["data"]["auth_credentials"]
+
+    def test_access_token_needs_no_auth_query(self):
+        credentials = self.login()
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer %s" % credentials["access"])
+        # Job listing validator and page only, no Token/User lookup
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_access_token_carries_organization(self):
+        self.user.role = UserRoles.ORG_ADMIN
+        self.user.save()
+        Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.user
+        )
+        credentials = self.login()
+
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer %s" % credentials["access"])
+        with patch("base.tokens.get_user_org_id") as get_user_org_id:
+            response = self.client.get(reverse("sync"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        get_user_org_id.assert_not_called()
+
+    def test_refresh_token_is_single_use(self):
+        credentials = self.login()
+        payload = {"refresh": credentials["refresh"]}
+
+        response = self.client.post(reverse("token_refresh"), payload)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("access", response.data["data"]["auth_credentials"])
+
+        response = self.client.post(reverse("token_refresh"), payload)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_logout_revokes_access_token(self):
+        credentials = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer %s" % credentials["access"])
+
+        response = self.client.post(reverse("logout"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(SYNC_WATERMARK_LAG=0)
+class SyncTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.org_admin = User.objects.create_user(
+            name="Org Admin",
+            email="admin@example.com",
+            role=UserRoles.ORG_ADMIN,
+            password="password123",
+        )
+        self.organization = Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.org_admin
+        )
+        self.applicant = User.objects.create_user(
+            name="Applicant", email="applicant@example.com", password="password123"
+        )
+        self.jobs = [
+            Job.objects.create(
+                title="Job %s" % i,
+                created_by=self.org_admin,
+                description="Job Description",
+                org_id=self.organization,
+            )
+            for i in range(2)
+        ]
+        self.application = Application.objects.create(
+            applicant_id=self.applicant, job=self.jobs[0], skill_description="Skills"
+        )
+        self.client.force_authenticate(user=self.org_admin)
+
+    def test_sync_returns_only_changes_since_watermark(self):
+        response = self.client.get(reverse("sync"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data["data"]
+        self.assertEqual(len(data["jobs"]), 2)
+        self.assertEqual(len(data["applications"]), 1)
+
+        self.jobs[1].is_open = False
+        self.jobs[1].save()
+        application_id = self.application.id
+        self.application.delete()
+
+        response = self.client.get(reverse("sync"), {"since": data["watermark"]})
+        data = response.data["data"]
+        # Counter updates leave jobs[0].modified alone, the tombstone
+        # below tells clients its application is gone.
+        self.assertEqual([job["id"] for job in data["jobs"]], [self.jobs[1].id])
+        self.assertFalse(data["jobs"][0]["is_open"])
+        self.assertEqual(data["applications"], [])
+        self.assertEqual(data["deleted"]["applications"], [application_id])
+
+    def test_sync_job_delete_leaves_single_tombstone(self):
+        watermark = self.client.get(reverse("sync")).data["data"]["watermark"]
+        job_id = self.jobs[0].id
+        self.jobs[0].delete()
+
+        response = self.client.get(reverse("sync"), {"since": watermark})
+        deleted = response.data["data"]["deleted"]
+        self.assertEqual(deleted, {"jobs": [job_id], "applications": []})
+
+    def test_sync_pages_snapshot(self):
+        url, pages, jobs, applications = reverse("sync"), [], [], []
+        params = {"page_size": 1}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.data["data"]
+            pages.append(data["watermark"])
+            jobs.extend(job["id"] for job in data["jobs"])
+            applications.extend(row["id"] for row in data["applications"])
+            if len(pages) == 1:
+                # Moves past the rows still to be paged through.
+                self.jobs[0].save()
+            url, params = response.data["next"], {}
+
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(len(set(pages)), 1)
+        self.assertEqual(sorted(jobs), sorted(job.id for job in self.jobs))
+        self.assertEqual(applications, [self.application.id])
+
+        response = self.client.get(reverse("sync"), {"since": pages[0]})
+        data = response.data["data"]
+        self.assertEqual([job["id"] for job in data["jobs"]], [self.jobs[0].id])
+        self.assertIsNone(response.data["next"])
+
+    def test_sync_rejects_invalid_cursor(self):
+        response = self.client.get(reverse("sync"), {"cursor": "bm90LWEtY3Vyc29y"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sync_rejects_impossible_watermark(self):
+        response = self.client.get(reverse("sync"), {"since": "2020-02-30T00:00:00"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sync_rejects_non_org_users(self):
+        self.client.force_authenticate(user=self.applicant)
+        response = self.client.get(reverse("sync"))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class JobSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.org_hr = User.objects.create_user(
+            name="Org HR", email="hr@example.com", role=UserRoles.ORG_HR
+        )
+        self.organization = Organization.objects.create(
+            name="Acme Robotics", location="Lagos", admin=self.org_hr
+        )
+        self.other_org = Organization.objects.create(
+            name="Globex", location="Abuja", admin=self.org_hr
+        )
+        self.engineer = self.create_job(
+            "Python Engineer", "Build Django APIs with Python", self.organization
+        )
+        self.analyst = self.create_job(
+            "Data Analyst", "Python notebooks and reporting", self.other_org
+        )
+        self.closed = self.create_job(
+            "Python Intern", "Python", self.organization, is_open=False
+        )
+        self.client.force_authenticate(user=self.org_hr)
+        self.url = reverse("job_search")
+
+    def create_job(self, title, description, org, **kwargs):
+        return Job.objects.create(
+            title=title,
+            description=description,
+            created_by=self.org_hr,
+            org_id=org,
+            **kwargs,
+        )
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [job["id"] for job in response.data["data"]]
+
+    def test_search_ranks_title_matches_first(self):
+        self.assertEqual(self.search(q="python"), [self.engineer.id, self.analyst.id])
+
+    def test_search_rejects_invalid_filters(self):
+        for params in [
+            {"created_after": "2020-02-30T00:00:00"},
+            {"organization": "99999999999999999999"},
+            {"organization": "abc"},
+        ]:
+            response = self.client.get(self.url, {"q": "python", **params})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_filters(self):
+        self.assertEqual(
+            self.search(q="python", organization=self.other_org.id),
+            [self.analyst.id],
+        )
+        self.assertEqual(self.search(q="python", is_open="false"), [self.closed.id])
+
+    def test_reindex_adds_jobs_missing_from_index(self):
+        # As if written before the index existed.
+        Job.objects.filter(pk=self.engineer.pk).update(search_vector=None)
+        unindex_job(self.engineer.pk)
+        self.assertEqual(self.search(q="django"), [])
+
+        out = io.StringIO()
+        call_command("reindex_jobs", stdout=out)
+        self.assertIn("indexed: 1", out.getvalue())
+        self.assertEqual(self.search(q="django"), [self.engineer.id])
+
+    def test_search_follows_organization_changes(self):
+        self.assertEqual(self.search(q="acme"), [self.engineer.id])
+        self.organization.name = "Initech"
+        self.organization.save()
+        self.assertEqual(self.search(q="acme"), [])
+        self.assertEqual(self.search(q="initech"), [self.engineer.id])
+
+    def test_other_organization_changes_skip_reindex(self):
+        organization = Organization.objects.get(pk=self.organization.pk)
+        with CaptureQueriesContext(connections["default"]) as queries:
+            organization.rotate_staff_access_code()
+            organization.valuation = 10.0
+            organization.save()
+        self.assertFalse([query for query in queries if "base_job" in query["sql"]])
+
+        organization.location = "Ibadan"
+        organization.save(update_fields=["location"])
+        self.assertEqual(self.search(q="ibadan"), [self.engineer.id])
+
+    def test_search_paginates_by_rank(self):
+        for i in range(3):
+            self.create_job("Python Developer %s" % i, "Python", self.organization)
+
+        url, seen = self.url + "?q=python&page_size=2", []
+        while url:
+            response = self.client.get(url)
+            seen.extend(job["id"] for job in response.data["data"])
+            url = response.data["next"]
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_search_requires_query(self):
+        response = self.client.get(self.url, {"q": "  "})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MatchingTests(TestCase):
+    def setUp(self):
+        matching_engine.clear()
+        self.client = APIClient()
+        self.org_admin = User.objects.create_user(
+            name="Org Admin", email="admin@example.com", role=UserRoles.ORG_ADMIN
+        )
+        self.organization = Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.org_admin
+        )
+        self.job = Job.objects.create(
+            title="Backend Engineer",
+            description="Python, Django and PostgreSQL APIs",
+            created_by=self.org_admin,
+            org_id=self.organization,
+        )
+        self.other_job = Job.objects.create(
+            title="Accountant",
+            description="Bookkeeping, payroll and audits",
+            created_by=self.org_admin,
+            org_id=self.organization,
+        )
+        self.strong = self.apply("strong", "Django and Python APIs on PostgreSQL")
+        self.weak = self.apply("weak", "Python scripting")
+        self.apply("none", "Carpentry")
+
+    def apply(self, name, skill_description, job=None):
+        return Application.objects.create(
+            applicant_id=User.objects.create_user(
+                name=name, email="%s@example.com" % name
+            ),
+            job=job or self.job,
+            skill_description=skill_description,
+        )
+
+    def test_matches_ranks_applications(self):
+        self.client.force_authenticate(user=self.org_admin)
+        url = f"/v1/core/api/jobs/{self.job.id}/matches/"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ranked = [application["id"] for application in response.data["data"]]
+        self.assertEqual(ranked, [self.strong.id, self.weak.id])
+
+        # New and deleted applications are picked up incrementally.
+        best = self.apply("best", "Backend engineer: Python, Django, PostgreSQL APIs")
+        self.strong.delete()
+        response = self.client.get(url)
+        ranked = [application["id"] for application in response.data["data"]]
+        self.assertEqual(ranked, [best.id, self.weak.id])
+
+    def test_recommended_jobs(self):
+        payroll = Job.objects.create(
+            title="Payroll Clerk",
+            description="Payroll",
+            created_by=self.org_admin,
+            org_id=self.organization,
+        )
+        application = self.apply("clerk", "Payroll, bookkeeping and audits", payroll)
+        self.client.force_authenticate(user=application.applicant_id)
+
+        response = self.client.get("/v1/core/api/jobs/recommended/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ranked = [job["id"] for job in response.data["data"]]
+        # The job already applied to is left out.
+        self.assertEqual(ranked, [self.other_job.id])
+
+    def test_index_document_frequencies_stay_sparse(self):
+        index = MatchIndex()
+        index.add([(1, 1, "python django"), (2, 1, "python react")])
+        self.assertEqual(sorted(index.df.values()), [1, 1, 2])
+        self.assertEqual(index.score("django", 2)[0][0], 1)
+
+        index.remove([1, 2])
+        self.assertEqual(index.df, {})
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.org_admin = User.objects.create_user(
+            name="Org Admin", email="admin@example.com", role=UserRoles.ORG_ADMIN
+        )
+        self.organization = Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.org_admin
+        )
+        self.job = Job.objects.create(
+            title="Test Job",
+            created_by=self.org_admin,
+            description="Job Description",
+            org_id=self.organization,
+        )
+        for i in range(3):
+            user = User.objects.create_user(
+                name="User %s" % i, email="user%s@example.com" % i
+            )
+            Staff.objects.create(user=user, organization=self.organization)
+            Application.objects.create(
+                applicant_id=user, job=self.job, skill_description="Skills, %s" % i
+            )
+        self.client.force_authenticate(user=self.org_admin)
+
+    def test_export_applications_csv(self):
+        url = f"/v1/core/api/jobs/{self.job.id}/export/"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+
+        rows = list(csv.reader(io.StringIO(b"".join(response).decode())))
+        self.assertEqual(rows[0][:3], ["id", "applicant", "name"])
+        self.assertEqual(
+            [row[4] for row in rows[1:]], ["Skills, 0", "Skills, 1", "Skills, 2"]
+        )
+
+    def test_export_staff_ndjson(self):
+        response = self.client.get(
+            reverse("org_staff_export"), {"file_format": "ndjson"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in b"".join(response).splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["email"], "user0@example.com")
+
+    def test_export_rejects_unknown_format(self):
+        response = self.client.get(reverse("org_staff_export"), {"file_format": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(ASYNC_API={"ENABLED": True})
+    def test_export_streams_asynchronously_under_asgi(self):
+        response = self.client.get(
+            reverse("org_staff_export"), {"file_format": "ndjson"}
+        )
+        self.assertTrue(response.is_async)
+
+        async def read():
+            return b"".join([chunk async for chunk in response])
+
+        rows = [json.loads(line) for line in async_to_sync(read)().splitlines()]
+        self.assertEqual(len(rows), 3)
+
+
+@override_settings(
+    BULK_IMPORT={
+        "BATCH_SIZE": 2,
+        "HASH_WORKERS": 1,
+        "MAX_API_ROWS": 5,
+        "MAX_API_PASSWORDS": 2,
+    }
+)
+class StaffImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.org_admin = User.objects.create_user(
+            name="Org Admin", email="admin@example.com", role=UserRoles.ORG_ADMIN
+        )
+        self.organization = Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.org_admin
+        )
+        self.existing = User.objects.create_user(
+            name="Existing", email="existing@example.com"
+        )
+        self.client.force_authenticate(user=self.org_admin)
+
+    def upload(self, content, name="staff.csv"):
+        return self.client.post(
+            reverse("org_staff_import"),
+            {"file": SimpleUploadedFile(name, content.encode())},
+            format="multipart",
+        )
+
+    def test_import_staff_csv(self):
+        response = self.upload(
+            "email,name,password,role\n"
+            "new1@example.com,New One,password123,org_hr\n"
+            "new2@example.com,New Two,,\n"
+            "existing@example.com,Existing,,\n"
+            "not-an-email,Broken,,\n"
+            "new1@example.com,Duplicate,,\n"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report = response.data["data"]
+        self.assertEqual(
+            (report["created"], report["skipped"], report["failed"]), (2, 1, 2)
+        )
+        self.assertEqual([error["row"] for error in report["errors"]], [4, 5])
+        # Existing accounts are never made staff without being asked.
+        self.assertEqual(
+            [(skip["row"], skip["email"]) for skip in report["skips"]],
+            [(3, "existing@example.com")],
+        )
+        self.assertFalse(
+            self.organization.org_staff.filter(user=self.existing).exists()
+        )
+
+        new1 = User.objects.get(email="new1@example.com")
+        self.assertTrue(new1.check_password("password123"))
+        self.assertEqual(new1.role, UserRoles.ORG_HR)
+        self.assertFalse(
+            User.objects.get(email="new2@example.com").has_usable_password()
+        )
+        self.assertEqual(self.organization.org_staff.count(), 2)
+        self.organization.refresh_from_db()
+        self.assertEqual(self.organization.staff_count, 2)
+
+    def test_import_staff_row_limit(self):
+        rows = "".join("u%s@example.com,User\n" % i for i in range(6))
+        response = self.upload("email,name\n" + rows)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_staff_unreadable_file(self):
+        for content in [
+            "email,name\nzoe@example.com,Zoë\n".encode("latin-1"),
+            # Over the csv module's field size limit.
+            b'email,name\nbig@example.com,"' + b"x" * 200000 + b'"\n',
+        ]:
+            response = self.client.post(
+                reverse("org_staff_import"),
+                {"file": SimpleUploadedFile("staff.csv", content)},
+                format="multipart",
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(User.objects.filter(email__startswith="zoe").exists())
+
+    def test_import_staff_password_limit(self):
+        rows = "".join("u%s@example.com,User,password123\n" % i for i in range(3))
+        response = self.upload("email,name,password\n" + rows)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(User.objects.filter(email="u0@example.com").exists())
+
+    def test_import_staff_signup_race(self):
+        hash_passwords = bulk.hash_passwords
+
+        def signup_while_hashing(passwords, executor=None):
+            User.objects.create_user(name="Racer", email="new2@example.com")
+            return hash_passwords(passwords, executor)
+
+        with patch("base.bulk.hash_passwords", signup_while_hashing):
+            response = self.upload(
+                "email,name\nnew1@example.com,New One\nnew2@example.com,New Two\n"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report = response.data["data"]
+        self.assertEqual((report["created"], report["skipped"]), (1, 1))
+        self.assertEqual(report["skips"][0]["row"], 2)
+        self.assertEqual(User.objects.get(email="new2@example.com").name, "Racer")
+        self.assertEqual(
+            list(self.organization.org_staff.values_list("user__email", flat=True)),
+            ["new1@example.com"],
+        )
+
+    def test_import_staff_command_with_process_pool(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".ndjson") as f:
+            for i in range(2):
+                f.write(
+                    json.dumps(
+                        {
+                            "email": "pool%s@example.com" % i,
+                            "name": "Pool %s" % i,
+                            "password": "password123",
+                        }
+                    )
+                    + "\n"
+                )
+            f.flush()
+            call_command(
+                "import_staff",
+                f.name,
+                org=self.organization.id,
+                workers=2,
+                stdout=io.StringIO(),
+            )
+
+        user = User.objects.get(email="pool1@example.com")
+        self.assertTrue(user.check_password("password123"))
+        self.assertTrue(self.organization.org_staff.filter(user=user).exists())
+
+
+class BulkJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.org_admin = User.objects.create_user(
+            name="Org Admin", email="admin@example.com", password="password123"
+        )
+        self.organization = Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.org_admin
+        )
+        self.org_hr = User.objects.create_user(
+            name="Org HR",
+            role=UserRoles.ORG_HR,
+            email="hr@example.com",
+            password="password123",
+        )
+        Staff.objects.create(user=self.org_hr, organization=self.organization)
+        self.client.force_authenticate(user=self.org_hr)
+        self.url = "/v1/core/api/jobs/create/batch/"
+
+    def create_jobs(self, count):
+        return [
+            Job.objects.create(
+                title="Job %s" % i,
+                created_by=self.org_hr,
+                description="Job Description",
+                org_id=self.organization,
+            )
+            for i in range(count)
+        ]
+
+    def test_batch_create_reports_each_item(self):
+        jobs = [
+            {"title": "Backend Engineer", "description": "Python"},
+            {"title": "x" * 400, "description": "Too long"},
+        ]
+        response = self.client.post(self.url, {"jobs": jobs}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        report = response.data["data"]
+        self.assertEqual((report["created"], report["failed"]), (1, 1))
+        created, failed = report["results"]
+        job = Job.objects.get(pk=created["id"])
+        self.assertEqual(job.org_id, self.organization)
+        self.assertEqual(job.created_by, self.org_hr)
+        self.assertIn("title", failed["errors"])
+
+        search = self.client.get(reverse("job_search"), {"q": "backend"})
+        self.assertEqual(search.data["data"][0]["id"], job.id)
+
+    def test_batch_create_query_count_is_constant(self):
+        for count in (2, 50):
+            jobs = [{"title": "Job", "description": "Description"}] * count
+            with self.assertNumQueries(6):
+                response = self.client.post(self.url, {"jobs": jobs}, format="json")
+            self.assertEqual(response.data["data"]["created"], count)
+
+    def test_batch_update(self):
+        job, other = self.create_jobs(2)
+        foreign = Job.objects.create(
+            title="Foreign",
+            created_by=self.org_admin,
+            description="Job Description",
+            org_id=Organization.objects.create(
+                name="Other", location="Elsewhere", admin=self.org_admin
+            ),
+        )
+        items = [
+            {"id": job.id, "title": "Renamed"},
+            {"id": other.id, "description": "x" * 600},
+            {"id": foreign.id, "title": "Hijacked"},
+        ]
+        response = self.client.patch(self.url, {"jobs": items}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        statuses = [result["status"] for result in response.data["data"]["results"]]
+        self.assertEqual(statuses, ["updated", "failed", "not_found"])
+        job.refresh_from_db()
+        foreign.refresh_from_db()
+        self.assertEqual(job.title, "Renamed")
+        self.assertGreater(job.modified, other.modified)
+        self.assertEqual(foreign.title, "Foreign")
+
+    def test_batch_update_rejects_invalid_ids(self):
+        [job] = self.create_jobs(1)
+        items = [
+            {"id": [job.id], "title": "List"},
+            {"id": {"pk": job.id}, "title": "Dict"},
+            {"id": True, "title": "Bool"},
+            {"id": 2**64, "title": "Huge"},
+        ]
+        response = self.client.patch(self.url, {"jobs": items}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statuses = [result["status"] for result in response.data["data"]["results"]]
+        self.assertEqual(statuses, ["failed"] * 4)
+        job.refresh_from_db()
+        self.assertEqual(job.title, "Job 0")
+
+        response = self.client.post(
+            self.url + "close/", {"ids": [2**64]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_close(self):
+        open_job, closed_job = self.create_jobs(2)
+        Job.objects.filter(pk=closed_job.pk).update(is_open=False)
+        self.assertEqual(
+            len(self.client.get("/v1/core/api/jobs/create/").data["data"]), 1
+        )
+
+        ids = [open_job.id, closed_job.id, 0]
+        response = self.client.post(self.url + "close/", {"ids": ids}, format="json")
+        statuses = [result["status"] for result in response.data["data"]["results"]]
+        self.assertEqual(statuses, ["closed", "already_closed", "not_found"])
+        self.assertFalse(Job.objects.get(pk=open_job.pk).is_open)
+        # The cached job list page is invalidated by the bulk update.
+        self.assertEqual(self.client.get("/v1/core/api/jobs/create/").data["data"], [])
+
+    @override_settings(BULK_JOBS_MAX_ITEMS=2)
+    def test_batch_size_is_limited(self):
+        response = self.client.post(
+            self.url + "close/", {"ids": [1, 2, 3]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_requires_hr(self):
+        self.client.force_authenticate(user=self.org_admin)
+        response = self.client.post(self.url, {"jobs": [{}]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class JobExpiryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.org_hr = User.objects.create_user(
+            name="Org HR",
+            role=UserRoles.ORG_HR,
+            email="hr@example.com",
+            password="password123",
+        )
+        self.organization = Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.org_hr
+        )
+        Staff.objects.create(user=self.org_hr, organization=self.organization)
+        self.client.force_authenticate(user=self.org_hr)
+
+    def create_job(self, closes_at):
+        return Job.objects.create(
+            title="Test Job",
+            created_by=self.org_hr,
+            description="Job Description",
+            org_id=self.organization,
+            closes_at=closes_at,
+        )
+
+    def test_command_closes_expired_jobs(self):
+        now = timezone.now()
+        expired = [self.create_job(now - timedelta(minutes=i)) for i in range(1, 4)]
+        upcoming = self.create_job(now + timedelta(days=1))
+        no_deadline = self.create_job(None)
+
+        out = io.StringIO()
+        call_command("close_expired_jobs", batch_size=2, stdout=out)
+        self.assertIn("closed: 3", out.getvalue())
+
+        open_ids = set(Job.objects.filter(is_open=True).values_list("id", flat=True))
+        self.assertEqual(open_ids, {upcoming.id, no_deadline.id})
+        self.assertGreater(
+            Job.objects.get(pk=expired[0].pk).modified, expired[0].modified
+        )
+
+        response = self.client.get("/v1/core/api/jobs/create/")
+        self.assertEqual(len(response.data["data"]), 2)
+
+    def test_reopening_expired_job_drops_closing_date(self):
+        job = self.create_job(timezone.now() - timedelta(minutes=1))
+        call_command("close_expired_jobs", stdout=io.StringIO())
+
+        url = f"/v1/core/api/jobs/create/{job.id}/"
+        response = self.client.patch(url, {"is_open": True}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["data"]["closes_at"])
+
+        call_command("close_expired_jobs", stdout=io.StringIO())
+        self.assertTrue(Job.objects.get(pk=job.pk).is_open)
+
+    def test_batch_reopening_expired_job_drops_closing_date(self):
+        job = self.create_job(timezone.now() - timedelta(minutes=1))
+        call_command("close_expired_jobs", stdout=io.StringIO())
+
+        response = self.client.patch(
+            "/v1/core/api/jobs/create/batch/",
+            {"jobs": [{"id": job.id, "is_open": True}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        job.refresh_from_db()
+        self.assertEqual((job.is_open, job.closes_at), (True, None))
+
+    def test_closing_date_must_be_in_the_future(self):
+        job_data = {
+            "title": "Test Job",
+            "description": "Job Description",
+            "closes_at": (timezone.now() - timedelta(hours=1)).isoformat(),
+        }
+        response = self.client.post(
+            "/v1/core/api/jobs/create/", data=job_data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class StaffAccessCodeTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.org_admin = User.objects.create_user(
+            name="Org Admin",
+            email="admin@example.com",
+            role=UserRoles.ORG_ADMIN,
+            password="password123",
+        )
+        self.organization = Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.org_admin
+        )
+        self.staff_user = User.objects.create_user(
+            name="Staff User", email="staff@example.com", password="password123"
+        )
+
+    def join(self, code):
+        self.client.force_authenticate(user=self.staff_user)
+        return self.client.post(reverse("staff_joins_org"), {"org_access_code": code})
+
+    def test_code_format(self):
+        code = self.organization.staff_access_code
+        self.assertEqual(len(code), 10)
+        self.assertTrue(set(code) <= set("abcdefghjkmnpqrstuvwxyz23456789"))
+
+    @override_settings(STAFF_ACCESS_CODE={**settings.STAFF_ACCESS_CODE, "TTL": 3600})
+    def test_rotate_legacy_codes(self):
+        Organization.objects.filter(pk=self.organization.pk).update(
+            staff_access_code="ab1", staff_access_code_expires=None
+        )
+        current = Organization.objects.create(
+            name="Current", location="Elsewhere", admin=self.org_admin
+        )
+        out = io.StringIO()
+        call_command("rotate_access_codes", stdout=out)
+        self.assertIn("rotated: 1", out.getvalue())
+
+        self.organization.refresh_from_db()
+        self.assertEqual(len(self.organization.staff_access_code), 10)
+        self.assertIsNotNone(self.organization.staff_access_code_expires)
+        code = current.staff_access_code
+        current.refresh_from_db()
+        self.assertEqual(current.staff_access_code, code)
+
+    def test_colliding_code_is_redrawn(self):
+        other = Organization.objects.create(
+            name="Other",
+            location="Elsewhere",
+            admin=self.org_admin,
+            staff_access_code=self.organization.staff_access_code,
+        )
+        self.assertNotEqual(
+            other.staff_access_code, self.organization.staff_access_code
+        )
+
+    def test_rotate_invalidates_old_code(self):
+        old_code = self.organization.staff_access_code
+        self.client.force_authenticate(user=self.org_admin)
+        response = self.client.post(reverse("org_access_code_rotate"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        new_code = response.data["data"]["staff_access_code"]
+        self.assertNotEqual(new_code, old_code)
+
+        self.assertEqual(self.join(old_code).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.join(new_code).status_code, status.HTTP_200_OK)
+
+    @override_settings(STAFF_ACCESS_CODE={**settings.STAFF_ACCESS_CODE, "TTL": 60 * 60})
+    def test_expired_code_is_rejected(self):
+        self.organization.rotate_staff_access_code()
+        self.assertIsNotNone(self.organization.staff_access_code_expires)
+        Organization.objects.filter(pk=self.organization.pk).update(
+            staff_access_code_expires=timezone.now() - timedelta(seconds=1)
+        )
+        response = self.join(self.organization.staff_access_code)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.organization.org_staff.exists())
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.org_admin = User.objects.create_user(
+            name="Org Admin",
+            email="admin@example.com",
+            role=UserRoles.ORG_ADMIN,
+            password="password123",
+        )
+        self.organization = Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.org_admin
+        )
+        self.job = Job.objects.create(
+            title="Test Job",
+            created_by=self.org_admin,
+            description="Job Description",
+            org_id=self.organization,
+        )
+        self.users = [
+            User.objects.create_user(name="User %s" % i, email="user%s@example.com" % i)
+            for i in range(3)
+        ]
+
+    def test_application_count(self):
+        for user in self.users:
+            self.client.force_authenticate(user=user)
+            self.client.post(
+                f"/v1/core/api/jobs/{self.job.id}/apply/",
+                {"skill_description": "Skills"},
+                format="json",
+            )
+        self.users[0].delete()
+
+        response = self.client.get("/v1/core/api/jobs/create/")
+        self.assertEqual(response.data["data"][0]["application_count"], 2)
+
+    def test_staff_count(self):
+        for user in self.users:
+            Staff.objects.create(user=user, organization=self.organization)
+        Staff.objects.filter(user=self.users[0]).delete()
+
+        self.client.force_authenticate(user=self.org_admin)
+        response = self.client.get(reverse("create_org"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"]["staff_count"], 2)
+
+    def test_reconcile_repairs_drift(self):
+        Staff.objects.create(user=self.users[0], organization=self.organization)
+        Application.objects.create(
+            applicant_id=self.users[1], job=self.job, skill_description="Skills"
+        )
+        Organization.objects.update(staff_count=7)
+        Job.objects.update(application_count=0)
+
+        out = io.StringIO()
+        call_command("reconcile_counters", batch_size=1, stdout=out)
+        self.assertIn("application_count: 1, staff_count: 1", out.getvalue())
+        self.assertEqual(Organization.objects.get().staff_count, 1)
+        self.assertEqual(Job.objects.get().application_count, 1)
+
+
+class MergeDuplicatesTests(TransactionTestCase):
+    """Duplicates written before the unique constraints existed."""
+
+    def setUp(self):
+        self.constraints = [
+            (model, model._meta.constraints[0]) for model in (Staff, Application)
+        ]
+        # SQLite rebuilds the table from the model, so hide the constraint.
+        self.code_field = Organization._meta.get_field("staff_access_code")
+        self.legacy_code_field = self.code_field.clone()
+        self.legacy_code_field.set_attributes_from_name("staff_access_code")
+        self.legacy_code_field._unique = False
+        with connection.schema_editor() as editor:
+            for model, constraint in self.constraints:
+                with patch.object(model._meta, "constraints", []):
+                    editor.remove_constraint(model, constraint)
+            editor.alter_field(Organization, self.code_field, self.legacy_code_field)
+
+    def tearDown(self):
+        with connection.schema_editor() as editor:
+            for model, constraint in self.constraints:
+                editor.add_constraint(model, constraint)
+            editor.alter_field(Organization, self.legacy_code_field, self.code_field)
+
+    def test_merge_duplicates_keeps_oldest(self):
+        admin = User.objects.create_user(name="Org Admin", email="admin@example.com")
+        organization = Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=admin
+        )
+        job = Job.objects.create(
+            title="Test Job", description="Job", created_by=admin, org_id=organization
+        )
+        user = User.objects.create_user(name="User", email="user@example.com")
+        oldest = Staff.objects.create(
+            user=user, organization=organization, exit_date=timezone.now()
+        )
+        Staff.objects.create(user=user, organization=organization)
+        first = Application.objects.create(
+            applicant_id=user, job=job, skill_description="First"
+        )
+        for _ in range(2):
+            Application.objects.create(
+                applicant_id=user, job=job, skill_description="Again"
+            )
+
+        out = io.StringIO()
+        call_command("merge_duplicates", stdout=out)
+        self.assertIn("staff: 1, application: 2, staff_access_code: 0", out.getvalue())
+        # No signals: counters and tombstones may not exist yet.
+        self.assertFalse(Tombstone.objects.exists())
+        call_command("reconcile_counters", stdout=io.StringIO())
+
+        staff = Staff.objects.get()
+        self.assertEqual(staff.pk, oldest.pk)
+        # The duplicate was still employed, so the merged row is too.
+        self.assertIsNone(staff.exit_date)
+        self.assertEqual(Application.objects.get().pk, first.pk)
+        job.refresh_from_db()
+        organization.refresh_from_db()
+        self.assertEqual((job.application_count, organization.staff_count), (1, 1))
+
+    def test_merge_duplicate_access_codes(self):
+        admin = User.objects.create_user(name="Org Admin", email="admin@example.com")
+        for i, code in enumerate(["ab1", "ab1", "ab1", "xyz"]):
+            Organization.objects.create(
+                name="Org %s" % i, location="Here", admin=admin, staff_access_code=code
+            )
+
+        out = io.StringIO()
+        call_command("merge_duplicates", stdout=out)
+        self.assertIn("staff_access_code: 2", out.getvalue())
+        codes = list(
+            Organization.objects.order_by("pk").values_list(
+                "staff_access_code", flat=True
+            )
+        )
+        self.assertEqual((codes[0], codes[3]), ("ab1", "xyz"))
+        self.assertEqual(len(set(codes)), 4)
+        # Still fits the column as it is before the migration.
+        self.assertEqual({len(code) for code in codes}, {3})
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.org_admin = User.objects.create_user(
+            name="Org Admin",
+            email="admin@example.com",
+            role=UserRoles.ORG_ADMIN,
+            password="password123",
+        )
+        self.organization = Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.org_admin
+        )
+        self.jobs = [
+            Job.objects.create(
+                title="Job %s" % i,
+                created_by=self.org_admin,
+                description="Job Description",
+                org_id=self.organization,
+            )
+            for i in range(3)
+        ]
+        applicants = [
+            User.objects.create_user(name="User %s" % i, email="user%s@example.com" % i)
+            for i in range(3)
+        ]
+        for applicant in applicants:
+            Application.objects.create(
+                applicant_id=applicant, job=self.jobs[0], skill_description="Skills"
+            )
+        Application.objects.create(
+            applicant_id=applicants[0], job=self.jobs[1], skill_description="Skills"
+        )
+        self.client.force_authenticate(user=self.org_admin)
+
+    def test_rollup_and_report(self):
+        self.jobs[2].set_open(False)
+        self.jobs[2].save()
+
+        call_command("rollup_analytics", stdout=io.StringIO())
+        # Runs are idempotent.
+        call_command("rollup_analytics", stdout=io.StringIO())
+
+        response = self.client.get(reverse("org_analytics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data["data"]
+        totals = data["totals"]
+        self.assertEqual(
+            (totals["jobs_opened"], totals["jobs_closed"], totals["applications"]),
+            (3, 1, 4),
+        )
+        self.assertGreaterEqual(totals["avg_time_to_close"], 0)
+        self.assertEqual(len(data["days"]), 1)
+        self.assertEqual(
+            [(job["job"], job["applications"]) for job in data["jobs"]],
+            [(self.jobs[0].id, 3), (self.jobs[1].id, 1)],
+        )
+
+    def test_report_query_count_is_constant(self):
+        call_command("rollup_analytics", stdout=io.StringIO())
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("org_analytics"))
+        self.assertEqual(response.data["data"]["totals"]["applications"], 4)
+
+    def test_invalid_range_is_rejected(self):
+        today = timezone.localdate()
+        response = self.client.get(
+            reverse("org_analytics"),
+            {
+                "start": today.isoformat(),
+                "end": (today - timedelta(days=1)).isoformat(),
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_impossible_date_is_rejected(self):
+        response = self.client.get(reverse("org_analytics"), {"start": "2020-02-30"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+REPLICAS = [alias for alias in settings.DATABASES if alias != "default"]
+
+
+def with_replicas(aliases):
+    return override_settings(
+        READ_REPLICAS={**settings.READ_REPLICAS, "ALIASES": aliases}
+    )
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    @with_replicas(["replica"])
+    def test_reads_opt_in_to_replicas(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Job))
+        with reads_from_replica():
+            self.assertEqual(router.db_for_read(Job), "replica")
+            self.assertEqual(router.db_for_write(Job), "default")
+            with primary_reads():
+                self.assertIsNone(router.db_for_read(Job))
+
+
+class ReadYourWritesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            name="Test User", email="testuser@example.com", password="password123"
+        )
+        self.organization = Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.user
+        )
+        self.client.force_authenticate(user=self.user)
+
+    @with_replicas(["replica"])
+    def test_unsafe_requests_pin_user_to_primary(self):
+        self.client.get("/v1/core/api/jobs/create/")
+        self.assertFalse(is_pinned(self.user))
+        self.client.post(
+            reverse("staff_joins_org"),
+            {"org_access_code": self.organization.staff_access_code},
+        )
+        self.assertTrue(is_pinned(self.user))
+
+    @with_replicas(["replica"])
+    def test_pin_cache_must_be_shared(self):
+        with self.assertRaises(ImproperlyConfigured):
+            check_pin_cache()
+        redis = "django.core.cache.backends.redis.RedisCache"
+        with override_settings(CACHES={"default": {"BACKEND": redis}}):
+            check_pin_cache()
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Reads routed by the middleware and router, with the primary standing
+    in for the replica: routing decisions are counted, not connections.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.org_admin = User.objects.create_user(
+            name="Org Admin", email="admin@example.com", role=UserRoles.ORG_ADMIN
+        )
+        Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.org_admin
+        )
+        self.client.force_authenticate(user=self.org_admin)
+
+    def replica_reads(self, method, url):
+        with patch("base.routers.random.choice", return_value="default") as choice:
+            response = getattr(self.client, method)(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return choice.call_count
+
+    @with_replicas(["default"])
+    def test_reads_leave_replica_after_write(self):
+        self.assertGreater(self.replica_reads("get", reverse("org_staff")), 0)
+        self.assertEqual(
+            self.replica_reads("post", reverse("org_access_code_rotate")), 0
+        )
+        self.assertEqual(self.replica_reads("get", reverse("org_staff")), 0)
+
+        cache.delete(pin_key(self.org_admin))
+        self.assertGreater(self.replica_reads("get", reverse("org_staff")), 0)
+
+
+@skipUnless(REPLICAS, "No read replica configured, see DB_REPLICA_HOSTS.")
+class ReadReplicaTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.org_admin = User.objects.create_user(
+            name="Org Admin",
+            email="admin@example.com",
+            role=UserRoles.ORG_ADMIN,
+            password="password123",
+        )
+        Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.org_admin
+        )
+        self.client.force_authenticate(user=self.org_admin)
+
+    def get_staff(self):
+        primary = CaptureQueriesContext(connections["default"])
+        replica = CaptureQueriesContext(connections[REPLICAS[0]])
+        with primary, replica:
+            response = self.client.get(reverse("org_staff"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(primary), len(replica)
+
+    @with_replicas(REPLICAS[:1])
+    def test_reads_leave_replica_after_write(self):
+        primary, replica = self.get_staff()
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+        self.client.post(reverse("org_access_code_rotate"))
+        primary, replica = self.get_staff()
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def tearDown(self):
+        for key in list(PooledWrapper._connection_pools):
+            if key[1] == "pooled":
+                PooledWrapper._connection_pools.pop(key).close()
+
+    def get_connection(self, **extra):
+        handler = ConnectionHandler(
+            {
+                "default": {"ENGINE": "django.db.backends.dummy"},
+                "pooled": {
+                    "ENGINE": "base.db.backends.postgresql",
+                    "NAME": "hr_base",
+                    "OPTIONS": {"pool": {"min_size": 1, "max_size": 3}},
+                    **extra,
+                },
+            }
+        )
+        return handler["pooled"]
+
+    def test_pool_is_created_lazily_per_alias(self):
+        connection = self.get_connection()
+        self.assertNotIn("pool", connection.get_connection_params())
+        pool = connection.pool
+        self.assertIs(self.get_connection().pool, pool)
+        self.assertEqual((pool.min_size, pool.max_size), (1, 3))
+        self.assertEqual(pool.get_stats()["pool_max"], 3)
+
+    def test_pool_is_rebuilt_when_settings_change(self):
+        pool = self.get_connection().pool
+        with patch.object(pool, "close") as close:
+            replaced = self.get_connection(HOST="elsewhere").pool
+        self.assertIsNot(replaced, pool)
+        close.assert_called_once()
+        self.assertEqual(replaced.kwargs["host"], "elsewhere")
+        self.assertIs(self.get_connection(HOST="elsewhere").pool, replaced)
+
+    def test_pool_is_not_shared_across_fork(self):
+        pool = self.get_connection().pool
+        with patch.object(pool, "close") as close:
+            with patch("os.getpid", return_value=os.getpid() + 1):
+                child = self.get_connection().pool
+        self.assertIsNot(child, pool)
+        # The parent's connections are left to the parent.
+        close.assert_not_called()
+        self.assertNotIn(pool, PooledWrapper._connection_pools.values())
+
+    def test_pool_rejects_persistent_connections(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.get_connection(CONN_MAX_AGE=60).pool
+
+
+class AsyncViewTests(TestCase):
+    """The async views must answer exactly like the sync views they replace."""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        throttling.buckets.clear()
+        self.factory = RequestFactory()
+        self.client = APIClient()
+        self.org_admin = User.objects.create_user(
+            name="Org Admin",
+            email="admin@example.com",
+            role=UserRoles.ORG_ADMIN,
+            password="password123",
+        )
+        self.organization = Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.org_admin
+        )
+        self.job = Job.objects.create(
+            title="Test Job",
+            created_by=self.org_admin,
+            description="Job Description",
+            org_id=self.organization,
+        )
+        applicant = User.objects.create_user(
+            name="Applicant", email="applicant@example.com", password="password123"
+        )
+        Staff.objects.create(user=applicant, organization=self.organization)
+        Application.objects.create(
+            applicant_id=applicant, job=self.job, skill_description="Skills"
+        )
+        self.token = Token.objects.create(user=self.org_admin)
+        self.auth = {"HTTP_AUTHORIZATION": "Token %s" % self.token.key}
+        self.client.credentials(**self.auth)
+
+    def call(self, view, path, method="get", data=None, **kwargs):
+        request = getattr(self.factory, method)(
+            path, data, content_type="application/json", **self.auth
+        )
+        return async_to_sync(view)(request, **kwargs)
+
+    def test_read_views_match_sync_views(self):
+        for view, path, kwargs in [
+            (async_views.job_list, "/v1/core/api/jobs/create/", {}),
+            (async_views.org_staff, reverse("org_staff"), {}),
+            (
+                async_views.job_applications,
+                f"/v1/core/api/jobs/{self.job.id}/applications/",
+                {"pk": str(self.job.id)},
+            ),
+        ]:
+            expected = self.client.get(path)
+            cache.clear()
+            response = self.call(view, path, **kwargs)
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(json.loads(response.content), expected.json())
+            self.assertEqual(response.get("ETag"), expected.get("ETag"))
+
+    def test_job_list_not_modified(self):
+        response = self.call(async_views.job_list, "/v1/core/api/jobs/create/")
+        request = self.factory.get(
+            "/v1/core/api/jobs/create/",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+            **self.auth,
+        )
+        response = async_to_sync(async_views.job_list)(request)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_errors_match_sync_views(self):
+        self.auth = {}
+        response = self.call(async_views.job_list, "/v1/core/api/jobs/create/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.auth = {"HTTP_AUTHORIZATION": "Token %s" % self.token.key}
+        response = self.call(
+            async_views.job_applications,
+            "/v1/core/api/jobs/0/applications/",
+            pk="0",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            json.loads(response.content), {"status": False, "message": "Job not found"}
+        )
+
+    def test_login(self):
+        credentials = {"email": "admin@example.com", "password": "password123"}
+        response = self.call(async_views.login, "/", "post", credentials)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = json.loads(response.content)["data"]
+        self.assertEqual(data["auth_credentials"], {"token": self.token.key})
+        self.assertEqual(data["user"]["email"], "admin@example.com")
+        self.org_admin.refresh_from_db()
+        self.assertIsNotNone(self.org_admin.last_login)
+
+        for wrong in ({"password": "wrong"}, {"email": "nobody@example.com"}):
+            response = self.call(
+                async_views.login, "/", "post", {**credentials, **wrong}
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_methods_fall_back_to_sync_views(self):
+        response = self.call(async_views.login, "/", "get")
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        endpoint_metrics.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            name="Test User",
+            email="testuser@example.com",
+            role=UserRoles.ORG_ADMIN,
+            password="password123",
+            is_staff=True,
+        )
+        organization = Organization.objects.create(
+            name="Test Organization", location="Test Org", admin=self.user
+        )
+        Job.objects.create(
+            title="Test Job",
+            created_by=self.user,
+            description="Job Description",
+            org_id=organization,
+        )
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token %s" % token.key)
+
+    def test_server_timing_is_opt_in(self):
+        off = {**settings.INSTRUMENTATION, "SERVER_TIMING": False}
+        with override_settings(INSTRUMENTATION=off):
+            response = self.client.get("/v1/core/api/jobs/create/")
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    def test_server_timing_breaks_request_down(self):
+        on = {**settings.INSTRUMENTATION, "SERVER_TIMING": True}
+        with override_settings(INSTRUMENTATION=on), CaptureQueriesContext(
+            connections["default"]
+        ) as queries:
+            response = self.client.get("/v1/core/api/jobs/create/")
+        timing = response["Server-Timing"]
+        self.assertIn("total;dur=", timing)
+        self.assertIn("db;dur=", timing)
+        self.assertIn('desc="%s queries"' % len(queries), timing)
+        self.assertIn("auth;dur=", timing)
+        self.assertIn("render;dur=", timing)
+
+    def test_slow_requests_log_their_sql(self):
+        slow = {**settings.INSTRUMENTATION, "SLOW_REQUEST_MS": 0}
+        with override_settings(INSTRUMENTATION=slow), self.assertLogs(
+            "base.instrumentation", "WARNING"
+        ) as logs:
+            self.client.get("/v1/core/api/jobs/create/")
+        record = json.loads(logs.records[-1].getMessage().split(" ", 2)[2])
+        self.assertEqual(record["status"], status.HTTP_200_OK)
+        self.assertEqual(record["queries"], len(record["sql"]))
+        self.assertTrue(any("base_job" in query["sql"] for query in record["sql"]))
+
+    def test_metrics_endpoint_reports_endpoint_histograms(self):
+        for _ in range(2):
+            self.client.get("/v1/core/api/jobs/create/")
+        response = self.client.get(reverse("internal_metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        endpoints = response.data["data"]["endpoints"]
+        [job_list] = [
+            metrics
+            for endpoint, metrics in endpoints.items()
+            if endpoint.startswith("GET") and "api/jobs/create" in endpoint
+        ]
+        self.assertEqual(job_list["count"], 2)
+        self.assertEqual(sum(job_list["buckets"].values()), 2)
+        self.assertIsNotNone(job_list["p95_ms"])
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+
+    def run_benchmark(self, **options):
+        call_command(
+            "benchmark",
+            scenario=["job_list", "job_applications", "org_staff"],
+            iterations=3,
+            stdout=io.StringIO(),
+            **options,
+        )
+
+    def test_seeds_and_compares_with_baseline(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as f:
+            self.run_benchmark(seed="300", save=f.name)
+            self.assertEqual(Application.objects.count(), 300)
+            self.assertEqual(
+                Job.objects.get(
+                    pk=Application.objects.first().job_id
+                ).application_count,
+                30,
+            )
+            with open(f.name) as results:
+                baseline = json.load(results)
+            scenarios = baseline["scenarios"]
+            self.assertEqual(baseline["driver"], "client")
+            self.assertEqual(
+                set(scenarios), {"job_list", "job_applications", "org_staff"}
+            )
+            self.assertEqual(scenarios["job_applications"]["errors"], 0)
+            self.assertEqual(scenarios["job_applications"]["requests"], 3)
+            self.assertGreater(scenarios["job_applications"]["queries"], 0)
+
+            # Half the queries and a microsecond p95 cannot be matched.
+            scenarios["job_applications"]["queries"] /= 2
+            scenarios["org_staff"]["p95_ms"] = 0.001
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(baseline).encode())
+            f.flush()
+            with self.assertRaisesMessage(CommandError, "2 regression(s)"):
+                self.run_benchmark(baseline=f.name, tolerance=100)
+
+
+class GenerateDataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+
+    def generate(self, **options):
+        call_command(
+            "generate_data",
+            applications="2k",
+            # Workers could not see the rows of the test transaction.
+            workers=1,
+            stdout=io.StringIO(),
+            **options,
+        )
+
+    def snapshot(self):
+        return (
+            list(User.objects.order_by("id").values_list("email", "name", "role")),
+            list(Job.objects.order_by("id").values_list("title", "is_open")),
+            list(
+                Application.objects.order_by("id").values_list(
+                    "applicant_id__email", "job__title", "skill_description"
+                )
+            ),
+        )
+
+    def test_generates_same_dataset_for_same_seed(self):
+        self.generate()
+        self.assertEqual(Organization.objects.count(), 1)
+        self.assertEqual(Staff.objects.count(), 20)
+        self.assertEqual(Job.objects.count(), 20)
+        self.assertEqual(User.objects.count(), 1 + 20 + 200)
+        self.assertEqual(Application.objects.count(), 2000)
+        job = Job.objects.order_by("id").first()
+        self.assertEqual(job.application_count, job.application_set.count())
+        admin = User.objects.get(email="bench-admin@example.com")
+        self.assertTrue(admin.check_password("benchmark"))
+        self.assertEqual(Organization.objects.get().admin, admin)
+        first = self.snapshot()
+
+        with self.assertRaises(CommandError):
+            self.generate()
+
+        User.objects.all().delete()
+        self.generate()
+        self.assertEqual(self.snapshot(), first)
+        User.objects.all().delete()
+        self.generate(seed=1)
+        self.assertNotEqual(self.snapshot(), first)
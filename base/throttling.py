@@ -0,0 +1,150 @@
+"""
+Token bucket throttles for expensive endpoints such as login.
+
+A view opts in with ``throttle_classes`` and a ``throttle_scope``. Each
+class then looks up the ``"<scope>_<kind>"`` rate, e.g. ``login_ip``, in
+``REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]``. A kind without a rate is
+not throttled. A rate of ``N/period`` is a bucket of N tokens refilled at
+N per period, so clients can burst up to N requests, then keep up the
+average rate. Throttles run in ``APIView.initial``, so rejected requests
+never reach the password hasher or the database.
+
+Buckets live in a per-process LRU of ``THROTTLING["MAX_KEYS"]`` entries.
+When ``THROTTLING["SHARED_CACHE"]`` names an entry in ``CACHES``, buckets
+are read from and written to that cache so all workers share them. Such
+updates are not atomic, so concurrent workers may let a few extra
+requests through.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from base.cache import LRUCache
+
+# A bucket left alone for a day is full under any rate DRF can express.
+BUCKET_TTL = 24 * 60 * 60
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """``(requests, seconds)`` of a DRF rate such as ``10/min``."""
+    requests, period = rate.split("/")
+    return int(requests), PERIODS[period[0]]
+
+
+class TokenBuckets:
+    """``key -> (tokens, updated)`` for every bucket in use."""
+
+    key_prefix = "throttle:"
+
+    def __init__(self, max_keys, shared_alias=None):
+        self.local = LRUCache(max_size=max_keys, ttl=BUCKET_TTL)
+        self.shared_alias = shared_alias
+        self.lock = threading.Lock()
+
+    @property
+    def shared(self):
+        if not self.shared_alias:
+            return None
+        return caches[self.shared_alias]
+
+    def take(self, key, capacity, period):
+        """
+        Take a token from bucket ``key``, holding up to ``capacity`` tokens
+        refilled over ``period`` seconds. Returns ``(allowed, seconds
+        until a token is available)``.
+        """
+        now = time.time()
+        rate = capacity / period
+        with self.lock:
+            if self.shared is not None:
+                state = self.shared.get(self.key_prefix + key)
+            else:
+                state = self.local.get(key)
+            tokens, updated = state if state is not None else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * rate)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            state = (tokens, now)
+            if self.shared is not None:
+                self.shared.set(self.key_prefix + key, state, period)
+            else:
+                self.local.set(key, state)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def clear(self):
+        self.local.clear()
+
+
+buckets = TokenBuckets(
+    max_keys=settings.THROTTLING["MAX_KEYS"],
+    shared_alias=settings.THROTTLING["SHARED_CACHE"],
+)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle requests per ``get_ident`` in the view's scope."""
+
+    kind = None
+
+    def allow_request(self, request, view):
+        self.delay = None
+        scope = getattr(view, "throttle_scope", None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get("%s_%s" % (scope, self.kind))
+        if not settings.THROTTLING["ENABLED"] or rate is None:
+            return True
+        ident = self.get_bucket_ident(request)
+        if ident is None:
+            return True
+
+        capacity, period = parse_rate(rate)
+        allowed, self.delay = buckets.take(
+            "%s_%s:%s" % (scope, self.kind, ident), capacity, period
+        )
+        return allowed
+
+    def get_bucket_ident(self, request):
+        raise NotImplementedError(".get_bucket_ident() must be overridden")
+
+    def wait(self):
+        return self.delay
+
+
+class IPThrottle(TokenBucketThrottle):
+    """Per client IP, behind ``REST_FRAMEWORK["NUM_PROXIES"]`` proxies."""
+
+    kind = "ip"
+
+    def get_bucket_ident(self, request):
+        return self.get_ident(request)
+
+
+class EmailThrottle(TokenBucketThrottle):
+    """Per email in the request body, however many IPs try it."""
+
+    kind = "email"
+
+    def get_bucket_ident(self, request):
+        data = request.data
+        email = data.get("email") if hasattr(data, "get") else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return email.strip().lower()
+
+
+class UserThrottle(TokenBucketThrottle):
+    """Per authenticated user, or per IP for anonymous requests."""
+
+    kind = "user"
+
+    def get_bucket_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return "user-%s" % request.user.pk
+        return "ip-%s" % self.get_ident(request)
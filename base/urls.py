@@ -1,7 +1,8 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from base import views
+from base import async_views, views
 
 
 router = DefaultRouter()
@@ -20,7 +21,27 @@ urlpatterns = [
         views.UserLoginView.as_view(),
         name="login",
     ),
+    path(
+        "api/account/token/refresh",
+        views.TokenRefreshView.as_view(),
+        name="token_refresh",
+    ),
+    path(
+        "api/account/logout",
+        views.LogoutView.as_view(),
+        name="logout",
+    ),
     path("api/org/create", views.OrganizationView.as_view(), name="create_org"),
+    path(
+        "api/org/access-code/rotate",
+        views.OrganizationAccessCodeView.as_view(),
+        name="org_access_code_rotate",
+    ),
+    path(
+        "api/org/analytics",
+        views.OrganizationAnalyticsView.as_view(),
+        name="org_analytics",
+    ),
     path(
         "api/org/staff/join",
         views.StaffJoinsOrganizationView.as_view(),
@@ -31,4 +52,43 @@ urlpatterns = [
         views.OrganizationStaffView.as_view(),
         name="org_staff",
     ),
+    path(
+        "api/org/staff/import",
+        views.StaffImportView.as_view(),
+        name="org_staff_import",
+    ),
+    path(
+        "api/org/staff/export",
+        views.OrganizationStaffExportView.as_view(),
+        name="org_staff_export",
+    ),
+    path("api/jobs/search", views.JobSearchView.as_view(), name="job_search"),
+    path("api/sync", views.SyncView.as_view(), name="sync"),
+    path(
+        "api/internal/stats",
+        views.InternalStatsView.as_view(),
+        name="internal_stats",
+    ),
+    path(
+        "api/internal/metrics",
+        views.InternalMetricsView.as_view(),
+        name="internal_metrics",
+    ),
 ] + router.urls
+
+if settings.ASYNC_API["ENABLED"]:
+    # Same URLs and names, matched before the sync views they replace.
+    urlpatterns = [
+        path("api/account/login", async_views.login, name="login"),
+        path("api/org/staff", async_views.org_staff, name="org_staff"),
+        path(
+            "api/jobs/create/",
+            async_views.job_list,
+            name="create_and_update_job-list",
+        ),
+        path(
+            "api/jobs/<pk>/applications/",
+            async_views.job_applications,
+            name="create_and_list_job_application-applications",
+        ),
+    ] + urlpatterns
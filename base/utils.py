@@ -1,6 +1,134 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, Max
+from django.db.models.signals import post_save
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from django.utils.crypto import get_random_string
+from django.utils.dateparse import parse_datetime
+
+# Largest primary key, BigAutoField is a signed 64-bit integer.
+MAX_ID = 2**63 - 1
 
 
 def gen_staff_access_code():
-    RANDOM_STRING_CHARS = "abchrbasefghijklmnopqrsytuvwxzut0123456789"
-    return get_random_string(3, allowed_chars=RANDOM_STRING_CHARS)
+    return get_random_string(
+        settings.STAFF_ACCESS_CODE["LENGTH"],
+        allowed_chars=settings.STAFF_ACCESS_CODE["ALPHABET"],
+    )
+
+
+def gen_staff_access_code_expiry():
+    ttl = settings.STAFF_ACCESS_CODE["TTL"]
+    return timezone.now() + timedelta(seconds=ttl) if ttl else None
+
+
+def get_list_etag(queryset, *extra):
+    """
+    Return an ETag describing the rows of a list endpoint, computed from a
+    single MAX(modified)/COUNT aggregate.
+
+    ``extra`` values (page cursor, organization, ...) are folded into it
+    so that different views of the same rows do not share it. There is
+    no Last-Modified: a row leaving the list, e.g. a closed job, can
+    leave MAX(modified) unchanged, which only the count catches.
+    """
+    stats = queryset.aggregate(last_modified=Max("modified"), count=Count("id"))
+    return etag_from(stats, extra)
+
+
+async def aget_list_etag(queryset, *extra):
+    """``get_list_etag`` for async views, using the async ORM."""
+    stats = await queryset.aaggregate(last_modified=Max("modified"), count=Count("id"))
+    return etag_from(stats, extra)
+
+
+def etag_from(stats, extra):
+    fingerprint = repr((stats["last_modified"], stats["count"]) + extra)
+    return '"%s"' % hashlib.md5(fingerprint.encode()).hexdigest()
+
+
+def get_not_modified_response(request, etag):
+    """Return a 304 response if the client's copy is current, else None."""
+    return get_conditional_response(request, etag=etag)
+
+
+def set_etag(response, etag):
+    response["ETag"] = etag
+    return response
+
+
+def parse_timestamp(value):
+    """
+    Parse an ISO 8601 query parameter into an aware datetime, or return
+    None if it is not one. A ``+`` offset decoded as a space is restored.
+    """
+    try:
+        value = parse_datetime(value.replace(" ", "+"))
+    except ValueError:
+        # Well formed but impossible, e.g. February 30th.
+        return None
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def is_valid_id(value):
+    """Whether ``value`` is an int, not a bool, in the primary key range."""
+    return type(value) is int and 0 < value <= MAX_ID
+
+
+def insert_or_ignore(instance, conflict_fields):
+    """
+    Save a new ``instance`` with a single
+    ``INSERT ... ON CONFLICT (conflict_fields) DO NOTHING RETURNING pk``
+    and return whether a row was inserted.
+
+    Unlike get_or_create() this cannot race: the unique constraint on
+    ``conflict_fields`` decides. post_save is sent for inserted rows.
+    """
+    model = type(instance)
+    opts = model._meta
+    using = router.db_for_write(model, instance=instance)
+    connection = connections[using]
+    quote = connection.ops.quote_name
+
+    fields = [field for field in opts.concrete_fields if not field.primary_key]
+    values = [
+        field.get_db_prep_save(field.pre_save(instance, True), connection)
+        for field in fields
+    ]
+    sql = "INSERT INTO %s (%s) VALUES (%s) ON CONFLICT (%s) DO NOTHING RETURNING %s" % (
+        quote(opts.db_table),
+        ", ".join(quote(field.column) for field in fields),
+        ", ".join(["%s"] * len(fields)),
+        ", ".join(quote(opts.get_field(name).column) for name in conflict_fields),
+        quote(opts.pk.column),
+    )
+    # Handlers (e.g. counters) commit or roll back with the row.
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, values)
+            row = cursor.fetchone()
+        if row is None:
+            return False
+
+        instance.pk = row[0]
+        instance._state.adding = False
+        instance._state.db = using
+        post_save.send(
+            sender=model, instance=instance, created=True, raw=False, using=using
+        )
+    return True
+
+
+def get_pool_stats():
+    """Counters of the connection pools this process opened, by alias."""
+    return {
+        connection.alias: connection.pool.get_stats()
+        for connection in connections.all()
+        if getattr(connection, "pool", None) is not None
+    }
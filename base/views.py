@@ -1,40 +1,98 @@
+import re
+from datetime import timedelta
+
+from django.conf import settings
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 from rest_framework.views import APIView
 
+from base import login, tokens
+from base.analytics import org_report
+from base.authentication import token_cache
+from base.cache import (
+    IDEMPOTENCY_HEADER,
+    idempotent,
+    job_list_cache_key,
+    job_list_period,
+    read_through,
+)
+from base.bulk import (
+    READ_ERRORS,
+    batched,
+    close_jobs,
+    create_jobs,
+    import_staff,
+    read_rows,
+    update_jobs,
+)
 from base.exceptions import HRBaseAPIException
+from base.exports import CONTENT_TYPES, export_response
+from base.instrumentation import BUCKETS, endpoint_metrics
+from base.matching import engine as matching_engine
 from base.models import (
     Application,
     Job,
     Organization,
     Staff,
+    Tombstone,
+    TombstoneKinds,
     User,
     UserRoles,
 )
+from base.pagination import (
+    JobKeysetPagination,
+    SearchKeysetPagination,
+    SyncPagination,
+)
+from base.routers import primary_reads, replica_reads
+from base.search import search_jobs
 from base.serializers import (
+    ApplicationMatchSerializer,
     ApplicationSerializer,
     CreateAccountSerializer,
     CreateOrgStaffSerializer,
     CreateOrgSerializer,
+    JobBatchCloseSerializer,
+    JobBatchSerializer,
+    JobMatchSerializer,
+    JobSearchSerializer,
     JobSerializer,
+    LogoutSerializer,
+    OrgDailyStatsSerializer,
+    StaffImportSerializer,
     StaffSerializer,
+    SyncApplicationSerializer,
+    TokenRefreshSerializer,
     UserSerializer,
     UserLoginSerializer,
 )
+from base.throttling import EmailThrottle, IPThrottle, UserThrottle
+from base.utils import (
+    get_list_etag,
+    get_not_modified_response,
+    get_pool_stats,
+    is_valid_id,
+    parse_timestamp,
+    set_etag,
+)
 
 
 class CreateAccountView(APIView):
     """Create an account for a user."""
 
     permission_classes = [AllowAny]
+    throttle_classes = [IPThrottle]
+    throttle_scope = "create_account"
     serializer_class = CreateAccountSerializer
 
     @swagger_auto_schema(
@@ -60,6 +118,8 @@ class CreateAccountView(APIView):
 
 class UserLoginView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [IPThrottle, EmailThrottle]
+    throttle_scope = "login"
     serializer_class = UserLoginSerializer
 
     @swagger_auto_schema(
@@ -76,18 +136,14 @@ class UserLoginView(APIView):
         email = serializer.validated_data["email"]
         password = serializer.validated_data["password"]
 
-        user = User.objects.get(email=email)
-
-        if not user.check_password(password):
+        user = login.authenticate(email, password)
+        if user is None:
             raise HRBaseAPIException("Incorrect credentials! Check and try again.")
 
-        token, created = Token.objects.get_or_create(user=user)
         data = {
-            "auth_credentials": {"token": token.key},
+            "auth_credentials": login.get_credentials(user),
             "user": UserSerializer(user).data,
         }
-        user.last_login = timezone.now()
-        user.save(update_fields=["last_login"])
         return Response(
             {
                 "status": True,
@@ -98,6 +154,83 @@ class UserLoginView(APIView):
         )
 
 
+class TokenRefreshView(APIView):
+    """Exchange a signed refresh token for a new access/refresh pair."""
+
+    permission_classes = [AllowAny]
+    serializer_class = TokenRefreshSerializer
+
+    @swagger_auto_schema(
+        request_body=serializer_class,
+        tags=["Account"],
+    )
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except ValidationError:
+            raise HRBaseAPIException(serializer.errors)
+
+        try:
+            claims = tokens.decode_token(
+                serializer.validated_data["refresh"], tokens.REFRESH
+            )
+            user = User.objects.get(pk=claims["uid"], is_active=True)
+        except (tokens.InvalidToken, User.DoesNotExist):
+            raise HRBaseAPIException(
+                "Invalid refresh token!!!", code=status.HTTP_401_UNAUTHORIZED
+            )
+
+        # Refresh tokens are single use.
+        tokens.revoke(claims)
+        return Response(
+            {
+                "status": True,
+                "message": "token refreshed.",
+                "data": {"auth_credentials": tokens.issue_token_pair(user)},
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class LogoutView(APIView):
+    """Revoke the credentials used for this request."""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = LogoutSerializer
+
+    @swagger_auto_schema(
+        request_body=serializer_class,
+        tags=["Account"],
+    )
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except ValidationError:
+            raise HRBaseAPIException(serializer.errors)
+
+        if isinstance(request.auth, Token):
+            request.auth.delete()
+        elif isinstance(request.auth, dict):
+            tokens.revoke(request.auth)
+
+        refresh = serializer.validated_data.get("refresh")
+        if refresh:
+            try:
+                tokens.revoke(tokens.decode_token(refresh, tokens.REFRESH))
+            except tokens.InvalidToken:
+                pass
+
+        return Response(
+            {
+                "status": True,
+                "message": "logout successful.",
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 class OrganizationView(APIView):
     """
     User can create an organization and assumes the
@@ -107,6 +240,23 @@ class OrganizationView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = CreateOrgSerializer
 
+    @swagger_auto_schema(tags=["Organization"])
+    def get(self, request):
+        """Retrieve the organization administered by the user."""
+        try:
+            org = Organization.objects.get(admin=request.user)
+        except Organization.DoesNotExist:
+            raise HRBaseAPIException("User has no organization!!!")
+
+        return Response(
+            {
+                "status": True,
+                "message": "Organization retrieved successfully.",
+                "data": self.serializer_class(org).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
     @swagger_auto_schema(request_body=serializer_class, tags=["Organization"])
     def post(self, request):
         context = {"request": request}
@@ -128,6 +278,108 @@ class OrganizationView(APIView):
         )
 
 
+class OrganizationAccessCodeView(APIView):
+    """Allow an organization admin to replace the staff access code."""
+
+    ORG_ADMIN = UserRoles.ORG_ADMIN
+    permission_classes = [IsAuthenticated]
+    serializer_class = CreateOrgSerializer
+
+    @swagger_auto_schema(tags=["Organization"])
+    def post(self, request):
+        user = request.user
+        if user.role != self.ORG_ADMIN:
+            raise HRBaseAPIException("You are not authorized for this action!!!")
+
+        try:
+            org = Organization.objects.get(admin=user)
+        except Organization.DoesNotExist:
+            raise HRBaseAPIException("User has no organization!!!")
+
+        org.rotate_staff_access_code()
+        return Response(
+            {
+                "status": True,
+                "message": "success, access code rotated.",
+                "data": self.serializer_class(org).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class OrganizationAnalyticsView(APIView):
+    """
+    Daily hiring funnel of the user's organization, served from the
+    rollups kept by the rollup_analytics command.
+    """
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = OrgDailyStatsSerializer
+
+    def get_organization(self, user):
+        if user.role == UserRoles.ORG_ADMIN:
+            org = Organization.objects.filter(admin=user).first()
+        elif user.role == UserRoles.ORG_HR:
+            staff = user.user_staff.select_related("organization").first()
+            org = staff and staff.organization
+        else:
+            org = None
+        if org is None:
+            raise HRBaseAPIException("You are not authorized for this action!!!")
+        return org
+
+    def get_date(self, request, name, default):
+        value = request.query_params.get(name)
+        if not value:
+            return default
+        try:
+            day = parse_date(value)
+        except ValueError:
+            # Well formed but impossible, e.g. February 30th.
+            day = None
+        if day is None:
+            raise HRBaseAPIException("Invalid date: %s" % (value))
+        return day
+
+    @swagger_auto_schema(
+        tags=["Organization"],
+        manual_parameters=[
+            openapi.Parameter(
+                name,
+                openapi.IN_QUERY,
+                description=description,
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+            )
+            for name, description in [
+                ("start", "First day, defaults to 30 days before `end`."),
+                ("end", "Last day (included), defaults to today."),
+            ]
+        ],
+    )
+    @replica_reads
+    def get(self, request):
+        org = self.get_organization(request.user)
+        end = self.get_date(request, "end", timezone.localdate())
+        start = self.get_date(request, "start", end - timedelta(days=29))
+        max_days = settings.ANALYTICS["MAX_RANGE_DAYS"]
+        if not start <= end < start + timedelta(days=max_days):
+            raise HRBaseAPIException(
+                "Date range must be between 1 and %s days!!!" % (max_days)
+            )
+
+        report = org_report(org, start, end + timedelta(days=1))
+        report["days"] = self.serializer_class(report["days"], many=True).data
+        return Response(
+            {
+                "status": True,
+                "message": "Analytics retrieved successfully.",
+                "data": report,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 class StaffJoinsOrganizationView(APIView):
     """Create an organization's Staff object in the Staff table."""
 
@@ -170,20 +422,26 @@ class OrganizationStaffView(APIView):
             raise HRBaseAPIException("You are not authorized for this action!!!")
 
     @swagger_auto_schema(tags=["Organization staff"])
+    @replica_reads
     def get(self, request):
         user = request.user
         self.validate_org_admin(user)
 
         try:
             # Handle when user is an HR since a user can join an org with access code
-            org = user.user_staff.get().organization
+            org = user.user_staff.select_related("organization").get().organization
         except Staff.DoesNotExist:
             # Assume is user is an admin user
             org = Organization.objects.get(admin=user)
 
         org_staff = Staff.objects.filter(organization=org)
+        etag = get_list_etag(org_staff, org.pk)
+        not_modified = get_not_modified_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
         serializer = StaffSerializer(org_staff, many=True)
-        return Response(
+        response = Response(
             {
                 "status": True,
                 "message": "success, org staff returned.",
@@ -191,6 +449,7 @@ class OrganizationStaffView(APIView):
             },
             status=status.HTTP_200_OK,
         )
+        return set_etag(response, etag)
 
     @swagger_auto_schema(
         tags=["Organization staff"],
@@ -229,6 +488,122 @@ class OrganizationStaffView(APIView):
         )
 
 
+class ExportMixin:
+    """Shared `file_format` handling of the streaming export endpoints."""
+
+    file_format_param = openapi.Parameter(
+        "file_format",
+        openapi.IN_QUERY,
+        description="Export format.",
+        type=openapi.TYPE_STRING,
+        enum=list(CONTENT_TYPES),
+    )
+
+    def get_file_format(self, request):
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in CONTENT_TYPES:
+            raise HRBaseAPIException("Unsupported file format: %s" % (file_format))
+        return file_format
+
+
+class OrganizationStaffExportView(ExportMixin, APIView):
+    """Stream every staff record of the admin's organization."""
+
+    ORG_ADMIN = UserRoles.ORG_ADMIN
+    permission_classes = [IsAuthenticated]
+    columns = [
+        ("id", "id"),
+        ("user", "user"),
+        ("name", "user__name"),
+        ("email", "user__email"),
+        ("date_joined", "date_joined"),
+        ("exit_date", "exit_date"),
+        ("modified", "modified"),
+    ]
+
+    @swagger_auto_schema(
+        tags=["Organization staff"],
+        manual_parameters=[ExportMixin.file_format_param],
+    )
+    def get(self, request):
+        user = request.user
+        if user.role != self.ORG_ADMIN:
+            raise HRBaseAPIException("You are not authorized for this action!!!")
+
+        org_id = tokens.get_request_org_id(request)
+        if org_id is None:
+            raise HRBaseAPIException("User has no organization!!!")
+
+        return export_response(
+            Staff.objects.filter(organization_id=org_id).order_by("id"),
+            self.columns,
+            self.get_file_format(request),
+            filename="org-%s-staff" % org_id,
+        )
+
+
+class StaffImportView(APIView):
+    """
+    Onboard many staff at once from a CSV/NDJSON upload with
+    email, name and optional password and role columns.
+    """
+
+    ORG_ADMIN = UserRoles.ORG_ADMIN
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+    serializer_class = StaffImportSerializer
+
+    @swagger_auto_schema(request_body=serializer_class, tags=["Organization staff"])
+    def post(self, request):
+        user = request.user
+        if user.role != self.ORG_ADMIN:
+            raise HRBaseAPIException("You are not authorized for this action!!!")
+
+        serializer = self.serializer_class(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except ValidationError:
+            raise HRBaseAPIException(serializer.errors)
+
+        try:
+            org = Organization.objects.get(admin=user)
+        except Organization.DoesNotExist:
+            raise HRBaseAPIException("User has no organization!!!")
+
+        upload = serializer.validated_data["file"]
+        file_format = serializer.validated_data.get("file_format") or (
+            "ndjson" if upload.name.endswith((".ndjson", ".jsonl")) else "csv"
+        )
+        max_rows = settings.BULK_IMPORT["MAX_API_ROWS"]
+        try:
+            rows = next(batched(read_rows(upload, file_format), max_rows + 1), [])
+        except READ_ERRORS as e:
+            raise HRBaseAPIException("Could not read the file: %s" % (e))
+        if len(rows) > max_rows:
+            raise HRBaseAPIException(
+                "Imports are limited to %s rows, use the import_staff command."
+                % (max_rows)
+            )
+        max_passwords = settings.BULK_IMPORT["MAX_API_PASSWORDS"]
+        if sum(1 for row in rows if row.get("password")) > max_passwords:
+            raise HRBaseAPIException(
+                "Imports are limited to %s passwords, use the import_staff command."
+                % (max_passwords)
+            )
+
+        # Hash in this process: a pool per request costs more than it saves
+        # on the few passwords allowed here.
+        report = import_staff(org, rows, workers=1)
+        return Response(
+            {
+                "status": True,
+                "message": "success, staff imported.",
+                "data": report,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 class JobView(ViewSet):
     """Create and view list of jobs available."""
 
@@ -236,25 +611,100 @@ class JobView(ViewSet):
 
     permission_classes = [IsAuthenticated]
     serializer_class = JobSerializer
+    pagination_class = JobKeysetPagination
 
     def validate_hr(self, user):
         if user.role != self.HR:
             raise HRBaseAPIException("You are not authorized for this action!!!")
 
+    def get_organization(self, user):
+        try:
+            return user.user_staff.select_related("organization").get().organization
+        except Staff.DoesNotExist:
+            raise HRBaseAPIException("User has no staff record!!!")
+
+    def get_batch(self, request, serializer_class, field):
+        serializer = serializer_class(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except ValidationError:
+            raise HRBaseAPIException(serializer.errors)
+
+        items = serializer.validated_data[field]
+        if len(items) > settings.BULK_JOBS_MAX_ITEMS:
+            raise HRBaseAPIException(
+                "Batches are limited to %s jobs!!!" % (settings.BULK_JOBS_MAX_ITEMS)
+            )
+        return items
+
     @swagger_auto_schema(
         tags=["Job"],
+        manual_parameters=[
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                description="Cursor returned as `next` by the previous page.",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "page_size",
+                openapi.IN_QUERY,
+                description="Number of jobs per page.",
+                type=openapi.TYPE_INTEGER,
+            ),
+        ],
     )
+    @replica_reads
     def list(self, request):
-        jobs = Job.objects.filter(is_open=True)
-        serializer = self.serializer_class(jobs, many=True)
-        return Response(
+        paginator = self.pagination_class()
+        page_size = paginator.get_page_size(request)
+        cursor = request.query_params.get(paginator.cursor_query_param)
+
+        key = job_list_cache_key(page_size, cursor)
+
+        def get_page():
+            # Cached pages outlive the replica's lag, build them from the
+            # primary.
+            with primary_reads():
+                # The ETag is cached with the page, so that hits run no
+                # query. Taken first, a write racing the page changes it.
+                etag = get_list_etag(
+                    Job.objects.filter(is_open=True),
+                    page_size,
+                    cursor,
+                    job_list_period(),
+                )
+                jobs = paginator.paginate_queryset(
+                    Job.objects.filter(is_open=True), request, view=self
+                )
+                serializer = self.serializer_class(jobs, many=True)
+                # Only the cursor: the link depends on who is asking.
+                return {
+                    "data": serializer.data,
+                    "cursor": paginator.get_next_cursor(),
+                    "etag": etag,
+                }
+
+        page = read_through(
+            key,
+            get_page,
+            settings.JOB_LIST_CACHE["TIMEOUT"],
+            alias=settings.JOB_LIST_CACHE["ALIAS"],
+        )
+        not_modified = get_not_modified_response(request, page["etag"])
+        if not_modified is not None:
+            return not_modified
+
+        response = Response(
             {
                 "status": True,
                 "message": "Jobs retrieved successfully.",
-                "data": serializer.data,
+                "data": page["data"],
+                "next": paginator.get_link(request, page["cursor"]),
             },
             status=status.HTTP_200_OK,
         )
+        return set_etag(response, page["etag"])
 
     @swagger_auto_schema(
         request_body=serializer_class,
@@ -309,21 +759,191 @@ class JobView(ViewSet):
             status=status.HTTP_200_OK,
         )
 
+    @swagger_auto_schema(request_body=JobBatchSerializer, tags=["Job"])
+    @action(detail=False, methods=["POST"])
+    def batch(self, request):
+        """Create many jobs at once, reporting the outcome of each."""
+        user = request.user
+        self.validate_hr(user)
+        items = self.get_batch(request, JobBatchSerializer, "jobs")
+
+        report = create_jobs(self.get_organization(user), user, items)
+        return Response(
+            {
+                "status": True,
+                "message": "jobs created successfully.",
+                "data": report,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @swagger_auto_schema(request_body=JobBatchSerializer, tags=["Job"])
+    @batch.mapping.patch
+    def batch_update(self, request):
+        """Update many jobs at once, each item carrying the job's `id`."""
+        user = request.user
+        self.validate_hr(user)
+        items = self.get_batch(request, JobBatchSerializer, "jobs")
+
+        report = update_jobs(self.get_organization(user), items)
+        return Response(
+            {
+                "status": True,
+                "message": "jobs updated successfully.",
+                "data": report,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @swagger_auto_schema(request_body=JobBatchCloseSerializer, tags=["Job"])
+    @action(detail=False, methods=["POST"], url_path="batch/close")
+    def batch_close(self, request):
+        """Close many jobs at once."""
+        user = request.user
+        self.validate_hr(user)
+        ids = self.get_batch(request, JobBatchCloseSerializer, "ids")
+
+        report = close_jobs(self.get_organization(user), ids)
+        return Response(
+            {
+                "status": True,
+                "message": "jobs closed successfully.",
+                "data": report,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class JobSearchView(APIView):
+    """Full-text search over job titles, descriptions and organizations."""
+
+    permission_classes = [IsAuthenticated]
+    serializer_class = JobSearchSerializer
+    pagination_class = SearchKeysetPagination
+
+    @swagger_auto_schema(
+        tags=["Job"],
+        manual_parameters=[
+            openapi.Parameter(
+                "q",
+                openapi.IN_QUERY,
+                description="Search terms.",
+                type=openapi.TYPE_STRING,
+                required=True,
+            ),
+            openapi.Parameter(
+                "is_open",
+                openapi.IN_QUERY,
+                description="Filter on open (default) or closed jobs.",
+                type=openapi.TYPE_BOOLEAN,
+            ),
+            openapi.Parameter(
+                "organization",
+                openapi.IN_QUERY,
+                description="Only jobs of this organization id.",
+                type=openapi.TYPE_INTEGER,
+            ),
+            openapi.Parameter(
+                "created_after",
+                openapi.IN_QUERY,
+                description="Only jobs created at or after this time.",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "created_before",
+                openapi.IN_QUERY,
+                description="Only jobs created before this time.",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                description="Cursor returned as `next` by the previous page.",
+                type=openapi.TYPE_STRING,
+            ),
+        ],
+    )
+    @replica_reads
+    def get(self, request):
+        params = request.query_params
+        text = params.get("q", "")
+        if not re.search(r"\w", text):
+            raise HRBaseAPIException("Must pass a search query!!!")
+
+        jobs = Job.objects.filter(
+            is_open=params.get("is_open", "true").lower() in ("true", "1", "yes")
+        )
+        if params.get("organization"):
+            try:
+                org_id = int(params["organization"])
+            except ValueError:
+                org_id = None
+            if not is_valid_id(org_id):
+                raise HRBaseAPIException("Invalid organization id!!!")
+            jobs = jobs.filter(org_id=org_id)
+        for param, lookup in [
+            ("created_after", "created__gte"),
+            ("created_before", "created__lt"),
+        ]:
+            if params.get(param):
+                value = parse_timestamp(params[param])
+                if value is None:
+                    raise HRBaseAPIException("Invalid %s: %s" % (param, params[param]))
+                jobs = jobs.filter(**{lookup: value})
+
+        paginator = self.pagination_class()
+        results = paginator.paginate_queryset(
+            search_jobs(jobs, text), request, view=self
+        )
+        serializer = self.serializer_class(results, many=True)
+        return paginator.get_paginated_response(
+            serializer.data, message="Jobs retrieved successfully."
+        )
+
 
-class JobApplicationView(ViewSet):
+class JobApplicationView(ExportMixin, ViewSet):
     """
     Only users who are not staff of the organization(with the Job post)
     can submit an application for the job.
     """
 
+    export_columns = [
+        ("id", "id"),
+        ("applicant", "applicant_id"),
+        ("name", "applicant_id__name"),
+        ("email", "applicant_id__email"),
+        ("skill_description", "skill_description"),
+        ("created", "created"),
+        ("modified", "modified"),
+    ]
+
     HR = UserRoles.ORG_HR
     ADMIN = UserRoles.ORG_ADMIN
 
     permission_classes = [IsAuthenticated]
+    # Set by the actions opting in to base.throttling.
+    throttle_scope = None
     serializer_class = ApplicationSerializer
 
-    @swagger_auto_schema(request_body=serializer_class, tags=["Job"])
-    @action(detail=True, methods=["POST"])
+    @swagger_auto_schema(
+        request_body=serializer_class,
+        tags=["Job"],
+        manual_parameters=[
+            openapi.Parameter(
+                IDEMPOTENCY_HEADER,
+                openapi.IN_HEADER,
+                description="Retries with the same key replay the first success.",
+                type=openapi.TYPE_STRING,
+            ),
+        ],
+    )
+    @action(
+        detail=True,
+        methods=["POST"],
+        throttle_classes=[UserThrottle],
+        throttle_scope="apply",
+    )
+    @idempotent("apply")
     def apply(self, request, pk=None):
         user = request.user
         # Users who are not staff of the Organisation that posted a
@@ -349,6 +969,7 @@ class JobApplicationView(ViewSet):
 
     @swagger_auto_schema(tags=["Job"])
     @action(detail=True)
+    @replica_reads
     def applications(self, request, pk):
         user = request.user
         # validate to confirm if user is in the Approved list to view
@@ -357,7 +978,7 @@ class JobApplicationView(ViewSet):
 
         self.validate_user(user, job.org_id, action="applications")
 
-        applications = Application.objects.filter(job=job)
+        applications = Application.objects.filter(job=job).select_related("job")
         serializer = self.serializer_class(applications, many=True)
         return Response(
             {
@@ -368,12 +989,121 @@ class JobApplicationView(ViewSet):
             status=status.HTTP_200_OK,
         )
 
+    @swagger_auto_schema(
+        tags=["Job"],
+        manual_parameters=[ExportMixin.file_format_param],
+    )
+    @action(detail=True)
+    def export(self, request, pk):
+        """Stream every application to the job."""
+        user = request.user
+        job = self.get_job_or_404(pk)
+        self.validate_user(user, job.org_id, action="applications")
+
+        return export_response(
+            Application.objects.filter(job=job).order_by("id"),
+            self.export_columns,
+            self.get_file_format(request),
+            filename="job-%s-applications" % job.pk,
+        )
+
+    @swagger_auto_schema(
+        tags=["Job"],
+        manual_parameters=[
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description="Number of best matching applications to return.",
+                type=openapi.TYPE_INTEGER,
+            )
+        ],
+    )
+    @action(detail=True)
+    def matches(self, request, pk):
+        """Rank the job's applications by how well their skills match it."""
+        user = request.user
+        job = self.get_job_or_404(pk)
+        self.validate_user(user, job.org_id, action="applications")
+
+        ranked = matching_engine.rank_applications(job, self.get_limit(request))
+        applications = Application.objects.select_related("job").in_bulk(
+            [key for key, _ in ranked]
+        )
+        results = []
+        for key, score in ranked:
+            if key in applications:
+                applications[key].score = score
+                results.append(applications[key])
+
+        serializer = ApplicationMatchSerializer(results, many=True)
+        return Response(
+            {
+                "status": True,
+                "message": "Matching applications returned, successfully.",
+                "data": serializer.data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @swagger_auto_schema(
+        tags=["Job"],
+        manual_parameters=[
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description="Number of best matching jobs to return.",
+                type=openapi.TYPE_INTEGER,
+            )
+        ],
+    )
+    @action(detail=False)
+    def recommended(self, request):
+        """Rank open jobs by how well they match the user's past applications."""
+        user = request.user
+        applied = Application.objects.filter(applicant_id=user).values_list(
+            "job_id", "skill_description"
+        )
+        applied_job_ids = {job_id for job_id, _ in applied}
+        skills = " ".join(skill_description for _, skill_description in applied)
+
+        limit = self.get_limit(request)
+        ranked = [
+            (key, score)
+            for key, score in matching_engine.rank_jobs(
+                skills, limit + len(applied_job_ids)
+            )
+            if key not in applied_job_ids
+        ][:limit]
+        jobs = Job.objects.filter(is_open=True).in_bulk([key for key, _ in ranked])
+        results = []
+        for key, score in ranked:
+            if key in jobs:
+                jobs[key].score = score
+                results.append(jobs[key])
+
+        serializer = JobMatchSerializer(results, many=True)
+        return Response(
+            {
+                "status": True,
+                "message": "Recommended jobs returned, successfully.",
+                "data": serializer.data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    def get_limit(self, request, default=20, maximum=100):
+        try:
+            limit = int(request.query_params.get("limit", default))
+        except ValueError:
+            raise HRBaseAPIException("Invalid limit!!!")
+        return max(1, min(limit, maximum))
+
     def validate_user(self, user, job_org, **kwargs):
         action = kwargs.get("action")
-        staff = Staff.objects.filter(user=user, organization=job_org)
+        is_staff = Staff.objects.filter(user=user, organization=job_org).exists()
 
         # Validate who can create a job application
-        if action == "apply" and staff.exists() is True:
+        if action == "apply" and is_staff is True:
             raise HRBaseAPIException(
                 "You are a staff member of this org, you cannot apply for this role!!"
             )
@@ -382,7 +1112,7 @@ class JobApplicationView(ViewSet):
         if (
             action == "applications"
             and user.role not in [self.HR, self.ADMIN]
-            and staff.exists() is False
+            and is_staff is False
         ):
             raise HRBaseAPIException(
                 "You are not authorized to view applications to this job!!"
@@ -390,7 +1120,161 @@ class JobApplicationView(ViewSet):
 
     def get_job_or_404(self, pk):
         try:
-            job = Job.objects.get(pk=pk)
+            job = Job.objects.select_related("org_id").get(pk=pk)
         except Job.DoesNotExist:
             raise HRBaseAPIException("Job not found", code=status.HTTP_404_NOT_FOUND)
         return job
+
+
+class SyncView(APIView):
+    """
+    Return the organization's jobs and applications changed since a
+    watermark, plus ids of those deleted, so clients can keep a local
+    mirror instead of re-downloading full lists.
+
+    Changes come in pages: clients follow ``next`` until it is null and
+    only then keep the watermark, which is the same on every page.
+    """
+
+    HR = UserRoles.ORG_HR
+    ADMIN = UserRoles.ORG_ADMIN
+
+    permission_classes = [IsAuthenticated]
+    pagination_class = SyncPagination
+
+    @swagger_auto_schema(
+        tags=["Sync"],
+        manual_parameters=[
+            openapi.Parameter(
+                "since",
+                openapi.IN_QUERY,
+                description="Watermark returned by the previous sync, "
+                "omit for a full snapshot.",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                description="Cursor returned in `next` by the previous page.",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "page_size",
+                openapi.IN_QUERY,
+                description="Number of jobs and of applications per page.",
+                type=openapi.TYPE_INTEGER,
+            ),
+        ],
+    )
+    def get(self, request):
+        user = request.user
+        if user.role not in [self.HR, self.ADMIN]:
+            raise HRBaseAPIException("You are not authorized for this action!!!")
+
+        org_id = tokens.get_request_org_id(request)
+        if org_id is None:
+            raise HRBaseAPIException("User has no organization!!!")
+
+        paginator = self.pagination_class()
+        state = paginator.decode_cursor(request)
+        if state is None:
+            since = self.get_since(request)
+            # Taken before reading so nothing written meanwhile is skipped.
+            watermark = timezone.now() - timedelta(seconds=settings.SYNC_WATERMARK_LAG)
+            positions = {}
+        else:
+            since, watermark, positions = state
+
+        # Later changes are left to the next sync, so that rows moving
+        # while the client pages cannot be skipped.
+        jobs = Job.objects.filter(org_id=org_id, modified__lte=watermark)
+        applications = Application.objects.filter(
+            job__org_id=org_id, modified__lte=watermark
+        )
+        deleted = {"jobs": [], "applications": []}
+        if since is not None:
+            jobs = jobs.filter(modified__gt=since)
+            applications = applications.filter(modified__gt=since)
+        if since is not None and state is None:
+            tombstones = Tombstone.objects.filter(
+                organization_id=org_id, deleted__gt=since, deleted__lte=watermark
+            ).values_list("kind", "object_id")
+            for kind, object_id in tombstones:
+                if kind == TombstoneKinds.JOB:
+                    deleted["jobs"].append(object_id)
+                else:
+                    deleted["applications"].append(object_id)
+
+        pages = paginator.paginate_lists(
+            {"jobs": jobs, "applications": applications},
+            request,
+            since,
+            watermark,
+            positions,
+        )
+        return Response(
+            {
+                "status": True,
+                "message": "success, changes returned.",
+                "data": {
+                    "watermark": watermark.isoformat(),
+                    "jobs": JobSerializer(pages["jobs"], many=True).data,
+                    "applications": SyncApplicationSerializer(
+                        pages["applications"], many=True
+                    ).data,
+                    "deleted": deleted,
+                },
+                "next": paginator.get_next_link(),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    def get_since(self, request):
+        value = request.query_params.get("since")
+        if not value:
+            return None
+
+        since = parse_timestamp(value)
+        if since is None:
+            raise HRBaseAPIException("Invalid watermark: %s" % (value))
+        return since
+
+
+class InternalStatsView(APIView):
+    """Expose in-process cache and connection statistics for monitoring."""
+
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(tags=["Internal"])
+    def get(self, request):
+        return Response(
+            {
+                "status": True,
+                "message": "success, stats returned.",
+                "data": {
+                    "token_auth_cache": token_cache.info(),
+                    "db_pools": get_pool_stats(),
+                },
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class InternalMetricsView(APIView):
+    """Expose this process's per-endpoint request latency histograms."""
+
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(tags=["Internal"])
+    def get(self, request):
+        return Response(
+            {
+                "status": True,
+                "message": "success, metrics returned.",
+                "data": {
+                    "buckets_ms": list(BUCKETS),
+                    "endpoints": endpoint_metrics.snapshot(),
+                },
+            },
+            status=status.HTTP_200_OK,
+        )
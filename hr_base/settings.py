@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "base.instrumentation.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -60,6 +61,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "base.routers.ReadYourWritesMiddleware",
 ]
 
 ROOT_URLCONF = "hr_base.urls"
@@ -89,17 +91,187 @@ AUTH_USER_MODEL = "base.User"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connections come from a per-process pool (base.db.backends.postgresql)
+# unless DB_POOL=false, in which case DB_CONN_MAX_AGE can keep them open
+# between requests instead.
+DB_POOL = os.getenv("DB_POOL", "true").lower() == "true"
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "base.db.backends.postgresql",
         "NAME": os.environ["DB_NAME"],
         "USER": os.environ["DB_USER"],
         "PASSWORD": os.environ["DB_PASS"],
         "HOST": os.environ["DB_HOST"],
         "PORT": os.environ["DB_PORT"],
+        "CONN_MAX_AGE": 0 if DB_POOL else int(os.getenv("DB_CONN_MAX_AGE", 0)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+}
+if DB_POOL:
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+        # Seconds before a connection is replaced, idle ones are closed
+        # above min_size, and a request waits for a free connection.
+        "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", 3600)),
+        "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", 600)),
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+    }
+
+# Read replicas (base.routers): a comma-separated list of hosts sharing
+# the primary's credentials. Views opting in send safe reads to them, and
+# clients stay on the primary for PIN_SECONDS after writing. Pins live in
+# the CACHE_ALIAS cache, which must be shared between workers (e.g. Redis,
+# see CACHE_BACKEND below), startup fails otherwise. In tests the replicas
+# mirror the default database.
+DB_REPLICA_HOSTS = [
+    host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host
+]
+for number, host in enumerate(DB_REPLICA_HOSTS, start=1):
+    DATABASES["replica_%s" % number] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["base.routers.ReplicaRouter"]
+
+READ_REPLICAS = {
+    "ALIASES": [alias for alias in DATABASES if alias != "default"],
+    "PIN_SECONDS": int(os.getenv("DB_REPLICA_PIN_SECONDS", 5)),
+    "CACHE_ALIAS": os.getenv("DB_REPLICA_PIN_CACHE_ALIAS", "default"),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache with a
+# redis:// URL) to share cached data and invalidations between workers.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "hr-base"),
     }
 }
 
+# Serialized open job list pages, invalidated whenever a Job is written.
+JOB_LIST_CACHE = {
+    "ALIAS": os.getenv("JOB_LIST_CACHE_ALIAS", "default"),
+    "TIMEOUT": int(os.getenv("JOB_LIST_CACHE_TIMEOUT", 300)),
+}
+
+
+# Delta sync watermarks trail the clock by this many seconds, so rows
+# written by transactions still in flight are re-sent on the next sync.
+SYNC_WATERMARK_LAG = int(os.getenv("SYNC_WATERMARK_LAG", 5))
+
+# Jobs and applications returned per sync page, each; clients may ask for
+# fewer with ?page_size=.
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", 500))
+
+
+# In-process TF-IDF matching indexes (base.matching).
+MATCHING = {
+    "MAX_JOB_INDEXES": int(os.getenv("MATCHING_MAX_JOB_INDEXES", 100)),
+    "CHUNK_SIZE": int(os.getenv("MATCHING_CHUNK_SIZE", 5000)),
+}
+
+
+# Rows fetched per round-trip by streaming CSV/NDJSON exports.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 2000))
+
+
+# Bulk staff import (base.bulk): rows per transaction, password hashing
+# processes of the import_staff command, and the largest file and number
+# of passwords the API endpoint accepts. The endpoint hashes in the
+# request, each password costs a few hundred milliseconds, so keep
+# MAX_API_PASSWORDS well under the worker timeout.
+BULK_IMPORT = {
+    "BATCH_SIZE": int(os.getenv("BULK_IMPORT_BATCH_SIZE", 1000)),
+    "HASH_WORKERS": int(os.getenv("BULK_IMPORT_HASH_WORKERS", os.cpu_count() or 1)),
+    "MAX_API_ROWS": int(os.getenv("BULK_IMPORT_MAX_API_ROWS", 5000)),
+    "MAX_API_PASSWORDS": int(os.getenv("BULK_IMPORT_MAX_API_PASSWORDS", 20)),
+}
+
+
+# Largest number of jobs accepted by one batch create/update/close request.
+BULK_JOBS_MAX_ITEMS = int(os.getenv("BULK_JOBS_MAX_ITEMS", 500))
+
+
+# Jobs closed per transaction by close_expired_jobs and, with --loop,
+# seconds between its runs.
+JOB_EXPIRY = {
+    "BATCH_SIZE": int(os.getenv("JOB_EXPIRY_BATCH_SIZE", 1000)),
+    "INTERVAL": int(os.getenv("JOB_EXPIRY_INTERVAL", 60)),
+}
+
+
+# Responses replayed for requests repeating an Idempotency-Key header.
+IDEMPOTENCY = {
+    "ALIAS": os.getenv("IDEMPOTENCY_CACHE_ALIAS", "default"),
+    "TIMEOUT": int(os.getenv("IDEMPOTENCY_TIMEOUT", 24 * 60 * 60)),
+}
+
+
+# Codes staff use to join an organization: random strings of LENGTH
+# characters from ALPHABET (no look-alike characters), valid for TTL
+# seconds (0 never expires). Clashes are retried MAX_ATTEMPTS times.
+STAFF_ACCESS_CODE = {
+    "LENGTH": int(os.getenv("STAFF_ACCESS_CODE_LENGTH", 10)),
+    "ALPHABET": os.getenv(
+        "STAFF_ACCESS_CODE_ALPHABET", "abcdefghjkmnpqrstuvwxyz23456789"
+    ),
+    "TTL": int(os.getenv("STAFF_ACCESS_CODE_TTL", 0)),
+    "MAX_ATTEMPTS": int(os.getenv("STAFF_ACCESS_CODE_MAX_ATTEMPTS", 5)),
+}
+
+
+# Daily analytics rollups (base.analytics): days recomputed by each
+# rollup_analytics run, seconds between runs with --loop and the longest
+# range served by the analytics endpoint.
+ANALYTICS = {
+    "WINDOW_DAYS": int(os.getenv("ANALYTICS_WINDOW_DAYS", 2)),
+    "INTERVAL": int(os.getenv("ANALYTICS_INTERVAL", 300)),
+    "MAX_RANGE_DAYS": int(os.getenv("ANALYTICS_MAX_RANGE_DAYS", 366)),
+}
+
+
+# Set ASYNC_API=true when serving hr_base.asgi (see start.sh) to route the
+# read endpoints and login to the native async views in base.async_views.
+ASYNC_API = {
+    "ENABLED": os.getenv("ASYNC_API", "false").lower() in ("yes", "true"),
+}
+
+
+# Login (base.login): HASH_WORKERS threads check passwords for the async
+# view and upgrade outdated hashes, and last_login is written at most
+# once every LAST_LOGIN_INTERVAL seconds per user.
+LOGIN = {
+    "HASH_WORKERS": int(os.getenv("LOGIN_HASH_WORKERS", 4)),
+    "LAST_LOGIN_INTERVAL": int(os.getenv("LOGIN_LAST_LOGIN_INTERVAL", 300)),
+}
+
+
+# Request instrumentation (base.instrumentation): one log line per request
+# at INSTRUMENTATION_LOG_LEVEL=INFO, and a warning with the slowest queries
+# for requests over SLOW_REQUEST_MS. Server-Timing headers tell any client
+# how long each step and how many queries a request took, so they are off
+# unless INSTRUMENTATION_SERVER_TIMING is set, e.g. on benchmark servers.
+INSTRUMENTATION = {
+    "ENABLED": os.getenv("INSTRUMENTATION", "true").lower() in ("yes", "true"),
+    "SERVER_TIMING": os.getenv("INSTRUMENTATION_SERVER_TIMING", "false").lower()
+    in ("yes", "true"),
+    "SLOW_REQUEST_MS": int(os.getenv("SLOW_REQUEST_MS", 500)),
+    "SLOW_REQUEST_MAX_QUERIES": int(os.getenv("SLOW_REQUEST_MAX_QUERIES", 20)),
+    "LOG_LEVEL": os.getenv("INSTRUMENTATION_LOG_LEVEL", "WARNING"),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -144,7 +316,10 @@ LOGGING = {
         "": {
             "level": "ERROR",
             "handlers": ["terminal"],
-        }
+        },
+        "base.instrumentation": {
+            "level": INSTRUMENTATION["LOG_LEVEL"],
+        },
     },
 }
 
@@ -153,12 +328,60 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "base.authentication.CachedTokenAuthentication",
+        "base.authentication.SignedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
+    "DEFAULT_RENDERER_CLASSES": [
+        "base.instrumentation.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "DEFAULT_SCHEMA_CLASS": "rest_framework.schemas.coreapi.AutoSchema",
     "PAGE_SIZE": 10,
+    # Token bucket rates of the views opting in to base.throttling, by
+    # "<throttle_scope>_<kind>".
+    "DEFAULT_THROTTLE_RATES": {
+        "login_ip": os.getenv("THROTTLE_LOGIN_IP", "30/min"),
+        "login_email": os.getenv("THROTTLE_LOGIN_EMAIL", "10/min"),
+        "create_account_ip": os.getenv("THROTTLE_CREATE_ACCOUNT_IP", "20/hour"),
+        "apply_user": os.getenv("THROTTLE_APPLY_USER", "60/hour"),
+    },
+    # Proxies in front of the app, whose X-Forwarded-For entries are
+    # trusted to identify clients. 0 ignores the header, which clients can
+    # forge, and throttles by REMOTE_ADDR; behind a reverse proxy (e.g. the
+    # Nginx setup in the README) that is the proxy, so set it to 1.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", 0)),
+}
+
+# Throttle buckets (base.throttling) live in a per-process LRU of MAX_KEYS
+# entries, unless SHARED_CACHE names a CACHES alias all workers share.
+# Set THROTTLING=false to turn throttling off, e.g. when load testing.
+THROTTLING = {
+    "ENABLED": os.getenv("THROTTLING", "true").lower() in ("yes", "true"),
+    "MAX_KEYS": int(os.getenv("THROTTLING_MAX_KEYS", 100000)),
+    "SHARED_CACHE": os.getenv("THROTTLING_SHARED_CACHE"),
+}
+
+# Token -> user lookups cached by base.authentication.CachedTokenAuthentication.
+# Entries are evicted in-process on token deletion or user changes; other
+# workers only see the change once TTL (seconds) expires, unless SHARED_CACHE
+# names a CACHES alias that all workers share.
+TOKEN_AUTH_CACHE = {
+    "MAX_SIZE": int(os.getenv("TOKEN_AUTH_CACHE_MAX_SIZE", 10000)),
+    "TTL": int(os.getenv("TOKEN_AUTH_CACHE_TTL", 60)),
+    "SHARED_CACHE": os.getenv("TOKEN_AUTH_SHARED_CACHE"),
+}
+
+# Set AUTH_TOKEN_MODE=signed to have login issue stateless signed
+# access/refresh tokens (see base.tokens) instead of DB-backed Tokens.
+# Revoked tokens are deny-listed in DENY_LIST_CACHE, which must be shared
+# between workers for revocation to apply everywhere.
+SIGNED_TOKENS = {
+    "ENABLED": os.getenv("AUTH_TOKEN_MODE", "db").lower() == "signed",
+    "ACCESS_TTL": int(os.getenv("SIGNED_TOKEN_ACCESS_TTL", 300)),
+    "REFRESH_TTL": int(os.getenv("SIGNED_TOKEN_REFRESH_TTL", 7 * 24 * 60 * 60)),
+    "DENY_LIST_CACHE": os.getenv("SIGNED_TOKEN_DENY_LIST_CACHE", "default"),
 }
 
 SWAGGER_SETTINGS = {
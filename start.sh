@@ -2,7 +2,15 @@
 
 function manage_app() {
     python manage.py makemigrations
+    # the staff, application and access code unique constraints cannot be added over duplicates
+    python manage.py merge_duplicates
     python manage.py migrate
+    # fill counters of rows written before they existed, or that drifted
+    python manage.py reconcile_counters
+    # add jobs written before the search index existed
+    python manage.py reindex_jobs
+    # replace the short access codes of older versions
+    python manage.py rotate_access_codes
     python manage.py collectstatic --no-input
 }
 
@@ -16,5 +24,13 @@ else
     # use production/staging server
     manage_app
     # use gunicorn for production server here
-    gunicorn hr_base.wsgi:application --workers 4 --timeout 60 --bind 0.0.0.0:8000 --chdir=/app
+    # same values as settings.ASYNC_API: yes or true, in any case
+    async_api=$(echo "${ASYNC_API}" | tr '[:upper:]' '[:lower:]')
+    if [ "${async_api}" == "yes" ] || [ "${async_api}" == "true" ]
+    then
+        # serve the async views (base.async_views) from uvicorn workers
+        gunicorn hr_base.asgi:application --worker-class uvicorn.workers.UvicornWorker --workers 4 --timeout 60 --bind 0.0.0.0:8000 --chdir=/app
+    else
+        gunicorn hr_base.wsgi:application --workers 4 --timeout 60 --bind 0.0.0.0:8000 --chdir=/app
+    fi
 fi